@@ -9,13 +9,10 @@ import warnings
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from uuid import uuid4
-import bcrypt
-import jwt
 from typing import Optional, Dict, Any
 
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 import uvicorn
 from bson import ObjectId
@@ -30,9 +27,6 @@ load_dotenv()
 # CONFIGURACIÓN
 # ============================================================================
 
-JWT_SECRET = os.getenv("JWT_SECRET", "firefighter-super-secret-jwt-key-2024")
-JWT_EXPIRES_HOURS = int(os.getenv("JWT_EXPIRES_HOURS", "24"))
-
 # ============================================================================
 # INSTANCIA DATABASE - CREAR AQUÍ PARA EVITAR IMPORTACIÓN CIRCULAR
 # ============================================================================
@@ -42,26 +36,10 @@ db = Database()
 # UTILS GLOBALES
 # ============================================================================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-def verify_password(password: str, pwd_hash: str) -> bool:
-    try:
-        return bcrypt.checkpw(password.encode("utf-8"), pwd_hash.encode("utf-8"))
-    except:
-        return False
-
-def make_jwt(payload: dict) -> str:
-    now = datetime.utcnow()
-    exp = now + timedelta(hours=JWT_EXPIRES_HOURS)
-    to_encode = {**payload, "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
-    return jwt.encode(to_encode, JWT_SECRET, algorithm="HS256")
-
-def decode_jwt(token: str) -> Optional[dict]:
-    try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-    except:
-        return None
+# hash/verify de contraseñas: executor acotado de utils.hashing (fuera del event loop)
+from utils.hashing import HashingBusyError, hash_password_async, verify_password_async
+from utils.jwt_utils import make_jwt
+from utils.mongo import record_card_tombstone
 
 def serialize_doc(doc):
     """Serializar documento MongoDB"""
@@ -76,37 +54,10 @@ def serialize_doc(doc):
     return doc
 
 # ============================================================================
-# AUTH DEPENDENCIES (Solo aquí, NO duplicar)
+# AUTH DEPENDENCIES (única implementación en dependencies/auth.py)
 # ============================================================================
 
-security = HTTPBearer()
-
-async def require_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    token = credentials.credentials
-    payload = decode_jwt(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token inválido")
-    
-    username = payload.get("username")
-    
-    # Buscar usuario usando instancia db
-    user = await db.users.find_one({"username": username})
-    if not user:
-        user = await db.admin_users.find_one({"username": username})
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuario no encontrado")
-    
-    return {
-        "username": username,
-        "role": user.get("role", "user"),
-        "user_id": str(user["_id"]) if "_id" in user else user.get("id", "")
-    }
-
-async def require_admin(user_data: dict = Depends(require_user)) -> dict:
-    if user_data.get("role") != "admin":
-        raise HTTPException(status_code=403, detail="Requiere permisos de administrador")
-    return user_data
+from dependencies.auth import require_user, require_admin, hashing_busy
 
 # ============================================================================
 # LIFESPAN
@@ -260,7 +211,7 @@ async def api_login_compat(request: Dict[str, Any]):
         
         # Verificar contraseña
         password_field = "password_hash" if "password_hash" in user_doc else "password"
-        if not verify_password(password, user_doc[password_field]):
+        if not await verify_password_async(password, user_doc[password_field]):
             print(f"❌ Wrong password for: {username}")
             raise HTTPException(status_code=401, detail="Credenciales incorrectas")
         
@@ -312,6 +263,8 @@ async def api_login_compat(request: Dict[str, Any]):
             }
         }
         
+    except HashingBusyError:
+        raise hashing_busy()
     except HTTPException:
         raise
     except Exception as e:
@@ -558,6 +511,7 @@ async def api_delete_memory_card_compat(card_id: str, user_data: Dict = Depends(
         result = await db.memory_cards.delete_one({"_id": obj_id})
         
         if result.deleted_count:
+            await record_card_tombstone(db.db, obj_id, card_doc.get("created_by"))
             print(f"✅ Memory card eliminada: {card_id}")
             return {
                 "ok": True,
@@ -7,6 +7,9 @@ import asyncio
 import os
 from dotenv import load_dotenv
 
+from utils.mongo import TOMBSTONES_COLLECTION, TOMBSTONE_TTL_DAYS
+from services.card_import import IMPORTS_COLLECTION, IMPORT_TTL_DAYS
+
 load_dotenv()
 
 # Configuración de MongoDB
@@ -35,6 +38,8 @@ class Database:
     resets = None
     access_tokens = None
     memory_cards = None
+    memory_card_tombstones = None
+    memory_card_imports = None
     
     @classmethod
     async def connect_db(cls):
@@ -66,6 +71,8 @@ class Database:
             cls.resets = cls.db["password_resets"]
             cls.access_tokens = cls.db["access_tokens"]
             cls.memory_cards = cls.db["memory_cards"]
+            cls.memory_card_tombstones = cls.db[TOMBSTONES_COLLECTION]
+            cls.memory_card_imports = cls.db[IMPORTS_COLLECTION]
             
             # Verificar y crear colección memory_cards si no existe
             collections = await cls.db.list_collection_names()
@@ -115,6 +122,19 @@ class Database:
                 await cls.memory_cards.create_index("created_by")
                 await cls.memory_cards.create_index([("created_by", ASCENDING), ("box", ASCENDING)])
                 await cls.memory_cards.create_index([("created_by", ASCENDING), ("last_reviewed", ASCENDING)])
+                # Paginación por cursor de /api/memory-cards
+                await cls.memory_cards.create_index([("created_by", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)])
+                # Sincronización incremental (?updated_since=)
+                await cls.memory_cards.create_index([("created_by", ASCENDING), ("updated_at", ASCENDING)])
+            
+            # Tombstones del feed de cambios (caducan tras TOMBSTONE_TTL_DAYS)
+            if cls.memory_card_tombstones is not None:
+                await cls.memory_card_tombstones.create_index([("created_by", ASCENDING), ("deleted_at", ASCENDING)])
+                await cls.memory_card_tombstones.create_index("deleted_at", expireAfterSeconds=TOMBSTONE_TTL_DAYS * 86400)
+            
+            # Jobs de importación NDJSON (caducan tras IMPORT_TTL_DAYS)
+            if cls.memory_card_imports is not None:
+                await cls.memory_card_imports.create_index("created_at", expireAfterSeconds=IMPORT_TTL_DAYS * 86400)
                 
             print("✅ Índices de MongoDB creados")
         except Exception as e:
@@ -3,10 +3,12 @@ Dependencies Package - FastAPI dependencies
 ==========================================
 """
 
-from .auth import require_user, require_admin, optional_user
+from .auth import require_user, require_admin, optional_user, resolve_principal, hashing_busy
 
 __all__ = [
     "require_user",
     "require_admin",
     "optional_user",
+    "resolve_principal",
+    "hashing_busy",
 ]
\ No newline at end of file
@@ -1,97 +1,125 @@
 """
 Auth Dependencies - Reusable authentication dependencies
 =====================================================
-CORREGIDO: Sin importación circular
+Única capa de autenticación de la API (api.py, routes/*):
+- verificación JWT con el verificador preconfigurado de utils.jwt_utils
+- resolución del usuario con cache de principales (utils.principal_cache)
+- memoización por petición: require_user y require_admin resuelven el
+  usuario una sola vez aunque una ruta dependa de ambos
 """
 
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict, Any
-from datetime import datetime, timedelta
-import jwt
-import os
-from dotenv import load_dotenv
+from typing import Dict, Any, Optional
+
+from jwt import ExpiredSignatureError, InvalidTokenError
 
 # Importar Database directamente
 from database import Database
-
-load_dotenv()
-
-# Configuración JWT
-JWT_SECRET = os.getenv("JWT_SECRET", "firefighter-super-secret-jwt-key-2024")
+from utils.jwt_utils import verifier
+from utils.principal_cache import get_principal, cache_principal
 
 # Security scheme
 security = HTTPBearer()
-
-# Crear instancia local de Database
-db = Database()
+optional_security = HTTPBearer(auto_error=False)
 
 # ============================================================================
-# JWT UTILS LOCALES
+# JWT
 # ============================================================================
 
 def decode_jwt(token: str) -> dict:
     """Decodificar token JWT"""
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-    except jwt.ExpiredSignatureError:
+        return verifier.decode(token)
+    except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expirado")
-    except jwt.InvalidTokenError:
+    except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
 # ============================================================================
-# DEPENDENCIES
+# RESOLUCIÓN DE USUARIO
 # ============================================================================
 
-async def require_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    """Requerir usuario autenticado"""
-    token = credentials.credentials
+async def resolve_principal(token: str) -> Dict[str, Any]:
+    """Token -> {username, role, user_id} (cache de principales o Mongo)"""
     payload = decode_jwt(token)
-    
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token inválido")
-    
+
     username = payload.get("username")
-    user_id = payload.get("user_id")
-    
     if not username:
         raise HTTPException(status_code=401, detail="Token incompleto")
-    
-    # Verificar que el usuario existe en la base de datos
+
+    cached = get_principal(token, payload)
+    if cached:
+        return cached
+
     try:
-        user = await db.users.find_one({"username": username})
-        if not user:
-            user = await db.admin_users.find_one({"username": username})
-        
+        user = await Database.users.find_one({"username": username})
         if not user:
-            raise HTTPException(status_code=401, detail="Usuario no encontrado")
-        
-        # Verificar que el usuario está activo
-        if user.get("status") != "active":
-            raise HTTPException(status_code=401, detail="Cuenta desactivada")
-        
-        return {
-            "username": username,
-            "role": user.get("role", "user"),
-            "user_id": user_id or str(user["_id"])
-        }
-    
+            user = await Database.admin_users.find_one({"username": username})
     except Exception as e:
         print(f"❌ Error verificando usuario: {e}")
         raise HTTPException(status_code=401, detail="Error de autenticación")
 
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuario no encontrado")
+
+    # Verificar que el usuario está activo
+    if user.get("status", "active") != "active":
+        raise HTTPException(status_code=401, detail="Cuenta desactivada")
+
+    principal = {
+        "username": username,
+        "role": user.get("role", "user"),
+        "user_id": str(user["_id"]) if "_id" in user else user.get("id", "")
+    }
+    cache_principal(token, payload, principal)
+    return principal
+
+# ============================================================================
+# DEPENDENCIES
+# ============================================================================
+
+async def require_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Dict[str, Any]:
+    """Requerir usuario autenticado"""
+    # Memoización por petición (p. ej. middleware o dependencias anidadas)
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        principal = await resolve_principal(credentials.credentials)
+        request.state.principal = principal
+    return principal
+
 async def require_admin(user_data: Dict = Depends(require_user)) -> Dict:
     """Requerir usuario administrador"""
     if user_data.get("role") != "admin":
         raise HTTPException(
-            status_code=403, 
+            status_code=403,
             detail="Requiere permisos de administrador"
         )
     return user_data
 
-async def optional_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+async def optional_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[Dict[str, Any]]:
     """Usuario opcional - No lanza error si no hay token"""
+    if credentials is None:
+        return None
     try:
-        return await require_user(credentials)
+        return await require_user(request, credentials)
     except HTTPException:
-        return None
\ No newline at end of file
+        return None
+
+# ============================================================================
+# CONTRASEÑAS
+# ============================================================================
+
+def hashing_busy() -> HTTPException:
+    """503 cuando la cola de hashing de utils.hashing está llena (login, registro, cambio de contraseña)"""
+    return HTTPException(
+        status_code=503,
+        detail="Servidor ocupado, reintente en unos segundos",
+        headers={"Retry-After": "1"}
+    )
@@ -31,6 +31,8 @@ from .card_models import (
     MemoryCardResponse,
     MemoryCardReview,
     MemoryCardReviewRequest,
+    MemoryCardBatchReviewItem,
+    MemoryCardBatchReview,
     BulkMemoryCardCreate,
     MemoryCardStats,
 )
@@ -68,6 +70,8 @@ __all__ = [
     "MemoryCardResponse",
     "MemoryCardReview",
     "MemoryCardReviewRequest",
+    "MemoryCardBatchReviewItem",
+    "MemoryCardBatchReview",
     "BulkMemoryCardCreate",
     "MemoryCardStats",
     # Tokens
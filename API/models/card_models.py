@@ -71,6 +71,22 @@ class MemoryCardReview(BaseModel):
     box_after: int
 
 
+class MemoryCardBatchReviewItem(BaseModel):
+    """
+    Respuesta a una tarjeta dentro de un lote de revisiones.
+    """
+    card_id: str
+    correct: bool
+    reviewed_at: Optional[datetime] = None  # hora del cliente (modo offline)
+
+
+class MemoryCardBatchReview(BaseModel):
+    """
+    Lote de revisiones de una sesión de estudio (POST /memory-cards/reviews:batch).
+    """
+    reviews: List[MemoryCardBatchReviewItem] = Field(..., min_items=1, max_items=500)
+
+
 # AÑADE ESTA CLASE FALTANTE:
 class BulkMemoryCardCreate(BaseModel):
     """
@@ -9,14 +9,16 @@ from datetime import datetime, timedelta
 
 from dependencies.auth import require_user, require_admin
 from database import Database
-from simple_memory_cache import clear_cache
+from simple_memory_cache import clear_cache, cache_user_route
 from utils.jwt_utils import make_jwt, decode_jwt
+from utils.mongo import aggregate_card_stats
 
 router = APIRouter(tags=["admin"])
 db = Database()
 
 
 @router.get("/dashboard/stats")
+@cache_user_route(ttl=30, namespace="dashboard:stats", shared=True)
 async def get_dashboard_stats(user_data: Dict = Depends(require_user)):
     """Estadísticas generales del dashboard (cualquier usuario autenticado)"""
     try:
@@ -114,40 +116,21 @@ async def get_users_stats(user_data: Dict = Depends(require_user)):
 
 
 @router.get("/admin/cards/stats")
+@cache_user_route(ttl=30, namespace="admin:cards:stats", shared=True)
 async def get_cards_stats(user_data: Dict = Depends(require_user)):
     """Estadísticas detalladas de memory cards (cualquier usuario autenticado)"""
     try:
-        cards = await db.memory_cards.find({}).to_list(length=10000)
-
-        total = len(cards)
-        by_box = {}
-        by_category = {}
-        by_difficulty = {}
-        total_reviews = 0
-
-        for card in cards:
-            # By box
-            box = str(card.get("box", 1))
-            by_box[box] = by_box.get(box, 0) + 1
-
-            # By category
-            category = card.get("category", "General")
-            by_category[category] = by_category.get(category, 0) + 1
-
-            # By difficulty
-            difficulty = card.get("difficulty", "medium")
-            by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + 1
-
-            # Reviews
-            total_reviews += card.get("times_reviewed", 0)
+        stats = await aggregate_card_stats(db.memory_cards)
+        total = stats["total"]
+        total_reviews = stats["total_reviews"]
 
         return {
             "ok": True,
             "stats": {
                 "total": total,
-                "by_box": by_box,
-                "by_category": by_category,
-                "by_difficulty": by_difficulty,
+                "by_box": stats["by_box"],
+                "by_category": stats["by_category"],
+                "by_difficulty": stats["by_difficulty"],
                 "total_reviews": total_reviews,
                 "avg_reviews_per_card": round(total_reviews / total, 2)
                 if total > 0
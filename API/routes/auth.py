@@ -5,24 +5,17 @@ Versión compatible con Docker, Swarm y Backoffice
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta
 from uuid import uuid4
 from typing import Optional, Dict, Any
-import bcrypt
 import os
-import jwt
-from utils.jwt_utils import make_jwt, decode_jwt
+from utils.jwt_utils import make_jwt
+from utils.hashing import HashingBusyError, hash_password_async, verify_password_async
+from utils.principal_cache import invalidate_principal
+from dependencies.auth import require_user, require_admin, hashing_busy
 
 router = APIRouter()
 
-# ============================================================================
-# CONFIGURACIÓN
-# ============================================================================
-
-JWT_SECRET = os.getenv("SECRET_KEY", "firefighter-secret-key-2024")
-JWT_EXPIRES_HOURS = int(os.getenv("JWT_EXPIRES_HOURS", "24"))
-
 # ============================================================================
 # PYDANTIC MODELS (importar desde models)
 # ============================================================================
@@ -39,60 +32,8 @@ from models.auth_models import (
 # UTILS
 # ============================================================================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-def verify_password(password: str, pwd_hash: str) -> bool:
-    try:
-        return bcrypt.checkpw(password.encode("utf-8"), pwd_hash.encode("utf-8"))
-    except:
-        return False
-
-def make_jwt(payload: dict) -> str:
-    now = datetime.utcnow()
-    exp = now + timedelta(hours=JWT_EXPIRES_HOURS)
-    to_encode = {**payload, "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
-    return jwt.encode(to_encode, JWT_SECRET, algorithm="HS256")
-
-def decode_jwt(token: str) -> Optional[dict]:
-    try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-    except:
-        return None
-
-# ============================================================================
-# AUTH DEPENDENCY
-# ============================================================================
-
-security = HTTPBearer()
-
-async def require_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    """Dependency para requerir usuario autenticado"""
-    from api import db
-    
-    token = credentials.credentials
-    payload = decode_jwt(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token inválido")
-    
-    username = payload.get("username")
-    user = await db.users.find_one({"username": username})
-    if not user:
-        user = await db.admin_users.find_one({"username": username})
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuario no encontrado")
-    
-    return {
-        "username": username,
-        "role": user.get("role", "user"),
-        "user_id": str(user["_id"])
-    }
-
-async def require_admin(user_data: dict = Depends(require_user)) -> dict:
-    if user_data.get("role") != "admin":
-        raise HTTPException(status_code=403, detail="Requiere permisos de administrador")
-    return user_data
+# bcrypt se ejecuta en el executor acotado de utils.hashing (no bloquea el event loop);
+# con la cola llena las rutas responden hashing_busy() de dependencies.auth
 
 # ============================================================================
 # ENDPOINTS
@@ -129,7 +70,7 @@ async def login(request: LoginRequest):
                 password_field = field
                 break
         
-        if not password_field or not verify_password(password, user_doc[password_field]):
+        if not password_field or not await verify_password_async(password, user_doc[password_field]):
             print(f"❌ Contraseña incorrecta para: {username}")
             raise HTTPException(status_code=401, detail="Credenciales incorrectas")
         
@@ -208,6 +149,8 @@ async def login(request: LoginRequest):
             }
         }
         
+    except HashingBusyError:
+        raise hashing_busy()
     except HTTPException:
         raise
     except Exception as e:
@@ -242,7 +185,7 @@ async def register(request: RegisterRequest):
             "username": username,
             "email": email,
             "name": request.name,
-            "password_hash": hash_password(request.password),
+            "password_hash": await hash_password_async(request.password),
             "role": "user",
             "status": "active",
             "created_at": datetime.utcnow(),
@@ -276,6 +219,8 @@ async def register(request: RegisterRequest):
             }
         }
         
+    except HashingBusyError:
+        raise hashing_busy()
     except HTTPException:
         raise
     except Exception as e:
@@ -348,13 +293,18 @@ async def reset_password(request: PasswordResetConfirm):
             raise HTTPException(status_code=400, detail="Token expirado")
         
         # Actualizar contraseña
-        new_hash = hash_password(request.new_password)
+        new_hash = await hash_password_async(request.new_password)
         
         await db.users.update_one(
             {"_id": reset["user_id"]},
             {"$set": {"password_hash": new_hash}}
         )
         
+        # Contraseña cambiada: descartar los principales cacheados
+        reset_user = await db.users.find_one({"_id": reset["user_id"]}, {"username": 1})
+        if reset_user:
+            invalidate_principal(reset_user.get("username"))
+        
         # Marcar token como usado
         await db.resets.update_one(
             {"token": request.token},
@@ -366,6 +316,8 @@ async def reset_password(request: PasswordResetConfirm):
             "detail": "Contraseña actualizada exitosamente"
         }
         
+    except HashingBusyError:
+        raise hashing_busy()
     except HTTPException:
         raise
     except Exception as e:
@@ -397,11 +349,11 @@ async def change_password(
         
         # Verificar contraseña actual
         password_field = "password_hash" if "password_hash" in user else "password"
-        if not verify_password(request.old_password, user[password_field]):
+        if not await verify_password_async(request.old_password, user[password_field]):
             raise HTTPException(status_code=401, detail="Contraseña actual incorrecta")
         
         # Actualizar contraseña
-        new_hash = hash_password(request.new_password)
+        new_hash = await hash_password_async(request.new_password)
         
         if "admin_users" in str(db.admin_users) and user.get("role") == "admin":
             await db.admin_users.update_one(
@@ -414,11 +366,15 @@ async def change_password(
                 {"$set": {password_field: new_hash}}
             )
         
+        invalidate_principal(username)
+        
         return {
             "ok": True,
             "detail": "Contraseña actualizada exitosamente"
         }
         
+    except HashingBusyError:
+        raise hashing_busy()
     except HTTPException:
         raise
     except Exception as e:
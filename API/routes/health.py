@@ -11,6 +11,8 @@ import psutil
 from dependencies.auth import require_admin
 from database import Database
 from simple_memory_cache import get_cache_stats
+from utils.hashing import hashing_stats
+from utils.principal_cache import principal_cache_stats
 
 
 router = APIRouter(tags=["health"])
@@ -61,7 +63,8 @@ async def detailed_health_check(admin_data: Dict = Depends(require_admin)):
                     "status": "healthy",
                     "entries": cache.get("total_entries", 0),
                     "usage": f"{cache.get('usage_percent', 0)}%"
-                }
+                },
+                "password_hashing": hashing_stats()
             },
             "system": {
                 "cpu_percent": cpu_percent,
@@ -145,6 +148,12 @@ async def get_logs(
 
 
 @router.get("/cache/stats")
-async def cache_stats():
-    """Estadísticas del cache en memoria"""
-    return {"ok": True, "stats": get_cache_stats()}
\ No newline at end of file
+async def cache_stats(admin_data: Dict = Depends(require_admin)):
+    """Estadísticas del cache en memoria (solo admin)"""
+    return {"ok": True, "stats": get_cache_stats(), "principals": principal_cache_stats()}
+
+
+@router.get("/hashing/stats")
+async def password_hashing_stats(admin_data: Dict = Depends(require_admin)):
+    """Métricas del executor de bcrypt: cola, rechazos y tiempos (solo admin)"""
+    return {"ok": True, "stats": hashing_stats()}
@@ -3,10 +3,11 @@ Memory Cards Routes - Leitner System endpoints
 =============================================
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+from pymongo import UpdateOne
 from uuid import uuid4
 
 from models.card_models import (
@@ -14,15 +15,33 @@ from models.card_models import (
     MemoryCardUpdate,
     MemoryCardResponse,
     MemoryCardReview,
+    MemoryCardBatchReview,
     BulkMemoryCardCreate
 )
-# Importar las dependencias de auth de api.py
-from api import require_user, require_admin
+# Dependencias de auth comunes
+from dependencies.auth import require_user, require_admin
 # Importar Database
 from database import Database
+from services.card_import import IMPORTS_COLLECTION, create_import_job, run_ndjson_import, start_import_job
+from simple_memory_cache import async_invalidate_user_routes, cache_user_route
+from utils.mongo import (
+    aggregate_card_stats, cursor_filter, encode_cursor, KEYSET_SORT,
+    changed_since_filter, changes_pipeline, encode_change_token, decode_change_token,
+    record_card_tombstone, TOMBSTONE_TTL_DAYS,
+)
 
 router = APIRouter(tags=["memory-cards"])
 
+# Intervalos de repaso por box (sistema Leitner)
+REVIEW_INTERVALS = {
+    1: timedelta(hours=4),   # Box 1: 4 horas
+    2: timedelta(days=1),    # Box 2: 1 día
+    3: timedelta(days=3),    # Box 3: 3 días
+    4: timedelta(days=7),    # Box 4: 1 semana
+    5: timedelta(days=14)    # Box 5: 2 semanas
+}
+MAX_BOX = 5
+
 def get_memory_cards_collection():
     """Obtener la colección de memory cards con verificación de conexión"""
     if not Database.is_connected():
@@ -44,15 +63,44 @@ def get_memory_cards_collection():
     return Database.memory_cards
 
 
+# Campos seleccionables con ?fields= en el listado
+CARD_FIELDS = {
+    "question", "answer", "category", "difficulty", "tags", "box",
+    "times_reviewed", "times_correct", "times_incorrect", "last_reviewed",
+    "next_review", "created_by", "created_at", "updated_at",
+}
+
+
+def _requested_fields(fields: Optional[str]):
+    """Parsear ?fields= (None = todos); 400 si hay campos desconocidos"""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - CARD_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos: {', '.join(sorted(unknown))}"
+        )
+    return requested
+
+
 @router.get("/memory-cards")
 async def list_memory_cards(
     user_id: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     box: Optional[int] = Query(None),
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por comas"),
+    updated_since: Optional[datetime] = Query(None, description="Solo cartas creadas/modificadas desde esta fecha (UTC)"),
     user_data: Dict = Depends(require_user)
 ):
-    """Obtener memory cards con filtros"""
+    """Obtener memory cards con filtros, paginación por cursor y proyección"""
     try:
+        # Marca de agua para la próxima sincronización incremental (antes de leer)
+        server_time = datetime.utcnow()
+
         # Asegurar conexión
         await Database.ensure_connection()
         
@@ -70,20 +118,48 @@ async def list_memory_cards(
             query["category"] = category
         if box:
             query["box"] = box
+        if updated_since:
+            if updated_since.tzinfo is not None:
+                updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+            query.update(changed_since_filter(updated_since))
+        
+        if cursor:
+            try:
+                query = {"$and": [query, cursor_filter(cursor)]}
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        # Proyección: created_at y _id siempre se leen para calcular el cursor
+        requested = _requested_fields(fields)
+        projection = {f: 1 for f in requested | {"created_at"}} if requested is not None else None
         
         print(f"🔍 Buscando cards con query: {query}")
         
-        cards_cursor = memory_cards.find(query)
-        cards_list = await cards_cursor.to_list(length=1000)
+        # Pedir un documento extra para saber si hay más páginas
+        cards_cursor = memory_cards.find(query, projection).sort(KEYSET_SORT).limit(limit + 1)
+        cards_list = await cards_cursor.to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(cards_list) > limit:
+            cards_list = cards_list[:limit]
+            next_cursor = encode_cursor(cards_list[-1])
         
         # Convert ObjectId to string
         for card in cards_list:
             card['id'] = str(card['_id']) if isinstance(card['_id'], ObjectId) else card['_id']
             card.pop('_id', None)
+            if requested is not None and "created_at" not in requested:
+                card.pop('created_at', None)
         
         print(f"✅ Encontradas {len(cards_list)} cards para usuario: {user_data['username']}")
         
-        return {"ok": True, "cards": cards_list}
+        return {
+            "ok": True,
+            "cards": cards_list,
+            "count": len(cards_list),
+            "next_cursor": next_cursor,
+            "server_time": server_time.isoformat()
+        }
         
     except HTTPException:
         raise
@@ -95,6 +171,29 @@ async def list_memory_cards(
         )
 
 
+def _new_card_doc(card: MemoryCardCreate, username: str) -> Dict[str, Any]:
+    """Documento Mongo de una memory card nueva"""
+    now = datetime.utcnow()
+    return {
+        "_id": str(uuid4()),
+        "question": card.question,
+        "answer": card.answer,
+        "category": card.category,
+        "difficulty": card.difficulty,
+        "tags": card.tags if card.tags else [],
+        "box": card.box,
+        "times_reviewed": 0,
+        "times_correct": 0,
+        "times_incorrect": 0,
+        "last_reviewed": None,
+        # Calcular next_review basado en el box (sistema Leitner)
+        "next_review": now + REVIEW_INTERVALS.get(card.box, timedelta(days=1)),
+        "created_by": username,
+        "created_at": now,
+        "updated_at": None
+    }
+
+
 @router.post("/memory-cards")
 async def create_memory_card(
     card: MemoryCardCreate,
@@ -107,36 +206,10 @@ async def create_memory_card(
         
         memory_cards = get_memory_cards_collection()
         
-        # Calcular next_review basado en el box (sistema Leitner)
-        review_intervals = {
-            1: timedelta(hours=4),   # Box 1: 4 horas
-            2: timedelta(days=1),    # Box 2: 1 día
-            3: timedelta(days=3),    # Box 3: 3 días
-            4: timedelta(days=7),    # Box 4: 1 semana
-            5: timedelta(days=14)    # Box 5: 2 semanas
-        }
-        
-        next_review = datetime.utcnow() + review_intervals.get(card.box, timedelta(days=1))
-        
-        card_doc = {
-            "_id": str(uuid4()),
-            "question": card.question,
-            "answer": card.answer,
-            "category": card.category,
-            "difficulty": card.difficulty,
-            "tags": card.tags if card.tags else [],
-            "box": card.box,
-            "times_reviewed": 0,
-            "times_correct": 0,
-            "times_incorrect": 0,
-            "last_reviewed": None,
-            "next_review": next_review,
-            "created_by": user_data["username"],
-            "created_at": datetime.utcnow(),
-            "updated_at": None
-        }
+        card_doc = _new_card_doc(card, user_data["username"])
         
         result = await memory_cards.insert_one(card_doc)
+        await async_invalidate_user_routes(user_data["username"])
         
         card_doc['id'] = card_doc.pop('_id')
         
@@ -170,39 +243,12 @@ async def create_bulk_memory_cards(
         
         cards_docs = []
         
-        # Calcular next_review basado en el box (sistema Leitner)
-        review_intervals = {
-            1: timedelta(hours=4),   # Box 1: 4 horas
-            2: timedelta(days=1),    # Box 2: 1 día
-            3: timedelta(days=3),    # Box 3: 3 días
-            4: timedelta(days=7),    # Box 4: 1 semana
-            5: timedelta(days=14)    # Box 5: 2 semanas
-        }
-        
         for card in bulk.cards:
-            next_review = datetime.utcnow() + review_intervals.get(card.box, timedelta(days=1))
-            
-            card_doc = {
-                "_id": str(uuid4()),
-                "question": card.question,
-                "answer": card.answer,
-                "category": card.category,
-                "difficulty": card.difficulty,
-                "tags": card.tags if card.tags else [],
-                "box": card.box,
-                "times_reviewed": 0,
-                "times_correct": 0,
-                "times_incorrect": 0,
-                "last_reviewed": None,
-                "next_review": next_review,
-                "created_by": user_data["username"],
-                "created_at": datetime.utcnow(),
-                "updated_at": None
-            }
-            cards_docs.append(card_doc)
+            cards_docs.append(_new_card_doc(card, user_data["username"]))
         
         if cards_docs:
             result = await memory_cards.insert_many(cards_docs)
+            await async_invalidate_user_routes(user_data["username"])
             print(f"✅ {len(cards_docs)} cards creadas para usuario: {user_data['username']}")
             
         return {
@@ -221,6 +267,443 @@ async def create_bulk_memory_cards(
         )
 
 
+# Tipos aceptados por la importación en streaming
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "text/plain")
+
+
+def _is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_CONTENT_TYPES
+
+
+def _has_body(request: Request) -> bool:
+    return request.headers.get("content-length", "0") != "0" or "transfer-encoding" in request.headers
+
+
+async def _receive_import(request: Request, jobs, job_id: str, username: str) -> Dict:
+    """Leer el cuerpo NDJSON de un job ya creado (vuelve al terminar de recibirlo)"""
+    await run_ndjson_import(
+        request.stream(),
+        get_memory_cards_collection(),
+        jobs,
+        job_id,
+        build_doc=lambda card: _new_card_doc(card, username),
+        on_done=lambda: async_invalidate_user_routes(username)
+    )
+    
+    print(f"📥 Importación {job_id} recibida para usuario: {username}")
+    
+    return {
+        "ok": True,
+        "job_id": job_id,
+        "status_url": f"/api/memory-cards/imports/{job_id}"
+    }
+
+
+@router.post("/memory-cards/imports", status_code=202)
+async def import_memory_cards(request: Request, user_data: Dict = Depends(require_user)):
+    """
+    Importación masiva en streaming, en dos pasos:
+    sin cuerpo, crea el job (pending) y devuelve su job_id al momento; el
+    cuerpo NDJSON (una carta por línea) se sube después con
+    PUT /memory-cards/imports/{job_id} y el progreso (recibidas, insertadas,
+    errores por línea) se consulta en /memory-cards/imports/{job_id} durante
+    toda la subida.
+    Con cuerpo NDJSON se hace todo en una petición (el job_id llega al
+    terminar de recibir el cuerpo).
+    """
+    has_body = _has_body(request)
+    if has_body and not _is_ndjson(request):
+        raise HTTPException(status_code=415, detail="Se espera application/x-ndjson (una carta JSON por línea)")
+    
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        jobs = Database.db[IMPORTS_COLLECTION]
+        username = user_data["username"]
+        
+        if not has_body:
+            job = await create_import_job(jobs, username, status="pending")
+            print(f"📥 Importación {job['_id']} creada para usuario: {username}")
+            return {
+                "ok": True,
+                "job_id": job["_id"],
+                "upload_url": f"/api/memory-cards/imports/{job['_id']}",
+                "status_url": f"/api/memory-cards/imports/{job['_id']}"
+            }
+        
+        job = await create_import_job(jobs, username)
+        return await _receive_import(request, jobs, job["_id"], username)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error en importación: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error importando memory cards: {str(e)}"
+        )
+
+
+@router.put("/memory-cards/imports/{job_id}", status_code=202)
+async def upload_memory_card_import(job_id: str, request: Request, user_data: Dict = Depends(require_user)):
+    """Subir el cuerpo NDJSON de una importación creada con POST /memory-cards/imports"""
+    if not _is_ndjson(request):
+        raise HTTPException(status_code=415, detail="Se espera application/x-ndjson (una carta JSON por línea)")
+    
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        jobs = Database.db[IMPORTS_COLLECTION]
+        username = user_data["username"]
+        
+        job = await jobs.find_one({"_id": job_id})
+        if not job:
+            raise HTTPException(status_code=404, detail="Importación no encontrada")
+        
+        # Verificar permisos
+        if job.get("created_by") != username:
+            raise HTTPException(status_code=403, detail="Acceso denegado")
+        
+        if not await start_import_job(jobs, job_id):
+            raise HTTPException(status_code=409, detail="La importación ya recibió su cuerpo")
+        
+        return await _receive_import(request, jobs, job_id, username)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error en importación: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error importando memory cards: {str(e)}"
+        )
+
+
+@router.get("/memory-cards/imports/{job_id}")
+async def get_memory_card_import(job_id: str, user_data: Dict = Depends(require_user)):
+    """Progreso de una importación NDJSON"""
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        job = await Database.db[IMPORTS_COLLECTION].find_one({"_id": job_id})
+        if not job:
+            raise HTTPException(status_code=404, detail="Importación no encontrada")
+        
+        # Verificar permisos
+        if user_data.get('role') != 'admin' and job.get("created_by") != user_data["username"]:
+            raise HTTPException(status_code=403, detail="Acceso denegado")
+        
+        job["id"] = job.pop("_id")
+        return {"ok": True, "job": job}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error obteniendo importación: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error obteniendo importación: {str(e)}"
+        )
+
+
+@router.get("/memory-cards/stats")
+@cache_user_route(ttl=60, namespace="memory-cards:stats")
+async def get_memory_cards_stats(user_data: Dict = Depends(require_user)):
+    """Obtener estadísticas de memory cards"""
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        memory_cards = get_memory_cards_collection()
+        
+        query = {}
+        if user_data.get('role') != 'admin':
+            query["created_by"] = user_data["username"]
+        
+        stats = await aggregate_card_stats(memory_cards, query)
+        total_cards = stats["total"]
+        total_reviews = stats["total_reviews"]
+        total_correct = stats["total_correct"]
+        
+        accuracy_rate = (total_correct / total_reviews * 100) if total_reviews > 0 else 0
+        
+        print(f"📊 Stats para {user_data['username']}: {total_cards} cards, {total_reviews} reviews")
+        
+        return {
+            "ok": True,
+            "stats": {
+                "total_cards": total_cards,
+                "by_box": stats["by_box"],
+                "by_category": stats["by_category"],
+                "by_difficulty": stats["by_difficulty"],
+                "total_reviews": total_reviews,
+                "accuracy_rate": round(accuracy_rate, 2)
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error obteniendo stats: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error obteniendo estadísticas: {str(e)}"
+        )
+
+
+@router.get("/memory-cards/due")
+async def get_due_memory_cards(user_data: Dict = Depends(require_user)):
+    """Obtener cards pendientes de review"""
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        memory_cards = get_memory_cards_collection()
+        
+        query = {
+            "created_by": user_data["username"],
+            "$or": [
+                {"last_reviewed": None},
+                {"next_review": {"$lte": datetime.utcnow()}}
+            ]
+        }
+        
+        cards_cursor = memory_cards.find(query).sort("box", 1).limit(50)
+        cards_list = await cards_cursor.to_list(length=50)
+        
+        # Convert ObjectId to string
+        for card in cards_list:
+            card['id'] = str(card['_id']) if isinstance(card['_id'], ObjectId) else card['_id']
+            card.pop('_id', None)
+        
+        print(f"📅 Cards pendientes para {user_data['username']}: {len(cards_list)}")
+        
+        return {
+            "ok": True,
+            "cards": cards_list,
+            "count": len(cards_list)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error obteniendo cards due: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error obteniendo cards pendientes: {str(e)}"
+        )
+
+
+# Margen para escrituras en vuelo: el token de "al día" se queda este tiempo atrás
+CHANGES_SAFETY_WINDOW = timedelta(seconds=5)
+
+
+@router.get("/memory-cards/changes")
+async def list_memory_card_changes(
+    since: Optional[str] = Query(None, description="Token devuelto por la llamada anterior (vacío = todo)"),
+    user_id: Optional[str] = Query(None),
+    limit: int = Query(500, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Campos separados por comas"),
+    user_data: Dict = Depends(require_user)
+):
+    """
+    Feed de cambios: upserts y borrados desde `since`, con token para continuar.
+    Entrega al menos una vez (los clientes deben aplicar los cambios de forma idempotente).
+    """
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        memory_cards = get_memory_cards_collection()
+        server_time = datetime.utcnow()
+        
+        match = {}
+        if user_data.get('role') != 'admin':
+            match["created_by"] = user_data["username"]
+        elif user_id:
+            match["created_by"] = user_id
+        
+        since_at, last_id = None, None
+        if since:
+            try:
+                since_at, last_id = decode_change_token(since)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        # Tombstones ya caducados: el cliente debe descartar su réplica y recargar
+        reset = since_at is not None and since_at < server_time - timedelta(days=TOMBSTONE_TTL_DAYS)
+        if reset:
+            since_at, last_id = None, None
+        
+        requested = _requested_fields(fields)
+        projection = {f: 1 for f in requested} if requested is not None else None
+        
+        pipeline = changes_pipeline(match, since_at, last_id, limit + 1, projection)
+        rows = await memory_cards.aggregate(pipeline).to_list(length=limit + 1)
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        # Posición del último elemento antes de proyectar/quitar campos de las filas
+        if has_more:
+            next_token = encode_change_token(rows[-1].get("changed_at"), rows[-1]["_id"])
+        elif since_at is not None and since_at > server_time - CHANGES_SAFETY_WINDOW:
+            next_token = encode_change_token(since_at, last_id)
+        else:
+            next_token = encode_change_token(server_time - CHANGES_SAFETY_WINDOW)
+        
+        upserts, deletes = [], []
+        for row in rows:
+            card_id = str(row['_id']) if isinstance(row['_id'], ObjectId) else row['_id']
+            if row.get("op") == "delete":
+                deletes.append({"id": card_id, "deleted_at": row.get("changed_at")})
+                continue
+            row.pop('_id', None)
+            row.pop('op', None)
+            if requested is not None:
+                for field in ("created_at", "updated_at", "changed_at"):
+                    if field not in requested:
+                        row.pop(field, None)
+            row['id'] = card_id
+            upserts.append(row)
+        
+        return {
+            "ok": True,
+            "upserts": upserts,
+            "deletes": deletes,
+            "next": next_token,
+            "has_more": has_more,
+            "reset": reset
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error obteniendo cambios: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error obteniendo cambios de memory cards: {str(e)}"
+        )
+
+
+def _review_time(item, now: datetime) -> datetime:
+    """Hora de la review del cliente en UTC naive (como guarda Mongo), nunca en el futuro"""
+    if item.reviewed_at is None:
+        return now
+    value = item.reviewed_at
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(value, now)
+
+
+@router.post("/memory-cards/reviews:batch")
+async def review_memory_cards_batch(
+    batch: MemoryCardBatchReview,
+    user_data: Dict = Depends(require_user)
+):
+    """Registrar las reviews de una sesión completa con un único bulk_write"""
+    try:
+        # Asegurar conexión
+        await Database.ensure_connection()
+        
+        memory_cards = get_memory_cards_collection()
+        now = datetime.utcnow()
+        
+        # Agrupar por card respetando el orden de respuesta (varias reviews de la misma card)
+        reviews_by_card: Dict[str, List] = {}
+        for item in batch.reviews:
+            reviews_by_card.setdefault(item.card_id, []).append(item)
+        
+        # Una sola lectura para todas las cards del lote (ids string y ObjectId legacy)
+        lookup_ids = []
+        for card_id in reviews_by_card:
+            lookup_ids.append(card_id)
+            if ObjectId.is_valid(card_id):
+                lookup_ids.append(ObjectId(card_id))
+        cards_cursor = memory_cards.find(
+            {"_id": {"$in": lookup_ids}},
+            {"box": 1, "created_by": 1}
+        )
+        cards = {str(card["_id"]): card for card in await cards_cursor.to_list(length=len(lookup_ids))}
+        
+        operations = []
+        results = []
+        owners = set()
+        
+        for card_id, items in reviews_by_card.items():
+            card = cards.get(card_id)
+            if not card:
+                results.append({"card_id": card_id, "ok": False, "detail": "Card no encontrado"})
+                continue
+            if user_data.get('role') != 'admin' and card.get("created_by") != user_data["username"]:
+                results.append({"card_id": card_id, "ok": False, "detail": "Acceso denegado"})
+                continue
+            
+            items = sorted(items, key=lambda item: _review_time(item, now))
+            box = card.get("box", 1)
+            correct = 0
+            for item in items:
+                if item.correct:
+                    box = min(box + 1, MAX_BOX)
+                    correct += 1
+                else:
+                    box = max(box - 1, 1)
+            
+            last_reviewed = _review_time(items[-1], now)
+            next_review = last_reviewed + REVIEW_INTERVALS.get(box, timedelta(days=1))
+            
+            operations.append(UpdateOne(
+                {"_id": card["_id"]},
+                {
+                    "$inc": {
+                        "times_reviewed": len(items),
+                        "times_correct": correct,
+                        "times_incorrect": len(items) - correct
+                    },
+                    "$set": {
+                        "box": box,
+                        "next_review": next_review,
+                        "last_reviewed": last_reviewed,
+                        "updated_at": now
+                    }
+                }
+            ))
+            owners.add(card.get("created_by"))
+            results.append({
+                "card_id": card_id,
+                "ok": True,
+                "new_box": box,
+                "next_review": next_review,
+                "reviews": len(items)
+            })
+        
+        if operations:
+            result = await memory_cards.bulk_write(operations, ordered=False)
+            if result.matched_count > 0:
+                await async_invalidate_user_routes(*owners)
+        
+        print(f"✅ Batch de reviews: {len(operations)}/{len(reviews_by_card)} cards actualizadas por {user_data['username']}")
+        
+        return {
+            "ok": True,
+            "applied": len(operations),
+            "results": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error en batch de reviews: {e}")
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error registrando reviews: {str(e)}"
+        )
+
+
 @router.get("/memory-cards/{card_id}")
 async def get_memory_card(card_id: str, user_data: Dict = Depends(require_user)):
     """Obtener detalle de un memory card"""
@@ -297,14 +780,7 @@ async def update_memory_card(
         if updates.box is not None:
             update_doc["$set"]["box"] = updates.box
             # Actualizar next_review según el nuevo box
-            review_intervals = {
-                1: timedelta(hours=4),
-                2: timedelta(days=1),
-                3: timedelta(days=3),
-                4: timedelta(days=7),
-                5: timedelta(days=14)
-            }
-            next_review = datetime.utcnow() + review_intervals.get(updates.box, timedelta(days=1))
+            next_review = datetime.utcnow() + REVIEW_INTERVALS.get(updates.box, timedelta(days=1))
             update_doc["$set"]["next_review"] = next_review
         if updates.difficulty is not None:
             update_doc["$set"]["difficulty"] = updates.difficulty
@@ -318,6 +794,8 @@ async def update_memory_card(
             {"_id": object_id}, 
             update_doc
         )
+        if result.matched_count > 0:
+            await async_invalidate_user_routes(card.get("created_by"))
         
         if result.modified_count == 0:
             print(f"⚠️  No se modificó ningún documento para card_id: {card_id}")
@@ -361,9 +839,10 @@ async def delete_memory_card(card_id: str, user_data: Dict = Depends(require_use
             raise HTTPException(status_code=403, detail="Acceso denegado")
         
         result = await memory_cards.delete_one({"_id": object_id})
-        
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Card no encontrado")
+        await async_invalidate_user_routes(card.get("created_by"))
+        await record_card_tombstone(Database.db, object_id, card.get("created_by"))
         
         print(f"✅ Card eliminada: {card_id} por usuario: {user_data['username']}")
         
@@ -413,7 +892,8 @@ async def review_memory_card(
                 "times_reviewed": 1
             },
             "$set": {
-                "last_reviewed": datetime.utcnow()
+                "last_reviewed": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
             }
         }
         
@@ -426,19 +906,12 @@ async def review_memory_card(
         # Mover box según Leitner y calcular nuevo next_review
         current_box = card.get("box", 1)
         if review.correct:
-            new_box = min(current_box + 1, 5)  # Max box 5
+            new_box = min(current_box + 1, MAX_BOX)
         else:
-            new_box = max(current_box - 1, 1)  # Min box 1
+            new_box = max(current_box - 1, 1)
         
         # Calcular nuevo next_review basado en el nuevo box
-        review_intervals = {
-            1: timedelta(hours=4),
-            2: timedelta(days=1),
-            3: timedelta(days=3),
-            4: timedelta(days=7),
-            5: timedelta(days=14)
-        }
-        next_review = datetime.utcnow() + review_intervals.get(new_box, timedelta(days=1))
+        next_review = datetime.utcnow() + REVIEW_INTERVALS.get(new_box, timedelta(days=1))
         
         update_doc["$set"]["box"] = new_box
         update_doc["$set"]["next_review"] = next_review
@@ -447,6 +920,8 @@ async def review_memory_card(
             {"_id": object_id},
             update_doc
         )
+        if result.matched_count > 0:
+            await async_invalidate_user_routes(card.get("created_by"))
         
         if result.modified_count == 0:
             print(f"⚠️  No se pudo actualizar review para card_id: {card_id}")
@@ -469,112 +944,3 @@ async def review_memory_card(
             status_code=500, 
             detail=f"Error registrando review: {str(e)}"
         )
-
-
-@router.get("/memory-cards/stats")
-async def get_memory_cards_stats(user_data: Dict = Depends(require_user)):
-    """Obtener estadísticas de memory cards"""
-    try:
-        # Asegurar conexión
-        await Database.ensure_connection()
-        
-        memory_cards = get_memory_cards_collection()
-        
-        query = {}
-        if user_data.get('role') != 'admin':
-            query["created_by"] = user_data["username"]
-        
-        cards_cursor = memory_cards.find(query)
-        cards = await cards_cursor.to_list(length=10000)
-        
-        total_cards = len(cards)
-        by_box = {}
-        by_category = {}
-        by_difficulty = {}
-        total_reviews = 0
-        total_correct = 0
-        
-        for card in cards:
-            # By box
-            box = str(card.get("box", 1))
-            by_box[box] = by_box.get(box, 0) + 1
-            
-            # By category
-            category = card.get("category", "General")
-            by_category[category] = by_category.get(category, 0) + 1
-            
-            # By difficulty
-            difficulty = card.get("difficulty", "medium")
-            by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + 1
-            
-            # Reviews
-            total_reviews += card.get("times_reviewed", 0)
-            total_correct += card.get("times_correct", 0)
-        
-        accuracy_rate = (total_correct / total_reviews * 100) if total_reviews > 0 else 0
-        
-        print(f"📊 Stats para {user_data['username']}: {total_cards} cards, {total_reviews} reviews")
-        
-        return {
-            "ok": True,
-            "stats": {
-                "total_cards": total_cards,
-                "by_box": by_box,
-                "by_category": by_category,
-                "by_difficulty": by_difficulty,
-                "total_reviews": total_reviews,
-                "accuracy_rate": round(accuracy_rate, 2)
-            }
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"❌ Error obteniendo stats: {e}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Error obteniendo estadísticas: {str(e)}"
-        )
-
-
-@router.get("/memory-cards/due")
-async def get_due_memory_cards(user_data: Dict = Depends(require_user)):
-    """Obtener cards pendientes de review"""
-    try:
-        # Asegurar conexión
-        await Database.ensure_connection()
-        
-        memory_cards = get_memory_cards_collection()
-        
-        query = {
-            "created_by": user_data["username"],
-            "$or": [
-                {"last_reviewed": None},
-                {"next_review": {"$lte": datetime.utcnow()}}
-            ]
-        }
-        
-        cards_cursor = memory_cards.find(query).sort("box", 1).limit(50)
-        cards_list = await cards_cursor.to_list(length=50)
-        
-        # Convert ObjectId to string
-        for card in cards_list:
-            card['id'] = str(card['_id']) if isinstance(card['_id'], ObjectId) else card['_id']
-            card.pop('_id', None)
-        
-        print(f"📅 Cards pendientes para {user_data['username']}: {len(cards_list)}")
-        
-        return {
-            "ok": True,
-            "cards": cards_list,
-            "count": len(cards_list)
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"❌ Error obteniendo cards due: {e}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Error obteniendo cards pendientes: {str(e)}"
-        )
\ No newline at end of file
@@ -16,6 +16,7 @@ import io
 
 # IMPORTAR Database directamente (no desde api.py)
 from database import Database
+from utils.principal_cache import invalidate_principal
 
 router = APIRouter()
 
@@ -36,53 +37,10 @@ def serialize_doc(doc):
     return doc
 
 # ============================================================================
-# AUTH DEPENDENCIES LOCALES - SIN IMPORTACIÓN CIRCULAR
+# AUTH DEPENDENCIES (capa común en dependencies/auth.py)
 # ============================================================================
 
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import jwt
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-JWT_SECRET = os.getenv("JWT_SECRET", "firefighter-super-secret-jwt-key-2024")
-security = HTTPBearer()
-
-def decode_jwt_local(token: str):
-    try:
-        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-    except Exception:
-        return None
-
-async def require_user_local(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> Dict[str, Any]:
-    token = credentials.credentials
-    payload = decode_jwt_local(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token inválido")
-
-    username = payload.get("username")
-
-    # Buscar usuario usando Database (colecciones ya inicializadas en connect_db)
-    user = await Database.users.find_one({"username": username})
-    if not user:
-        user = await Database.admin_users.find_one({"username": username})
-
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuario no encontrado")
-
-    return {
-        "username": username,
-        "role": user.get("role", "user"),
-        "user_id": str(user["_id"]) if "_id" in user else user.get("id", ""),
-    }
-
-async def require_admin_local(user_data: dict = Depends(require_user_local)) -> dict:
-    if user_data.get("role") != "admin":
-        raise HTTPException(status_code=403, detail="Requiere permisos de administrador")
-    return user_data
+from dependencies.auth import require_user, require_admin
 
 # ============================================================================
 # HELPERS MFA
@@ -128,7 +86,7 @@ async def _update_user_any_collection(user, update: Dict[str, Any]):
 # ============================================================================
 
 @router.post("/users/{user_id}/mfa/generate", response_model=Dict[str, Any])
-async def generate_mfa_secret(user_id: str, user_data: Dict = Depends(require_user_local)):
+async def generate_mfa_secret(user_id: str, user_data: Dict = Depends(require_user)):
     """
     Generar secreto MFA + QR + clave manual.
     Endpoint esperado por el backoffice: POST /api/users/{user_id}/mfa/generate
@@ -168,7 +126,7 @@ async def generate_mfa_secret(user_id: str, user_data: Dict = Depends(require_us
     }
 
 @router.post("/users/{user_id}/mfa/verify-setup", response_model=Dict[str, Any])
-async def verify_mfa_setup(user_id: str, body: Dict[str, Any], user_data: Dict = Depends(require_user_local)):
+async def verify_mfa_setup(user_id: str, body: Dict[str, Any], user_data: Dict = Depends(require_user)):
     """
     Verificar código MFA durante el setup.
     Endpoint esperado: POST /api/users/{user_id}/mfa/verify-setup
@@ -243,7 +201,7 @@ async def verify_mfa(user_id: str, body: Dict[str, Any]):
     return {"ok": bool(totp.verify(code))}
 
 @router.post("/users/{user_id}/mfa/enable", response_model=Dict[str, Any])
-async def enable_mfa(user_id: str, user_data: Dict = Depends(require_user_local)):
+async def enable_mfa(user_id: str, user_data: Dict = Depends(require_user)):
     """
     Marcar MFA como habilitado (usado por backoffice para asegurar estado).
     Endpoint esperado: POST /api/users/{user_id}/mfa/enable
@@ -263,7 +221,7 @@ async def enable_mfa(user_id: str, user_data: Dict = Depends(require_user_local)
     return {"ok": True}
 
 @router.post("/users/{user_id}/mfa/disable", response_model=Dict[str, Any])
-async def disable_mfa(user_id: str, user_data: Dict = Depends(require_user_local)):
+async def disable_mfa(user_id: str, user_data: Dict = Depends(require_user)):
     """
     Deshabilitar MFA para el usuario.
     Endpoint esperado: POST /api/users/{user_id}/mfa/disable
@@ -288,7 +246,7 @@ async def disable_mfa(user_id: str, user_data: Dict = Depends(require_user_local
 # ============================================================================
 
 @router.get("/users", response_model=Dict[str, Any])
-async def list_users(user_data: Dict = Depends(require_user_local)):
+async def list_users(user_data: Dict = Depends(require_user)):
     """Listar todos los usuarios (cualquier usuario autenticado)"""
     try:
         print(f"🔍 GET /api/users - User: {user_data['username']}")
@@ -330,7 +288,7 @@ async def list_users(user_data: Dict = Depends(require_user_local)):
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.get("/users/{userid}", response_model=Dict[str, Any])
-async def get_user_by_any(userid: str, userdata: Dict = Depends(require_user_local)):
+async def get_user_by_any(userid: str, userdata: Dict = Depends(require_user)):
     """Obtener un usuario por id/username (cualquier usuario autenticado)"""
     try:
         user = None
@@ -368,7 +326,7 @@ async def get_user_by_any(userid: str, userdata: Dict = Depends(require_user_loc
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.get("/users/me", response_model=Dict[str, Any])
-async def get_current_user(user_data: Dict = Depends(require_user_local)):
+async def get_current_user(user_data: Dict = Depends(require_user)):
     """Obtener información del usuario actual"""
     try:
         user_id = user_data.get("user_id")
@@ -396,7 +354,7 @@ async def get_current_user(user_data: Dict = Depends(require_user_local)):
 async def update_user(
     user_id: str,
     updates: Dict[str, Any],
-    user_data: Dict = Depends(require_user_local),
+    user_data: Dict = Depends(require_user),
 ):
     """Actualizar usuario (propio o admin)"""
     try:
@@ -432,6 +390,12 @@ async def update_user(
                 status_code=404, detail="Usuario no encontrado o sin cambios"
             )
 
+        # Rol o estado cambiados: descartar los principales cacheados
+        if "role" in update_dict or "status" in update_dict:
+            updated = await Database.users.find_one({"_id": oid}, {"username": 1})
+            if updated:
+                invalidate_principal(updated.get("username"))
+
         return {"ok": True, "message": "Usuario actualizado"}
     except HTTPException:
         raise
@@ -440,7 +404,7 @@ async def update_user(
         raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
 
 @router.delete("/users/{user_id}", response_model=Dict[str, Any])
-async def delete_user(user_id: str, admin_data: Dict = Depends(require_admin_local)):
+async def delete_user(user_id: str, admin_data: Dict = Depends(require_admin)):
     """Eliminar usuario de la base de datos (solo admin, borrado real)."""
     try:
         # No permitir que el admin se borre a sí mismo
@@ -469,6 +433,8 @@ async def delete_user(user_id: str, admin_data: Dict = Depends(require_admin_loc
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
+        invalidate_principal(user.get("username"))
+
         return {"ok": True, "message": "Usuario eliminado de la base de datos"}
 
     except HTTPException:
@@ -480,7 +446,7 @@ async def delete_user(user_id: str, admin_data: Dict = Depends(require_admin_loc
 
 @router.get("/users/{user_id}/progress", response_model=Dict[str, Any])
 async def get_user_progress(
-    user_id: str, user_data: Dict = Depends(require_user_local)
+    user_id: str, user_data: Dict = Depends(require_user)
 ):
     """Obtener progreso Leitner del usuario (propio o admin)"""
     try:
@@ -0,0 +1,233 @@
+"""
+Card Import - Importación masiva de memory cards en NDJSON
+==========================================================
+Una carta JSON por línea. El cuerpo se lee en streaming y cada línea se valida
+al llegar; las cartas válidas se agrupan en bloques que otra tarea inserta con
+insert_many(ordered=False). Entre lector e inserción hay una cola acotada, así
+que la memoria no depende del tamaño del fichero.
+
+El progreso (recibidas, insertadas, fallidas y los primeros errores por línea)
+se guarda en la colección memory_card_imports para consultarlo desde cualquier
+worker.
+
+Variables de entorno:
+- CARD_IMPORT_CHUNK_SIZE: cartas por insert_many (por defecto 1000)
+- CARD_IMPORT_MAX_ROWS: líneas máximas por importación (por defecto 100000)
+"""
+
+import asyncio
+import inspect
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from models.card_models import MemoryCardCreate
+
+IMPORTS_COLLECTION = "memory_card_imports"
+IMPORT_TTL_DAYS = 7
+
+IMPORT_CHUNK_SIZE = int(os.getenv("CARD_IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ROWS = int(os.getenv("CARD_IMPORT_MAX_ROWS", "100000"))
+IMPORT_MAX_LINE_BYTES = 64 * 1024
+IMPORT_MAX_ERRORS = 200     # errores por línea que se guardan en el job
+IMPORT_QUEUE_CHUNKS = 4     # bloques validados esperando a insert_many
+
+# Tareas de inserción en curso (referencia fuerte: sobreviven a la petición)
+_running_imports = set()
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """(nº de línea, contenido) de un cuerpo NDJSON recibido por trozos"""
+    buffer = b""
+    line_no = 0
+    discarding = False  # resto de una línea demasiado larga ya notificada
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if discarding:
+                discarding = False
+                continue
+            line_no += 1
+            yield line_no, line
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            if not discarding:
+                # Se entrega truncada (sigue superando el límite) para que falle la validación
+                line_no += 1
+                discarding = True
+                yield line_no, buffer[:IMPORT_MAX_LINE_BYTES + 1]
+            buffer = b""
+    if buffer.strip() and not discarding:
+        yield line_no + 1, buffer
+
+
+def parse_card_line(line: bytes) -> MemoryCardCreate:
+    """Validar una línea NDJSON (ValueError con el motivo si no es válida)"""
+    if len(line) > IMPORT_MAX_LINE_BYTES:
+        raise ValueError("Línea demasiado larga")
+    try:
+        data = json.loads(line)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"JSON inválido: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Cada línea debe ser un objeto JSON")
+    try:
+        return MemoryCardCreate(**data)
+    except ValidationError as e:
+        first = e.errors()[0]
+        field = ".".join(str(part) for part in first.get("loc", ()))
+        raise ValueError(f"{field}: {first.get('msg')}" if field else first.get("msg"))
+
+
+async def create_import_job(jobs, username: str, status: str = "running") -> Dict[str, Any]:
+    """Crear el job; con status="pending" queda a la espera de su cuerpo (start_import_job)"""
+    now = datetime.utcnow()
+    job = {
+        "_id": str(uuid4()),
+        "created_by": username,
+        "status": status,
+        "received": 0,
+        "inserted": 0,
+        "failed": 0,
+        "errors": [],
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+    }
+    await jobs.insert_one(job)
+    return job
+
+
+async def start_import_job(jobs, job_id: str) -> bool:
+    """Pasar un job pending a running (False si ya recibió cuerpo o no existe)"""
+    result = await jobs.update_one(
+        {"_id": job_id, "status": "pending"},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}}
+    )
+    return result.modified_count == 1
+
+
+async def _record_progress(jobs, job_id: str, received: int, inserted: int, errors: List[Dict[str, Any]]) -> None:
+    update: Dict[str, Any] = {
+        "$inc": {"received": received, "inserted": inserted, "failed": len(errors)},
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+    if errors:
+        update["$push"] = {"errors": {"$each": errors[:IMPORT_MAX_ERRORS], "$slice": IMPORT_MAX_ERRORS}}
+    await jobs.update_one({"_id": job_id}, update)
+
+
+async def _finish_job(jobs, job_id: str, status: str, detail: Optional[str] = None) -> None:
+    now = datetime.utcnow()
+    fields = {"status": status, "updated_at": now, "finished_at": now}
+    if detail:
+        fields["detail"] = detail
+    await jobs.update_one({"_id": job_id}, {"$set": fields})
+
+
+async def _insert_chunks(queue: asyncio.Queue, cards, jobs, job_id: str, on_done: Callable[[], Any]) -> None:
+    """Consumir bloques validados de la cola e insertarlos (hasta recibir None); on_done puede ser async"""
+    status, detail = "done", None
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if chunk.get("aborted"):
+                status, detail = "failed", chunk["aborted"]
+                break
+            docs, lines, errors = chunk["docs"], chunk["lines"], chunk["errors"]
+            inserted = 0
+            if docs:
+                try:
+                    result = await cards.insert_many(docs, ordered=False)
+                    inserted = len(result.inserted_ids)
+                except BulkWriteError as e:
+                    details = e.details or {}
+                    inserted = details.get("nInserted", 0)
+                    for err in details.get("writeErrors", []):
+                        errors.append({"line": lines[err.get("index", 0)], "error": err.get("errmsg", "Error insertando")})
+            await _record_progress(jobs, job_id, chunk["received"], inserted, errors)
+    except Exception as e:
+        status, detail = "failed", str(e)
+    finally:
+        try:
+            await _finish_job(jobs, job_id, status, detail)
+        finally:
+            done = on_done()
+            if inspect.isawaitable(done):
+                await done
+
+
+async def _read_chunks(
+    body: AsyncIterator[bytes],
+    queue: asyncio.Queue,
+    build_doc: Callable[[MemoryCardCreate], Dict[str, Any]],
+) -> None:
+    """Leer y validar el cuerpo NDJSON, encolando bloques (termina con None o aborted)"""
+    def new_chunk() -> Dict[str, Any]:
+        return {"docs": [], "lines": [], "errors": [], "received": 0}
+
+    chunk = new_chunk()
+    rows = 0
+    try:
+        async for line_no, line in iter_ndjson_lines(body):
+            if not line.strip():
+                continue
+            rows += 1
+            if rows > IMPORT_MAX_ROWS:
+                await queue.put(chunk)
+                await queue.put({"aborted": f"Máximo {IMPORT_MAX_ROWS} cartas por importación"})
+                return
+            chunk["received"] += 1
+            try:
+                card = parse_card_line(line)
+            except ValueError as e:
+                chunk["errors"].append({"line": line_no, "error": str(e)})
+                continue
+            chunk["docs"].append(build_doc(card))
+            chunk["lines"].append(line_no)
+            if chunk["received"] >= IMPORT_CHUNK_SIZE:
+                await queue.put(chunk)
+                chunk = new_chunk()
+    except Exception as e:
+        # Cliente desconectado o cuerpo ilegible: lo ya encolado se inserta igualmente
+        await queue.put(chunk)
+        await queue.put({"aborted": f"Lectura interrumpida: {e}"})
+        return
+
+    await queue.put(chunk)
+    await queue.put(None)
+
+
+async def run_ndjson_import(
+    body: AsyncIterator[bytes],
+    cards,
+    jobs,
+    job_id: str,
+    build_doc: Callable[[MemoryCardCreate], Dict[str, Any]],
+    on_done: Callable[[], Any],
+) -> asyncio.Task:
+    """
+    Leer y validar el cuerpo NDJSON mientras otra tarea inserta los bloques.
+    Vuelve al terminar de leer el cuerpo; la tarea de inserción puede seguir
+    (se devuelve para quien quiera esperarla). Si la inserción falla antes de
+    acabar la lectura (p. ej. Mongo caído), el job queda como failed y se deja
+    de leer: nadie vaciaría ya la cola.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=IMPORT_QUEUE_CHUNKS)
+    writer = asyncio.create_task(_insert_chunks(queue, cards, jobs, job_id, on_done))
+    _running_imports.add(writer)
+    writer.add_done_callback(_running_imports.discard)
+
+    reader = asyncio.ensure_future(_read_chunks(body, queue, build_doc))
+    await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+    if not reader.done():
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+    return writer
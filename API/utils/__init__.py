@@ -13,7 +13,25 @@ from .validators import (
     validate_register,
     validate_role,
 )
-from .mongo import serialize_mongo
+from .hashing import (
+    HashingBusyError,
+    hash_password_async,
+    verify_password_async,
+    hashing_stats,
+)
+from .mongo import (
+    serialize_mongo,
+    card_stats_pipeline,
+    aggregate_card_stats,
+    encode_cursor,
+    decode_cursor,
+    cursor_filter,
+    changed_since_filter,
+    encode_change_token,
+    decode_change_token,
+    changes_pipeline,
+    record_card_tombstone,
+)
 
 __all__ = [
     # JWT
@@ -29,6 +47,21 @@ __all__ = [
     "validate_password",
     "validate_register",
     "validate_role",
+    # Hashing
+    "HashingBusyError",
+    "hash_password_async",
+    "verify_password_async",
+    "hashing_stats",
     # Mongo
     "serialize_mongo",
+    "card_stats_pipeline",
+    "aggregate_card_stats",
+    "encode_cursor",
+    "decode_cursor",
+    "cursor_filter",
+    "changed_since_filter",
+    "encode_change_token",
+    "decode_change_token",
+    "changes_pipeline",
+    "record_card_tombstone",
 ]
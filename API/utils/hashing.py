@@ -0,0 +1,117 @@
+"""
+Password Hashing - Executor acotado para bcrypt
+===============================================
+bcrypt tarda ~250ms por llamada; ejecutarlo dentro de una ruta async bloquea
+el event loop de uvicorn. Aquí se ejecuta en un pool de hilos dedicado
+(bcrypt libera el GIL) con concurrencia y cola limitadas.
+
+Variables de entorno:
+- HASH_CONCURRENCY: hilos de hashing simultáneos (por defecto nº de CPUs, máx. 4)
+- HASH_QUEUE_LIMIT: peticiones en espera antes de rechazar con HashingBusyError
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from .validators import hash_password, verify_password
+
+
+HASH_CONCURRENCY = int(os.getenv("HASH_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+
+class HashingBusyError(RuntimeError):
+    """La cola de hashing está llena (responder 503 y reintentar)"""
+
+
+class PasswordHasher:
+    """Pool de hilos acotado para hash/verify de bcrypt con métricas de cola"""
+
+    def __init__(self, concurrency: int = HASH_CONCURRENCY, queue_limit: int = HASH_QUEUE_LIMIT):
+        self.concurrency = max(1, concurrency)
+        self.queue_limit = max(0, queue_limit)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self.running + self.queued >= self.concurrency + self.queue_limit:
+                self.rejected += 1
+                raise HashingBusyError("Demasiadas operaciones de contraseña en curso")
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+    def _run(self, fn, enqueued_at: float, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.total_wait += started - enqueued_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_run += time.perf_counter() - started
+
+    async def _submit(self, fn, *args):
+        self._admit()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, fn, time.perf_counter(), *args)
+
+    async def hash(self, password: str) -> str:
+        """Hash bcrypt fuera del event loop"""
+        return await self._submit(hash_password, password)
+
+    async def verify(self, password: str, pwd_hash: str) -> bool:
+        """Verificación bcrypt fuera del event loop"""
+        return await self._submit(verify_password, password, pwd_hash)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de la cola de hashing"""
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "concurrency": self.concurrency,
+                "queue_limit": self.queue_limit,
+                "running": self.running,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / completed * 1000, 2),
+                "avg_run_ms": round(self.total_run / completed * 1000, 2),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash de contraseña sin bloquear el event loop"""
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(password: str, pwd_hash: str) -> bool:
+    """Verificar contraseña sin bloquear el event loop"""
+    return await password_hasher.verify(password, pwd_hash)
+
+
+def hashing_stats() -> Dict[str, Any]:
+    """Métricas del executor de hashing"""
+    return password_hasher.stats()
@@ -5,16 +5,68 @@ Combinación de jwt.py y jwt_utils.py originales
 """
 
 import os
+import uuid
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-# Configuración
-JWT_SECRET = os.getenv("JWT_SECRET", "firefighter-super-secret-jwt-key-2024")
+# Configuración: un único secreto para firmar (JWT_SECRET > JWT_SECRET_KEY > SECRET_KEY)
+JWT_SECRET = (
+    os.getenv("JWT_SECRET")
+    or os.getenv("JWT_SECRET_KEY")
+    or os.getenv("SECRET_KEY")
+    or "firefighter-super-secret-jwt-key-2024"
+)
 JWT_EXPIRES_HOURS = int(os.getenv("JWT_EXPIRES_HOURS", "24"))
 JWT_ALGORITHM = "HS256"
 
+# Secretos con los que firmaban las antiguas copias de auth (api.py/dependencies
+# con JWT_SECRET, routes/auth.py con SECRET_KEY). Solo con
+# JWT_ACCEPT_LEGACY_SECRETS=true, y solo los que estén definidos en el entorno:
+# los valores por defecto del código son públicos y no pueden validar tokens.
+LEGACY_SECRET_VARS = ("JWT_SECRET", "SECRET_KEY")
+PUBLIC_DEFAULT_SECRETS = {"firefighter-super-secret-jwt-key-2024", "firefighter-secret-key-2024"}
+
+
+def legacy_secrets(environ=os.environ, primary: str = JWT_SECRET) -> List[str]:
+    """Secretos antiguos aceptados al verificar (vacío salvo que se active)"""
+    if environ.get("JWT_ACCEPT_LEGACY_SECRETS", "false").lower() != "true":
+        return []
+    secrets = [environ.get(name) for name in LEGACY_SECRET_VARS]
+    return [
+        key for key in dict.fromkeys(secrets)
+        if key and key != primary and key not in PUBLIC_DEFAULT_SECRETS
+    ]
+
+
+JWT_LEGACY_SECRETS = legacy_secrets()
+
+
+class JWTVerifier:
+    """Verificador JWT preconfigurado (claves codificadas y opciones fijadas una vez)"""
+
+    def __init__(self, secret: str, legacy_secrets: List[str] = (), algorithm: str = JWT_ALGORITHM):
+        keys = [secret] + [key for key in legacy_secrets if key and key != secret]
+        self._keys = [key.encode("utf-8") for key in dict.fromkeys(keys)]
+        self._algorithms = [algorithm]
+        self._jwt = jwt.PyJWT(options={"verify_signature": True, "verify_exp": True})
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Decodificar y verificar (lanza ExpiredSignatureError / InvalidTokenError)"""
+        last_error: Exception = InvalidTokenError("Token inválido")
+        for key in self._keys:
+            try:
+                return self._jwt.decode(token, key, algorithms=self._algorithms)
+            except ExpiredSignatureError:
+                raise
+            except InvalidTokenError as e:
+                last_error = e
+        raise last_error
+
+
+verifier = JWTVerifier(JWT_SECRET, JWT_LEGACY_SECRETS)
+
 
 def make_jwt(payload: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -36,6 +88,7 @@ def make_jwt(payload: Dict[str, Any], expires_delta: Optional[timedelta] = None)
         expire = now + timedelta(hours=JWT_EXPIRES_HOURS)
     
     to_encode.update({"iat": now, "exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 
@@ -50,7 +103,7 @@ def decode_jwt(token: str) -> Optional[Dict[str, Any]]:
         Optional[Dict]: Payload decodificado o None si es inválido
     """
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        return verifier.decode(token)
     except ExpiredSignatureError:
         print("Token expirado")
         return None
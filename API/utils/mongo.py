@@ -1,3 +1,8 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
 from bson import ObjectId
 
 def serialize_mongo(doc: dict) -> dict:
@@ -11,3 +16,208 @@ def serialize_mongo(doc: dict) -> dict:
         del doc["_id"]
 
     return doc
+
+
+def card_stats_pipeline(match: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Pipeline $facet con los conteos de memory cards (solo devuelve agregados)"""
+    def count_by(field: str, default: Any) -> List[Dict[str, Any]]:
+        return [{"$group": {"_id": {"$ifNull": [f"${field}", default]}, "count": {"$sum": 1}}}]
+
+    return [
+        {"$match": match or {}},
+        {"$project": {"box": 1, "category": 1, "difficulty": 1, "times_reviewed": 1, "times_correct": 1}},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "reviews": {"$sum": {"$ifNull": ["$times_reviewed", 0]}},
+                "correct": {"$sum": {"$ifNull": ["$times_correct", 0]}},
+            }}],
+            "by_box": count_by("box", 1),
+            "by_category": count_by("category", "General"),
+            "by_difficulty": count_by("difficulty", "medium"),
+        }},
+    ]
+
+
+async def aggregate_card_stats(collection, match: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Ejecutar card_stats_pipeline y devolver totales y conteos por box/categoría/dificultad"""
+    result = await collection.aggregate(card_stats_pipeline(match)).to_list(length=1)
+    facets = result[0] if result else {}
+    totals = (facets.get("totals") or [{}])[0]
+
+    def as_dict(rows: List[Dict[str, Any]], key=lambda value: value) -> Dict[Any, int]:
+        return {key(row["_id"]): row["count"] for row in rows or []}
+
+    return {
+        "total": totals.get("count", 0),
+        "total_reviews": totals.get("reviews", 0),
+        "total_correct": totals.get("correct", 0),
+        "by_box": as_dict(facets.get("by_box"), key=str),
+        "by_category": as_dict(facets.get("by_category")),
+        "by_difficulty": as_dict(facets.get("by_difficulty")),
+    }
+
+
+# ============================================================================
+# PAGINACIÓN POR CURSOR (keyset sobre created_at + _id)
+# ============================================================================
+
+# Orden estable: created_at y _id como desempate (índice created_by, created_at, _id)
+KEYSET_SORT = [("created_at", 1), ("_id", 1)]
+
+
+def encode_id(value: Any) -> Dict[str, str]:
+    """_id con su tipo BSON ("o" ObjectId, "s" string) para guardarlo en un cursor"""
+    if isinstance(value, ObjectId):
+        return {"i": str(value), "k": "o"}
+    return {"i": str(value), "k": "s"}
+
+
+def decode_id(position: Dict[str, Any]) -> Any:
+    """Inverso de encode_id (los cursores antiguos sin "k" son strings)"""
+    if position.get("k") == "o":
+        return ObjectId(position["i"])
+    return str(position["i"])
+
+
+def id_after(last_id: Any) -> Dict[str, Any]:
+    """
+    Filtro de _id estrictamente posterior a last_id en el orden de MongoDB.
+
+    Conviven cartas con _id string y cartas antiguas con ObjectId; $gt no
+    compara entre tipos y en el orden BSON todos los strings van antes que
+    cualquier ObjectId, así que tras un string también vienen los ObjectId.
+    """
+    if isinstance(last_id, ObjectId):
+        return {"_id": {"$gt": last_id}}
+    return {"$or": [{"_id": {"$gt": last_id}}, {"_id": {"$type": "objectId"}}]}
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Cursor opaco con la posición (created_at, _id) del último documento de la página"""
+    created_at = doc.get("created_at")
+    position = {
+        "c": created_at.isoformat() if isinstance(created_at, datetime) else None,
+        **encode_id(doc["_id"]),
+    }
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """Decodificar un cursor (ValueError si no es válido)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(position["c"]) if position.get("c") else None
+        return created_at, decode_id(position)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def cursor_filter(cursor: str) -> Dict[str, Any]:
+    """Filtro keyset: documentos estrictamente posteriores al cursor en KEYSET_SORT"""
+    created_at, last_id = decode_cursor(cursor)
+    if created_at is None:
+        # Los documentos sin created_at van primero en el orden ascendente
+        return {"$or": [
+            {"created_at": None, **id_after(last_id)},
+            {"created_at": {"$ne": None}},
+        ]}
+    return {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, **id_after(last_id)},
+    ]}
+
+
+# ============================================================================
+# CHANGE FEED (updated_at + tombstones, keyset sobre changed_at + _id)
+# ============================================================================
+
+# Colección con las cartas eliminadas (para propagar borrados a las réplicas)
+TOMBSTONES_COLLECTION = "memory_card_tombstones"
+# Retención de tombstones: un token más antiguo obliga al cliente a recargar todo
+TOMBSTONE_TTL_DAYS = 30
+
+
+def changed_since_filter(since: datetime) -> Dict[str, Any]:
+    """Cartas creadas o modificadas desde `since` (las nunca editadas tienen updated_at = None)"""
+    return {"$or": [
+        {"updated_at": {"$gte": since}},
+        {"updated_at": None, "created_at": {"$gte": since}},
+    ]}
+
+
+def encode_change_token(changed_at: Optional[datetime], last_id: Any = None) -> str:
+    """Token opaco con la posición (changed_at, _id) en el feed de cambios"""
+    position = {
+        "t": changed_at.isoformat() if isinstance(changed_at, datetime) else None,
+        **(encode_id(last_id) if last_id is not None else {"i": None}),
+    }
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode_change_token(token: str) -> Tuple[Optional[datetime], Any]:
+    """Decodificar un token del feed (ValueError si no es válido)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        changed_at = datetime.fromisoformat(position["t"]) if position.get("t") else None
+        last_id = decode_id(position) if position.get("i") is not None else None
+        return changed_at, last_id
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Token inválido: {token}") from e
+
+
+def changes_pipeline(
+    match: Dict[str, Any],
+    since: Optional[datetime],
+    last_id: Any,
+    limit: int,
+    projection: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Upserts (memory_cards) y borrados (tombstones) posteriores a la posición
+    (since, last_id), en orden (changed_at, _id), en una sola agregación.
+    """
+    card_match = dict(match)
+    tombstone_match = dict(match)
+    if since is not None:
+        card_match.update(changed_since_filter(since))
+        tombstone_match["deleted_at"] = {"$gte": since}
+
+    card_stages: List[Dict[str, Any]] = [{"$match": card_match}]
+    if projection:
+        card_stages.append({"$project": {**projection, "created_at": 1, "updated_at": 1}})
+
+    pipeline = card_stages + [
+        {"$addFields": {
+            "op": "upsert",
+            "changed_at": {"$ifNull": ["$updated_at", "$created_at"]},
+        }},
+        {"$unionWith": {"coll": TOMBSTONES_COLLECTION, "pipeline": [
+            {"$match": tombstone_match},
+            {"$project": {"_id": 1, "op": "delete", "changed_at": "$deleted_at"}},
+        ]}},
+    ]
+    if since is not None and last_id is not None:
+        # Mismo changed_at que el último elemento entregado: desempate por _id
+        # (una revisión por lotes pone el mismo updated_at a todas sus cartas)
+        pipeline.append({"$match": {"$or": [
+            {"changed_at": {"$gt": since}},
+            {"changed_at": since, **id_after(last_id)},
+        ]}})
+    pipeline += [
+        {"$sort": {"changed_at": 1, "_id": 1}},
+        {"$limit": limit},
+    ]
+    return pipeline
+
+
+async def record_card_tombstone(db, card_id: Any, created_by: Optional[str]) -> None:
+    """Registrar el borrado de una carta para el feed de cambios"""
+    await db[TOMBSTONES_COLLECTION].update_one(
+        {"_id": card_id},
+        {"$set": {"created_by": created_by, "deleted_at": datetime.utcnow()}},
+        upsert=True
+    )
@@ -0,0 +1,110 @@
+"""
+Principal Cache - Cache del usuario autenticado por token
+=========================================================
+require_user resolvía el usuario con hasta dos find_one por petición.
+El principal ({username, role, user_id}) se guarda en un cache en proceso,
+acotado y con TTL corto, indexado por el jti del token (o su hash).
+
+Invalidación: invalidate_principal(username) publica un evento de revocación
+en el backend compartido (firefighter_cache); con CACHE_BACKEND=tiered llega a
+todos los workers por el canal pub/sub. Cada proceso guarda en memoria el
+momento de la última revocación de cada usuario y descarta las entradas
+anteriores: un acierto del cache no hace ninguna petición a Redis.
+
+Si el backend no garantiza la entrega de los eventos (suscripción caída,
+CACHE_BACKEND=redis) toda entrada anterior a events_since() cuenta como
+revocada: sin Redis se vuelve a consultar la base de datos en cada petición.
+
+Variables de entorno:
+- PRINCIPAL_CACHE_TTL: segundos de vida de cada principal (0 desactiva el cache)
+- PRINCIPAL_CACHE_SIZE: número máximo de tokens cacheados
+"""
+
+import hashlib
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional
+
+from simple_memory_cache import SimpleMemoryCache, get_backend
+
+
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+REVOKED_EVENT = "principal:revoked"
+
+_principals = SimpleMemoryCache(default_ttl=PRINCIPAL_CACHE_TTL, max_size=PRINCIPAL_CACHE_SIZE)
+# username -> momento (reloj local) de su última revocación
+_revocations: Dict[str, float] = {}
+_revocations_lock = threading.Lock()
+# Backends en los que ya escuchamos REVOKED_EVENT (set_backend puede cambiarlo)
+_listening: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _token_key(token: str, payload: Dict[str, Any]) -> str:
+    jti = payload.get("jti")
+    if jti:
+        return f"jti:{jti}"
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _on_revoked(usernames: Iterable[str]) -> None:
+    now = time.time()
+    # Una revocación más antigua que cualquier entrada ya no descarta nada
+    horizon = now - max(PRINCIPAL_CACHE_TTL, 1) - 5
+    with _revocations_lock:
+        for username in usernames or ():
+            _revocations[username] = now
+        for username, revoked_at in list(_revocations.items()):
+            if revoked_at < horizon:
+                del _revocations[username]
+
+
+def _events_backend():
+    backend = get_backend()
+    if backend not in _listening:
+        backend.on_event(REVOKED_EVENT, _on_revoked)
+        _listening.add(backend)
+    return backend
+
+
+def get_principal(token: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Principal cacheado para un token ya verificado (None si no está o fue invalidado)"""
+    if PRINCIPAL_CACHE_TTL <= 0:
+        return None
+    key = _token_key(token, payload)
+    entry = _principals.get(key)
+    if entry is None:
+        return None
+    principal, cached_at = entry
+    stale = cached_at < _events_backend().events_since()
+    if stale or _revocations.get(principal["username"], 0) >= cached_at:
+        _principals.delete(key)
+        return None
+    return dict(principal)
+
+
+def cache_principal(token: str, payload: Dict[str, Any], principal: Dict[str, Any]) -> None:
+    """Guardar el principal resuelto (nunca más allá de la expiración del token)"""
+    if PRINCIPAL_CACHE_TTL <= 0 or _events_backend().events_since() == float("inf"):
+        return
+    ttl = PRINCIPAL_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        _principals.set(_token_key(token, payload), (dict(principal), time.time()), ttl)
+
+
+def invalidate_principal(*usernames: str) -> None:
+    """Invalidar los principales cacheados (cambio de rol/estado, borrado o contraseña)"""
+    usernames = [username for username in usernames if username]
+    if usernames:
+        _events_backend().publish_event(REVOKED_EVENT, usernames)
+
+
+def principal_cache_stats() -> Dict[str, Any]:
+    """Estadísticas del cache de principales"""
+    return {"ttl": PRINCIPAL_CACHE_TTL, **_principals.stats()}
@@ -526,6 +526,13 @@ def register_system_routes(app, login_manager):
                 'redis': redis_status,
                 'session_backend': app.config.get('SESSION_TYPE', 'native'),
             }
+
+            # Pool, circuit breaker y latencias por endpoint del cliente de la API
+            try:
+                from app.api_client import api_client
+                health_info['api_client'] = api_client.stats()
+            except Exception as e:
+                health_info['api_client'] = {'error': str(e)}
             
             return jsonify(health_info), 200
             
@@ -0,0 +1,346 @@
+# app/api_client.py - Cliente HTTP compartido del BackOffice hacia la API
+"""
+Todas las rutas del BackOffice hablaban con la API con requests.get/post
+sueltos: una conexión TCP nueva por llamada, sin reintentos y sin forma de
+saber qué endpoint es lento. Este módulo centraliza esas llamadas:
+
+- Una requests.Session con pool keep-alive para los hilos de waitress y los
+  del pool de submit() a la vez (WAITRESS_THREADS × (1 + API_FANOUT_SOURCES)):
+  ninguna conexión keep-alive se descarta por "pool is full".
+- Reintentos con backoff exponencial (Config.API_RETRY_ATTEMPTS) en errores
+  de conexión y 502/503/504; las lecturas solo se reintentan en métodos
+  idempotentes.
+- Circuit breaker por grupo de endpoints (/api/<grupo>/...): tras
+  API_CIRCUIT_FAILURES fallos seguidos las llamadas del grupo fallan al
+  instante con CircuitOpenError durante API_CIRCUIT_RESET segundos y después
+  se deja pasar una petición de prueba. Solo cuentan los errores de conexión,
+  los timeouts y los 502/503/504: un 500 de una ruta es un error de la
+  aplicación, no una API caída, y no debe cortar el login ni el resto.
+- Métricas de latencia por endpoint (llamadas, errores, media, p95, máximo),
+  expuestas en /health.
+- submit(): la misma llamada en el pool de hilos del cliente, devuelve un
+  Future (para pedir varios endpoints a la vez sin bloquear uno tras otro).
+  El pool tiene WAITRESS_THREADS × API_FANOUT_SOURCES hilos: aunque todos los
+  hilos de waitress pinten el dashboard a la vez, nada espera en cola.
+
+CircuitOpenError hereda de requests.exceptions.ConnectionError, así que los
+`except requests.RequestException` de las rutas siguen funcionando igual.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+
+WAITRESS_THREADS = int(os.getenv("WAITRESS_THREADS", "10"))
+# Llamadas simultáneas que lanza una petición con submit() (fuentes del dashboard)
+API_FANOUT_SOURCES = int(os.getenv("API_FANOUT_SOURCES", "4"))
+API_FANOUT_WORKERS = int(os.getenv("API_FANOUT_WORKERS", str(WAITRESS_THREADS * API_FANOUT_SOURCES)))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", str(WAITRESS_THREADS + API_FANOUT_WORKERS)))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.3"))
+API_CIRCUIT_FAILURES = int(os.getenv("API_CIRCUIT_FAILURES", "5"))
+API_CIRCUIT_RESET = float(os.getenv("API_CIRCUIT_RESET", "30"))
+API_METRICS_WINDOW = int(os.getenv("API_METRICS_WINDOW", "200"))
+
+RETRY_STATUSES = (502, 503, 504)
+# Respuestas que indican API caída o saturada (abren el circuito)
+BREAKER_STATUSES = RETRY_STATUSES
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Segmentos variables de la ruta (ids numéricos u ObjectId) para agrupar métricas
+_ID_SEGMENT_RE = re.compile(r"/(?:\d+|[0-9a-fA-F]{24})(?=/|$)")
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """La API ha fallado demasiadas veces seguidas; no se intenta la llamada"""
+
+
+class CircuitBreaker:
+    """Circuito cerrado → abierto tras N fallos seguidos → semiabierto tras reset_timeout"""
+
+    def __init__(self, failure_threshold=API_CIRCUIT_FAILURES, reset_timeout=API_CIRCUIT_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """¿Puede salir la petición? En semiabierto solo pasa una de prueba"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyMetrics:
+    """Latencias por endpoint con ventana de las últimas muestras para el p95"""
+
+    def __init__(self, window=API_METRICS_WINDOW):
+        self.window = window
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, elapsed, error=False):
+        with self._lock:
+            data = self._endpoints.get(endpoint)
+            if data is None:
+                data = self._endpoints[endpoint] = {
+                    "calls": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                    "samples": deque(maxlen=self.window),
+                }
+            data["calls"] += 1
+            data["errors"] += int(error)
+            data["total"] += elapsed
+            data["max"] = max(data["max"], elapsed)
+            data["samples"].append(elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for endpoint, data in self._endpoints.items():
+                samples = sorted(data["samples"])
+                p95 = samples[max(0, int(len(samples) * 0.95) - 1)] if samples else 0.0
+                result[endpoint] = {
+                    "calls": data["calls"],
+                    "errors": data["errors"],
+                    "avg_ms": round(data["total"] / data["calls"] * 1000, 1),
+                    "p95_ms": round(p95 * 1000, 1),
+                    "max_ms": round(data["max"] * 1000, 1),
+                }
+            return result
+
+
+def create_session(pool_size=API_POOL_SIZE, retries=None, backoff=API_RETRY_BACKOFF):
+    """Session con pool keep-alive y reintentos con backoff"""
+    if retries is None:
+        retries = max(Config.API_RETRY_ATTEMPTS - 1, 0)
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def endpoint_name(method, path):
+    """'GET /api/users/42' → 'GET /api/users/:id' (agrupación de métricas)"""
+    path = urlsplit(path).path
+    return f"{method.upper()} {_ID_SEGMENT_RE.sub('/:id', path)}"
+
+
+def breaker_group(endpoint):
+    """'GET /api/docker/logs' → 'docker' (un circuito por grupo)"""
+    segments = [s for s in endpoint.split(" ", 1)[-1].split("/") if s]
+    if segments and segments[0] == "api":
+        segments = segments[1:]
+    return segments[0] if segments else "/"
+
+
+class ApiClient:
+    """Cliente de la API compartido por todas las rutas del BackOffice"""
+
+    def __init__(self, base_url=None, session=None, timeout=None, breaker_factory=None, pool_size=API_POOL_SIZE,
+                 fanout_workers=API_FANOUT_WORKERS):
+        self.base_url = (base_url or Config.API_BASE_URL or "http://backend:5000").rstrip("/")
+        self.session = session or create_session(pool_size)
+        self.timeout = timeout or Config.API_TIMEOUT
+        self._breaker_factory = breaker_factory or CircuitBreaker
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        self.metrics = LatencyMetrics()
+        self._pool_size = pool_size
+        self._fanout_workers = fanout_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    # ----- genérico -----
+    def breaker_for(self, endpoint):
+        """Circuito del grupo al que pertenece el endpoint"""
+        group = breaker_group(endpoint)
+        with self._breakers_lock:
+            breaker = self._breakers.get(group)
+            if breaker is None:
+                breaker = self._breakers[group] = self._breaker_factory()
+            return breaker
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """Petición a la API; devuelve requests.Response o lanza RequestException"""
+        endpoint = endpoint or endpoint_name(method, path)
+        breaker = self.breaker_for(endpoint)
+        if not breaker.allow():
+            self.metrics.record(endpoint, 0.0, error=True)
+            raise CircuitOpenError(f"Circuito abierto hacia {self.base_url} ({endpoint})")
+
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.metrics.record(endpoint, time.perf_counter() - started, error=True)
+            breaker.record_failure()
+            raise
+
+        self.metrics.record(endpoint, time.perf_counter() - started, error=response.status_code >= 500)
+        if response.status_code in BREAKER_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def submit(self, func, *args, **kwargs):
+        """Ejecutar una llamada del cliente en su pool de hilos → Future"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._fanout_workers, thread_name_prefix="api-client")
+        return self._executor.submit(func, *args, **kwargs)
+
+    # ----- sistema -----
+    def health(self, timeout=5):
+        return self.get("/api/health", timeout=timeout)
+
+    def docker_logs(self, headers=None, timeout=10):
+        return self.get("/api/docker/logs", headers=headers, timeout=timeout)
+
+    def docker_containers(self, headers=None, timeout=10):
+        return self.get("/api/docker/containers", headers=headers, timeout=timeout)
+
+    # ----- autenticación -----
+    def login(self, payload, timeout=10):
+        return self.post("/api/auth/login", json=payload, timeout=timeout)
+
+    # ----- usuarios -----
+    def list_users(self, headers=None, timeout=10):
+        return self.get("/api/users", headers=headers, timeout=timeout)
+
+    def get_user(self, user_id, headers=None, timeout=5):
+        return self.get(f"/api/users/{user_id}", headers=headers, timeout=timeout,
+                        endpoint="GET /api/users/:id")
+
+    def update_user(self, user_id, data, headers=None, timeout=5):
+        return self.patch(f"/api/users/{user_id}", headers=headers, json=data, timeout=timeout,
+                          endpoint="PATCH /api/users/:id")
+
+    def delete_user(self, user_id, headers=None, timeout=5):
+        return self.delete(f"/api/users/{user_id}", headers=headers, timeout=timeout,
+                           endpoint="DELETE /api/users/:id")
+
+    # ----- memory cards -----
+    def list_memory_cards(self, headers=None, params=None, timeout=10):
+        return self.get("/api/memory-cards", headers=headers, params=params, timeout=timeout)
+
+    def get_memory_card(self, card_id, headers=None, timeout=5):
+        return self.get(f"/api/memory-cards/{card_id}", headers=headers, timeout=timeout,
+                        endpoint="GET /api/memory-cards/:id")
+
+    def create_memory_card(self, data, headers=None, timeout=10):
+        return self.post("/api/memory-cards", headers=headers, json=data, timeout=timeout)
+
+    def update_memory_card(self, card_id, data, headers=None, timeout=10):
+        return self.put(f"/api/memory-cards/{card_id}", headers=headers, json=data, timeout=timeout,
+                        endpoint="PUT /api/memory-cards/:id")
+
+    def delete_memory_card(self, card_id, headers=None, timeout=5):
+        return self.delete(f"/api/memory-cards/{card_id}", headers=headers, timeout=timeout,
+                           endpoint="DELETE /api/memory-cards/:id")
+
+    # ----- access tokens -----
+    def list_access_tokens(self, headers=None, timeout=10):
+        return self.get("/api/access_tokens", headers=headers, timeout=timeout)
+
+    def get_access_token(self, token_id, headers=None, timeout=10):
+        return self.get(f"/api/access_tokens/{token_id}", headers=headers, timeout=timeout,
+                        endpoint="GET /api/access_tokens/:id")
+
+    def create_access_token(self, data, headers=None, timeout=10):
+        return self.post("/api/access_tokens", headers=headers, json=data, timeout=timeout)
+
+    def update_access_token(self, token_id, data, headers=None, timeout=10):
+        return self.put(f"/api/access_tokens/{token_id}", headers=headers, json=data, timeout=timeout,
+                        endpoint="PUT /api/access_tokens/:id")
+
+    def delete_access_token(self, token_id, headers=None, timeout=10):
+        return self.delete(f"/api/access_tokens/{token_id}", headers=headers, timeout=timeout,
+                           endpoint="DELETE /api/access_tokens/:id")
+
+    def access_token_action(self, token_id, action, headers=None, json=None, timeout=10):
+        """PATCH /api/access_tokens/<id>/<revoke|reactivate|reset_uses>"""
+        return self.patch(f"/api/access_tokens/{token_id}/{action}", headers=headers, json=json,
+                          timeout=timeout, endpoint=f"PATCH /api/access_tokens/:id/{action}")
+
+    def access_token_stats(self, headers=None, timeout=10):
+        return self.get("/api/access_tokens/stats", headers=headers, timeout=timeout)
+
+    # ----- observabilidad -----
+    def stats(self):
+        return {
+            "base_url": self.base_url,
+            "pool_size": self._pool_size,
+            "fanout_workers": self._fanout_workers,
+            "circuits": {group: breaker.state for group, breaker in self._breakers.items()},
+            "endpoints": self.metrics.snapshot(),
+        }
+
+
+# Instancia compartida
+api_client = ApiClient()
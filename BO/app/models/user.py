@@ -1,26 +1,12 @@
 from flask_login import UserMixin
 from config import Config
+from app.api_client import api_client
 import requests
 import jwt
 import os
 from datetime import datetime
 
 
-def get_api_base_url():
-    """
-    Resolver la URL base de la API de forma robusta:
-    1. Config.API_BASE_URL (preferido)
-    2. Variable de entorno API_BASE_URL
-    3. Valor por defecto orientado a Docker: http://backend:5000
-    """
-    base = getattr(Config, "API_BASE_URL", None) or os.getenv("API_BASE_URL")
-    if not base:
-        base = "http://backend:5000"
-    # Log para debug
-    print(f"🌐 API_BASE_URL efectivo en BackofficeUser: {base}")
-    return base
-
-
 class BackofficeUser(UserMixin):
     def __init__(self, id, username, email, role, mfa_enabled=False, token=None):
         # 🔴 ID SIEMPRE STRING para Flask-Login
@@ -39,8 +25,7 @@ class BackofficeUser(UserMixin):
     def authenticate(username, password, mfa_code=None):
         """Autenticar usuario, con MFA opcional para casos especiales"""
         try:
-            api_base_url = get_api_base_url()
-            login_url = f"{api_base_url}/api/auth/login"
+            login_url = f"{api_client.base_url}/api/auth/login"
 
             print(f"🔍 Intentando login en: {login_url}")
             print(f"🔍 MFA code proporcionado: {'Sí' if mfa_code else 'No'}")
@@ -55,11 +40,7 @@ class BackofficeUser(UserMixin):
             else:
                 print("🔓 Login solo con usuario/contraseña (sin MFA)")
 
-            response = requests.post(
-                login_url,
-                json=payload,
-                timeout=10
-            )
+            response = api_client.login(payload, timeout=10)
 
             print(f"📡 Respuesta API: {response.status_code}")
 
@@ -164,16 +145,11 @@ class BackofficeUser(UserMixin):
             if token:
                 headers["Authorization"] = f"Bearer {token}"
 
-            api_base_url = get_api_base_url()
-            url = f"{api_base_url}/api/users/{user_id}"
+            url = f"{api_client.base_url}/api/users/{user_id}"
 
             print(f"🔍 Obteniendo datos para usuario ID: {user_id} en {url}")
 
-            response = requests.get(
-                url,
-                headers=headers,
-                timeout=5
-            )
+            response = api_client.get_user(user_id, headers=headers, timeout=5)
 
             print(f"📡 Get user response: {response.status_code}")
 
@@ -208,15 +184,9 @@ class BackofficeUser(UserMixin):
                 headers["Authorization"] = f"Bearer {token}"
                 headers["Content-Type"] = "application/json"
 
-            api_base_url = get_api_base_url()
-
             # Primero obtener información básica del usuario
             try:
-                user_response = requests.get(
-                    f"{api_base_url}/api/users/{user_id}",
-                    headers=headers,
-                    timeout=5
-                )
+                user_response = api_client.get_user(user_id, headers=headers, timeout=5)
 
                 if user_response.status_code == 200:
                     user_data = user_response.json()
@@ -242,16 +212,16 @@ class BackofficeUser(UserMixin):
 
             # Intentar varios endpoints posibles de progreso
             endpoints = [
-                f"{api_base_url}/api/users/{user_id}/progress",
-                f"{api_base_url}/api/users/{user_id}/leitner-progress",
-                f"{api_base_url}/api/progress/{user_id}",
-                f"{api_base_url}/api/leitner/{user_id}/stats"
+                f"/api/users/{user_id}/progress",
+                f"/api/users/{user_id}/leitner-progress",
+                f"/api/progress/{user_id}",
+                f"/api/leitner/{user_id}/stats"
             ]
 
             for endpoint in endpoints:
                 try:
                     print(f"🌐 Probando endpoint: {endpoint}")
-                    response = requests.get(endpoint, headers=headers, timeout=5)
+                    response = api_client.get(endpoint, headers=headers, timeout=5)
 
                     if response.status_code == 200:
                         progress_data = response.json()
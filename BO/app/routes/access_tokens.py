@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta, timezone
 from config import Config
+from app.api_client import api_client
 import requests
 import secrets
 import string
@@ -56,7 +57,7 @@ def handle_action():
     try:
         if action == 'revoke':
             return _proxy_action(
-                f"{Config.API_BASE_URL}/api/access_tokens/{token_id}/revoke",
+                f"/api/access_tokens/{token_id}/revoke",
                 json_payload={
                     'revoked_by': current_user.username,
                     'revoked_at': datetime.now(timezone.utc).isoformat()
@@ -65,7 +66,7 @@ def handle_action():
             )
         elif action == 'reactivate':
             return _proxy_action(
-                f"{Config.API_BASE_URL}/api/access_tokens/{token_id}/reactivate",
+                f"/api/access_tokens/{token_id}/reactivate",
                 json_payload={
                     'reactivated_by': current_user.username,
                     'reactivated_at': datetime.now(timezone.utc).isoformat()
@@ -74,7 +75,7 @@ def handle_action():
             )
         elif action == 'reset':
             return _proxy_action(
-                f"{Config.API_BASE_URL}/api/access_tokens/{token_id}/reset_uses",
+                f"/api/access_tokens/{token_id}/reset_uses",
                 json_payload={
                     'reset_by': current_user.username,
                     'reset_at': datetime.now(timezone.utc).isoformat()
@@ -84,7 +85,7 @@ def handle_action():
         elif action == 'delete':
             # DELETE no lleva body JSON
             return _proxy_action(
-                f"{Config.API_BASE_URL}/api/access_tokens/{token_id}",
+                f"/api/access_tokens/{token_id}",
                 method='DELETE',
                 success_message='Token eliminado permanentemente'
             )
@@ -102,16 +103,16 @@ def handle_action():
         }), 500
 
 
-def _proxy_action(api_url, json_payload=None, method='PATCH', success_message='Acción realizada correctamente'):
+def _proxy_action(api_path, json_payload=None, method='PATCH', success_message='Acción realizada correctamente'):
     """
     Helper para llamar a la API y devolver un JSON homogéneo al frontend.
     """
     headers = get_auth_headers()
     try:
         if method == 'DELETE':
-            resp = requests.delete(api_url, headers=headers, timeout=10)
+            resp = api_client.delete(api_path, headers=headers, timeout=10)
         else:
-            resp = requests.patch(api_url, headers=headers, json=json_payload, timeout=10)
+            resp = api_client.patch(api_path, headers=headers, json=json_payload, timeout=10)
 
         if resp.status_code == 200:
             data = resp.json()
@@ -145,18 +146,14 @@ def token_list():
     
     try:
         headers = get_auth_headers()
-        api_url = f"{Config.API_BASE_URL}/api/access_tokens"
+        api_url = f"{api_client.base_url}/api/access_tokens"
         
         print(f"🌐 DEBUG Llamando a API:")
         print(f"🌐 DEBUG URL: {api_url}")
         print(f"🌐 DEBUG Headers: {headers}")
         print(f"🌐 DEBUG API_BASE_URL config: {Config.API_BASE_URL}")
         
-        response = requests.get(
-            api_url, 
-            headers=headers,
-            timeout=10
-        )
+        response = api_client.list_access_tokens(headers=headers, timeout=10)
         
         print(f"📡 DEBUG Respuesta recibida:")
         print(f"📡 DEBUG Status Code: {response.status_code}")
@@ -220,7 +217,7 @@ def test_api_connection():
         test_url = f"{Config.API_BASE_URL}/health"
         
         print(f"🧪 TEST Conectando a: {test_url}")
-        response = requests.get(test_url, timeout=5)
+        response = api_client.get(test_url, timeout=5)
         
         result = {
             'test_url': test_url,
@@ -294,12 +291,7 @@ def create_token():
             token_data['recipient_email'] = recipient_email
         
         headers = get_auth_headers()
-        response = requests.post(
-            f"{Config.API_BASE_URL}/api/access_tokens", 
-            headers=headers,
-            json=token_data,
-            timeout=30
-        )
+        response = api_client.create_access_token(token_data, headers=headers, timeout=30)
         
         # ✅ CORRECCIÓN CLAVE: aceptar 200 y 201
         if response.status_code in (200, 201):
@@ -348,10 +340,10 @@ def edit_token(token_id):
         print(f"📝 DEBUG GET edit - Obteniendo datos del token {token_id}")
         try:
             headers = get_auth_headers()
-            api_url = f"{Config.API_BASE_URL}/api/access_tokens/{token_id}"
+            api_url = f"{api_client.base_url}/api/access_tokens/{token_id}"
             print(f"🌐 DEBUG GET edit - Llamando a: {api_url}")
             
-            response = requests.get(api_url, headers=headers, timeout=10)
+            response = api_client.get_access_token(token_id, headers=headers, timeout=10)
             print(f"📡 DEBUG GET edit - Status Code: {response.status_code}")
             
             if response.status_code == 200:
@@ -412,11 +404,11 @@ def edit_token(token_id):
         }
         
         headers = get_auth_headers()
-        api_url = f"{Config.API_BASE_URL}/api/access_tokens/{token_id}"
+        api_url = f"{api_client.base_url}/api/access_tokens/{token_id}"
         print(f"🌐 DEBUG POST edit - Actualizando en: {api_url}")
         print(f"📦 DEBUG POST edit - Datos a enviar: {update_data}")
         
-        response = requests.put(api_url, headers=headers, json=update_data, timeout=10)
+        response = api_client.update_access_token(token_id, update_data, headers=headers, timeout=10)
         print(f"📡 DEBUG POST edit - Status Code: {response.status_code}")
         print(f"📡 DEBUG POST edit - Respuesta: {response.text}")
         
@@ -447,11 +439,7 @@ def delete_token(token_id):
     """Eliminar token permanentemente"""
     try:
         headers = get_auth_headers()
-        response = requests.delete(
-            f"{Config.API_BASE_URL}/api/access_tokens/{token_id}", 
-            headers=headers,
-            timeout=10
-        )
+        response = api_client.delete_access_token(token_id, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -477,8 +465,8 @@ def revoke_token(token_id):
     """Revocar token (cambiar status a revoked)"""
     try:
         headers = get_auth_headers()
-        response = requests.patch(
-            f"{Config.API_BASE_URL}/api/access_tokens/{token_id}/revoke", 
+        response = api_client.access_token_action(
+            token_id, 'revoke',
             headers=headers,
             json={'revoked_by': current_user.username, 'revoked_at': datetime.now(timezone.utc).isoformat()},
             timeout=10
@@ -508,8 +496,8 @@ def reactivate_token(token_id):
     """Reactivar token revocado"""
     try:
         headers = get_auth_headers()
-        response = requests.patch(
-            f"{Config.API_BASE_URL}/api/access_tokens/{token_id}/reactivate", 
+        response = api_client.access_token_action(
+            token_id, 'reactivate',
             headers=headers,
             json={'reactivated_by': current_user.username, 'reactivated_at': datetime.now(timezone.utc).isoformat()},
             timeout=10
@@ -539,8 +527,8 @@ def reset_uses(token_id):
     """Reiniciar contador de usos a 0"""
     try:
         headers = get_auth_headers()
-        response = requests.patch(
-            f"{Config.API_BASE_URL}/api/access_tokens/{token_id}/reset_uses", 
+        response = api_client.access_token_action(
+            token_id, 'reset_uses',
             headers=headers,
             json={'reset_by': current_user.username, 'reset_at': datetime.now(timezone.utc).isoformat()},
             timeout=10
@@ -600,7 +588,7 @@ def debug_test():
     """Endpoint de debug simple con autenticación"""
     try:
         headers = get_auth_headers()
-        response = requests.get(f"{Config.API_BASE_URL}/api/access_tokens", headers=headers, timeout=10)
+        response = api_client.list_access_tokens(headers=headers, timeout=10)
         
         result = {
             'status_code': response.status_code,
@@ -618,11 +606,7 @@ def token_stats():
     """API endpoint para estadísticas de tokens en tiempo real"""
     try:
         headers = get_auth_headers()
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/access_tokens/stats", 
-            headers=headers,
-            timeout=10
-        )
+        response = api_client.access_token_stats(headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
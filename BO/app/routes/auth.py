@@ -8,6 +8,7 @@ from flask import (
 )
 from flask_login import login_user, logout_user, login_required, current_user
 
+from app.api_client import api_client
 from app.models.user import BackofficeUser
 from config import Config
 
@@ -422,8 +423,8 @@ def generate_mfa_for_user(user_id):
     try:
         headers = get_auth_headers()
         
-        response = requests.post(
-            f"{Config.API_BASE_URL}/api/users/{user_id}/mfa/generate",
+        response = api_client.post(
+            f"/api/users/{user_id}/mfa/generate",
             headers=headers,
             timeout=120
         )
@@ -453,18 +454,17 @@ def verify_mfa_with_api(user_id, mfa_code):
         # Para verificación MFA durante login, NO necesitamos token todavía
         # La verificación debería hacerse contra un endpoint público o con credenciales temporales
         
-        api_url = Config.API_BASE_URL
         print(f"🔐 Verificando MFA para usuario: {user_id}")
         
         # 🔥 ESTE ENDPOINT DEBE EXISTIR EN TU API
-        endpoint = f"{api_url}/api/mfa/verify"
+        endpoint = "/api/mfa/verify"
         
         payload = {
             'user_id': user_id,
             'code': mfa_code
         }
         
-        response = requests.post(
+        response = api_client.post(
             endpoint,
             json=payload,
             timeout=30
@@ -501,7 +501,6 @@ def check_user_mfa_status(user_id):
             print("❌ No hay token de API disponible para verificar estado MFA")
             return {'mfa_enabled': False}
 
-        api_url = os.getenv("API_BASE_URL", "http://localhost:5000")
         print(f"🔍 Verificando estado MFA para usuario: {user_id}")
 
         headers = {
@@ -509,11 +508,7 @@ def check_user_mfa_status(user_id):
             'Content-Type': 'application/json'
         }
 
-        response = requests.get(
-            f"{api_url}/api/users/{user_id}",
-            headers=headers,
-            timeout=5
-        )
+        response = api_client.get_user(user_id, headers=headers, timeout=5)
 
         if response.status_code == 200:
             data = response.json()
@@ -556,13 +551,12 @@ def enable_mfa_for_user(user_id):
         print(f"🌐 Config.API_BASE_URL: {Config.API_BASE_URL}")
         print(f"🌐 os.getenv('API_BASE_URL'): {os.getenv('API_BASE_URL')}")
         
-        api_url = Config.API_BASE_URL
-        endpoint = f"{api_url}/api/users/{user_id}/mfa/enable"
+        endpoint = f"{api_client.base_url}/api/users/{user_id}/mfa/enable"
         
         print(f"🌐 Llamando a API endpoint: {endpoint}")
         
         # Hacer la petición con timeout y verificación de SSL desactivada si es necesario
-        response = requests.post(
+        response = api_client.post(
             endpoint,
             headers=headers,
             timeout=30,
@@ -623,8 +617,8 @@ def disable_mfa_for_user(user_id):
 
     try:
         headers = get_auth_headers()
-        response = requests.post(
-            f"{Config.API_BASE_URL}/api/users/{user_id}/mfa/disable",
+        response = api_client.post(
+            f"/api/users/{user_id}/mfa/disable",
             headers=headers,
             timeout=120
         )
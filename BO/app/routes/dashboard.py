@@ -1,9 +1,10 @@
 # app/routes/dashboard.py - VERSIÓN CORREGIDA CON ESTRUCTURA GARANTIZADA
 from flask import Blueprint, render_template, session, jsonify, current_app, redirect, Response
 from flask_login import login_required, current_user
-import requests
 from datetime import datetime, timedelta
+from concurrent.futures import TimeoutError as FutureTimeout
 from config import Config
+from app.api_client import api_client
 import json
 import redis
 import hashlib
@@ -80,6 +81,108 @@ def get_default_stats():
     }
 
 
+# Plazo máximo (segundos, desde el inicio de fetch_real_data) de cada fuente
+DASHBOARD_DEADLINES = {
+    "health": float(os.getenv("DASHBOARD_HEALTH_DEADLINE", "5")),
+    "users": float(os.getenv("DASHBOARD_USERS_DEADLINE", "5")),
+    "memory_cards": float(os.getenv("DASHBOARD_CARDS_DEADLINE", "5")),
+    "docker_logs": float(os.getenv("DASHBOARD_LOGS_DEADLINE", "10")),
+}
+
+
+def _timed(func):
+    """(respuesta, excepción, segundos) de una llamada a la API"""
+    started = time.perf_counter()
+    try:
+        return func(), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+
+def fetch_sources(calls, deadlines=DASHBOARD_DEADLINES):
+    """
+    Lanzar todas las llamadas a la vez en el pool del cliente de la API y
+    esperar a cada una como mucho hasta su plazo.
+
+    Devuelve (respuestas, tiempos): las fuentes que fallan o no llegan a
+    tiempo no aparecen en respuestas (resultado parcial) y en tiempos quedan
+    como error/timeout. El total es el de la fuente más lenta, no la suma.
+    Una fuente que vence su plazo sin haber empezado se cancela: la página
+    ya no la espera y no debe ocupar el pool después.
+    """
+    started = time.perf_counter()
+    futures = {name: api_client.submit(_timed, func) for name, func in calls.items()}
+    responses, sources = {}, {}
+
+    for name in sorted(futures, key=lambda n: deadlines[n]):
+        remaining = deadlines[name] - (time.perf_counter() - started)
+        try:
+            response, error, elapsed = futures[name].result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            futures[name].cancel()
+            current_app.logger.warning(f"[Dashboard] {name}: sin respuesta en {deadlines[name]}s")
+            sources[name] = {"ms": round(deadlines[name] * 1000, 1), "status": "timeout"}
+            continue
+
+        if error is not None:
+            current_app.logger.error(f"[Dashboard] Error fetching {name}: {error}")
+            status = "error"
+        else:
+            responses[name] = response
+            status = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+        sources[name] = {"ms": round(elapsed * 1000, 1), "status": status}
+
+    timings = {
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        "sources": sources,
+    }
+    return responses, timings
+
+
+def apply_health(stats, response):
+    if response.status_code == 200:
+        health_data = response.json()
+        stats["api_status"] = "online" if health_data.get("ok") or health_data.get("status") == "healthy" else "error"
+        # Actualizar users_count si viene en health
+        if "users_count" in health_data:
+            stats["users_count"] = health_data.get("users_count", 0)
+    else:
+        stats["api_status"] = "offline"
+
+
+def apply_users(stats, response):
+    if response.status_code == 200:
+        users_data = response.json()
+
+        if users_data.get("ok"):
+            users = users_data.get("users", [])
+            stats["total_users"] = len(users)
+            stats["active_users"] = len(
+                [u for u in users if u.get("status") == "active"]
+            )
+            stats["users_count"] = len(users)
+
+            # Generar actividad basada en usuarios reales
+            stats["recent_activity"] = generate_recent_activity(users)
+
+
+def apply_memory_cards(stats, response):
+    if response.status_code == 200:
+        cards_data = response.json()
+
+        if cards_data.get("ok"):
+            stats["total_cards"] = len(cards_data.get("cards", []))
+
+
+def apply_docker_logs(stats, response):
+    if response.status_code == 200:
+        logs_data = response.json()
+        if isinstance(logs_data, dict):
+            stats["docker_logs"] = logs_data.get("logs", [])[:100]
+        elif isinstance(logs_data, list):
+            stats["docker_logs"] = logs_data[:100]
+
+
 @cache_dashboard(ttl=20)
 def fetch_real_data():
     """
@@ -89,103 +192,54 @@ def fetch_real_data():
     - Estado API
     - Docker logs
 
+    Las cuatro fuentes se piden en paralelo (ver fetch_sources): el render
+    tarda lo que la más lenta, y una fuente lenta o caída solo deja su parte
+    con los valores por defecto. stats["timings"] lleva el desglose por fuente.
+
     GARANTIZA que SIEMPRE retorna estructura completa
     """
 
     # Iniciar con estructura completa por defecto
     stats = get_default_stats()
+    # Los headers salen de la sesión: se leen aquí, no en los hilos del pool
     headers = get_auth_headers()
 
+    responses, stats["timings"] = fetch_sources({
+        "health": lambda: api_client.health(timeout=DASHBOARD_DEADLINES["health"]),
+        "users": lambda: api_client.list_users(headers=headers, timeout=DASHBOARD_DEADLINES["users"]),
+        "memory_cards": lambda: api_client.list_memory_cards(headers=headers, timeout=DASHBOARD_DEADLINES["memory_cards"]),
+        "docker_logs": lambda: api_client.docker_logs(headers=headers, timeout=DASHBOARD_DEADLINES["docker_logs"]),
+    })
+
     # ---------------------------------------------------
     # 1️⃣ HEALTH CHECK API
     # ---------------------------------------------------
     try:
-        health_response = requests.get(
-            f"{Config.API_BASE_URL}/api/health",
-            timeout=5
-        )
-
-        if health_response.status_code == 200:
-            health_data = health_response.json()
-            stats["api_status"] = "online" if health_data.get("ok") or health_data.get("status") == "healthy" else "error"
-            # Actualizar users_count si viene en health
-            if "users_count" in health_data:
-                stats["users_count"] = health_data.get("users_count", 0)
+        if "health" in responses:
+            apply_health(stats, responses["health"])
         else:
             stats["api_status"] = "offline"
-
     except Exception as e:
         current_app.logger.error(f"[Dashboard] API health error: {e}")
         stats["api_status"] = "offline"
 
     # ---------------------------------------------------
-    # 2️⃣ SI LA API ESTÁ ONLINE → CARGAR DATOS REALES
+    # 2️⃣ SI LA API ESTÁ ONLINE → USAR LOS DATOS REALES
     # ---------------------------------------------------
     if stats["api_status"] == "online":
-
-        # ---------------- USERS ----------------
-        try:
-            users_response = requests.get(
-                f"{Config.API_BASE_URL}/api/users",
-                headers=headers,
-                timeout=5
-            )
-
-            if users_response.status_code == 200:
-                users_data = users_response.json()
-
-                if users_data.get("ok"):
-                    users = users_data.get("users", [])
-                    stats["total_users"] = len(users)
-                    stats["active_users"] = len(
-                        [u for u in users if u.get("status") == "active"]
-                    )
-                    stats["users_count"] = len(users)
-
-                    # Generar actividad basada en usuarios reales
-                    stats["recent_activity"] = generate_recent_activity(users)
-
-        except Exception as e:
-            current_app.logger.error(f"[Dashboard] Error fetching users: {e}")
-
-        # ---------------- MEMORY CARDS ----------------
-        try:
-            cards_response = requests.get(
-                f"{Config.API_BASE_URL}/api/memory-cards",
-                headers=headers,
-                timeout=5
-            )
-
-            if cards_response.status_code == 200:
-                cards_data = cards_response.json()
-
-                if cards_data.get("ok"):
-                    stats["total_cards"] = len(cards_data.get("cards", []))
-
-        except Exception as e:
-            current_app.logger.error(f"[Dashboard] Error fetching cards: {e}")
+        for name, apply in (("users", apply_users),
+                            ("memory_cards", apply_memory_cards),
+                            ("docker_logs", apply_docker_logs)):
+            if name not in responses:
+                continue
+            try:
+                apply(stats, responses[name])
+            except Exception as e:
+                current_app.logger.error(f"[Dashboard] Error fetching {name}: {e}")
 
         # ---------------- SYSTEM STATS ----------------
         stats["system_stats"] = get_system_stats(stats["api_status"])
 
-        # ---------------- DOCKER LOGS (SSR) ----------------
-        try:
-            logs_response = requests.get(
-                f"{Config.API_BASE_URL}/api/docker/logs",
-                headers=headers,
-                timeout=10
-            )
-
-            if logs_response.status_code == 200:
-                logs_data = logs_response.json()
-                if isinstance(logs_data, dict):
-                    stats["docker_logs"] = logs_data.get("logs", [])[:100]
-                elif isinstance(logs_data, list):
-                    stats["docker_logs"] = logs_data[:100]
-
-        except Exception as e:
-            current_app.logger.error(f"[Dashboard] Error fetching docker logs: {e}")
-
     # ---------------- SUMMARY (para las plantillas) ----------------
     stats["summary"] = {
         "total_users": stats.get("total_users", 0),
@@ -341,7 +395,14 @@ def api_dashboard_stats():
     """Endpoint API para obtener estadísticas del dashboard (AJAX)"""
     try:
         stats = fetch_real_data()
-        return jsonify(stats)
+        response = jsonify(stats)
+        # Desglose por fuente también como Server-Timing (visible en DevTools)
+        sources = stats.get("timings", {}).get("sources", {})
+        if sources:
+            response.headers["Server-Timing"] = ", ".join(
+                f'{name};dur={t["ms"]};desc="{t["status"]}"' for name, t in sources.items()
+            )
+        return response
     except Exception:
         return jsonify(get_default_stats())
 
@@ -352,7 +413,7 @@ def api_dashboard_activity():
     """Endpoint API para actividad reciente (AJAX)"""
     try:
         headers = get_auth_headers()
-        users_response = requests.get(f"{Config.API_BASE_URL}/api/users", headers=headers)
+        users_response = api_client.list_users(headers=headers)
 
         if users_response.status_code == 200:
             users_data = users_response.json()
@@ -392,11 +453,7 @@ def api_dashboard_docker_logs():
     """Obtener logs Docker para el dashboard"""
     try:
         headers = get_auth_headers()
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/docker/logs",
-            headers=headers,
-            timeout=10
-        )
+        response = api_client.docker_logs(headers=headers, timeout=10)
 
         if response.status_code == 200:
             logs_data = response.json()
@@ -416,11 +473,7 @@ def docker_logs_stream():
         while True:
             try:
                 headers = get_auth_headers()
-                r = requests.get(
-                    f"{Config.API_BASE_URL}/api/docker/logs",
-                    headers=headers,
-                    timeout=10
-                )
+                r = api_client.docker_logs(headers=headers, timeout=10)
                 if r.status_code == 200:
                     yield f"data: {json.dumps(r.json())}\n\n"
             except Exception as e:
@@ -443,11 +496,7 @@ def api_dashboard_docker_containers():
     """Obtener información de contenedores para el dashboard"""
     try:
         headers = get_auth_headers()
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/docker/containers",
-            headers=headers,
-            timeout=10
-        )
+        response = api_client.docker_containers(headers=headers, timeout=10)
 
         if response.status_code == 200:
             containers_data = response.json()
@@ -5,9 +5,14 @@ from flask_login import login_required, current_user
 import requests
 
 from config import Config
+from app.api_client import api_client
 
 bp = Blueprint('memory_cards', __name__, url_prefix='/memory-cards')
 
+# Paginación del listado: tamaño de página y campos que usa list.html
+CARD_PAGE_SIZE = 200
+CARD_LIST_FIELDS = 'question,answer,category,difficulty,tags,box,times_reviewed,times_correct,times_incorrect'
+
 
 def get_auth_headers():
     """Obtener headers de autenticación con token JWT"""
@@ -25,23 +30,28 @@ def card_list():
         headers = get_auth_headers()
         print(f"🔍 Obteniendo memory cards con headers: {headers}")
 
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/memory-cards",
-            headers=headers,
-            timeout=10
-        )
+        cards = []
+        params = {'limit': CARD_PAGE_SIZE, 'fields': CARD_LIST_FIELDS}
+        while True:
+            response = api_client.list_memory_cards(headers=headers, params=params, timeout=10)
 
-        print(f"📡 Respuesta API /api/memory-cards: {response.status_code}")
+            print(f"📡 Respuesta API /api/memory-cards: {response.status_code}")
 
-        if response.status_code == 200:
+            if response.status_code != 200:
+                break
             data = response.json()
-            if data.get('ok'):
-                cards = data.get('cards', [])
+            if not data.get('ok'):
+                break
+            cards.extend(data.get('cards', []))
+            # Siguiente página por cursor
+            if not data.get('next_cursor'):
                 print(f"✅ Memory cards obtenidas: {len(cards)}")
                 return render_template('memory_cards/list.html', cards=cards)
-            else:
-                print(f"❌ API error: {data.get('detail', 'Unknown error')}")
-                flash(f"Error en la API: {data.get('detail', 'Error desconocido')}", 'error')
+            params['cursor'] = data['next_cursor']
+
+        if response.status_code == 200:
+            print(f"❌ API error: {data.get('detail', 'Unknown error')}")
+            flash(f"Error en la API: {data.get('detail', 'Error desconocido')}", 'error')
         elif response.status_code == 401:
             print("❌ Error 401: Token inválido o expirado")
             flash('❌ Sesión expirada. Por favor inicia sesión nuevamente.', 'error')
@@ -81,12 +91,7 @@ def create_card():
             
             print(f"📤 Enviando a API: {data}")
 
-            response = requests.post(
-                f"{Config.API_BASE_URL}/api/memory-cards",
-                headers=headers,
-                json=data,
-                timeout=10
-            )
+            response = api_client.create_memory_card(data, headers=headers, timeout=10)
 
             if response.status_code in (200, 201):
                 flash('✅ Memory card creada correctamente', 'success')
@@ -121,12 +126,7 @@ def edit_card(card_id):
                 # Aquí también podrías mandar box/tags si los editas en el formulario
             }
 
-            response = requests.put(
-                f"{Config.API_BASE_URL}/api/memory-cards/{card_id}",
-                headers=headers,
-                json=data,
-                timeout=10
-            )
+            response = api_client.update_memory_card(card_id, data, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 flash('✅ Memory card actualizada correctamente', 'success')
@@ -146,11 +146,7 @@ def edit_card(card_id):
     # GET: obtener datos actuales de la card
     try:
         headers = get_auth_headers()
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/memory-cards/{card_id}",
-            headers=headers,
-            timeout=5
-        )
+        response = api_client.get_memory_card(card_id, headers=headers, timeout=5)
 
         if response.status_code == 200:
             data = response.json()
@@ -173,11 +169,7 @@ def delete_card(card_id):
     """Eliminar una memory card"""
     try:
         headers = get_auth_headers()
-        response = requests.delete(
-            f"{Config.API_BASE_URL}/api/memory-cards/{card_id}",
-            headers=headers,
-            timeout=5
-        )
+        response = api_client.delete_memory_card(card_id, headers=headers, timeout=5)
 
         if response.status_code == 200:
             flash('✅ Memory card eliminada correctamente', 'success')
@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, request, flash, redirect, url_for,
 from flask_login import login_required, current_user
 import requests
 from config import Config
+from app.api_client import api_client
 from app.models.user import BackofficeUser
 
 bp = Blueprint('users', __name__, url_prefix='/users')
@@ -21,11 +22,7 @@ def user_list():
         headers = get_auth_headers()
         print(f"🔍 Obteniendo usuarios con headers: {headers}")
         
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/users", 
-            headers=headers,
-            timeout=10
-        )
+        response = api_client.list_users(headers=headers, timeout=10)
         
         print(f"📡 Respuesta API /api/users: {response.status_code}")
         
@@ -81,11 +78,7 @@ def user_detail(user_id):
         print(f"🔍 Obteniendo detalles de usuario {user_id}")
         
         # Obtener información básica del usuario
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/users/{user_id}",
-            headers=headers,
-            timeout=5
-        )
+        response = api_client.get_user(user_id, headers=headers, timeout=5)
         
         print(f"📡 Respuesta API /api/users/{user_id}: {response.status_code}")
         
@@ -164,11 +157,7 @@ def user_progress(user_id):
         headers = get_auth_headers()
         
         # Obtener información básica del usuario
-        user_response = requests.get(
-            f"{Config.API_BASE_URL}/api/users/{user_id}",
-            headers=headers,
-            timeout=5
-        )
+        user_response = api_client.get_user(user_id, headers=headers, timeout=5)
         
         if user_response.status_code != 200:
             flash('Usuario no encontrado', 'error')
@@ -200,11 +189,7 @@ def toggle_user_status(user_id):
         headers = get_auth_headers()
         
         # Primero obtener el usuario actual
-        response = requests.get(
-            f"{Config.API_BASE_URL}/api/users/{user_id}",
-            headers=headers,
-            timeout=5
-        )
+        response = api_client.get_user(user_id, headers=headers, timeout=5)
         
         if response.status_code == 200:
             data = response.json()
@@ -215,11 +200,8 @@ def toggle_user_status(user_id):
                 print(f"🔄 Cambiando estado de usuario {user_id} de {current_status} a {new_status}")
                 
                 # Actualizar estado
-                update_response = requests.patch(
-                    f"{Config.API_BASE_URL}/api/users/{user_id}",
-                    headers=headers,
-                    json={"status": new_status},
-                    timeout=5
+                update_response = api_client.update_user(
+                    user_id, {"status": new_status}, headers=headers, timeout=5
                 )
                 
                 if update_response.status_code == 200:
@@ -250,10 +232,8 @@ def delete_user(userid):
     """Eliminar (desactivar) un usuario desde el Backoffice."""
     try:
         headers = get_auth_headers()
-        api_url = f"{Config.API_BASE_URL}/api/users/{userid}"
-
-        print(f"Eliminando usuario {userid} via {api_url}")
-        response = requests.delete(api_url, headers=headers, timeout=5)
+        print(f"Eliminando usuario {userid} via {api_client.base_url}/api/users/{userid}")
+        response = api_client.delete_user(userid, headers=headers, timeout=5)
 
         if response.status_code == 200:
             data = response.json()
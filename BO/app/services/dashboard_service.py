@@ -1,11 +1,10 @@
-import requests
 from datetime import datetime
 
-API_BASE = "http://backend:5000/api"  # nombre del servicio docker
+from app.api_client import api_client
 
 def get_dashboard_stats():
     try:
-        r = requests.get(f"{API_BASE}/dashboard/stats", timeout=3)
+        r = api_client.get("/api/dashboard/stats", timeout=3)
         r.raise_for_status()
         data = r.json()
     except Exception as e:
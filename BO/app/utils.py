@@ -2,6 +2,7 @@ import requests
 from functools import wraps
 from flask import current_app, flash, redirect, url_for
 from flask_login import current_user
+from app.api_client import api_client
 
 def admin_required(f):
     @wraps(f)
@@ -13,10 +14,9 @@ def admin_required(f):
     return decorated_function
 
 def api_request(method, endpoint, **kwargs):
-    """Helper para hacer requests a la API principal"""
-    base_url = current_app.config['API_BASE_URL']
+    """Helper para hacer requests a la API principal (vía el cliente compartido)"""
     try:
-        response = requests.request(method, f"{base_url}{endpoint}", **kwargs)
+        response = api_client.request(method, endpoint, **kwargs)
         return response
     except requests.RequestException as e:
         current_app.logger.error(f"API request failed: {e}")
@@ -0,0 +1,65 @@
+# answer_cache.py - Cache de respuestas del chat
+"""
+Cache de respuestas para /ask y /api/chat/ask sobre el backend compartido
+(simple_memory_cache): las preguntas repetidas no vuelven a pasar por el modelo.
+
+La clave combina la pregunta normalizada (minúsculas, sin tildes ni signos,
+conservando todas las palabras y su orden: "con"/"sin"/"no" cambian la
+respuesta) con el id y una huella del contenido de cada tarjeta recuperada.
+Las preguntas cuya clave queda casi vacía ("¿y eso?") no se cachean. Si una tarjeta cambia, cambia la clave y la respuesta
+vieja deja de usarse; el backend la desaloja por TTL/LRU.
+"""
+
+import hashlib
+import os
+from functools import wraps
+
+from card_index import _WORD_RE, _fold
+from simple_memory_cache import cache_result
+
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# Longitud mínima (caracteres) de la pregunta normalizada para cachearla
+ANSWER_CACHE_MIN_KEY = int(os.getenv("ANSWER_CACHE_MIN_KEY", "8"))
+
+
+def normalize_question(question):
+    """Palabras de la pregunta en orden, sin tildes ni signos ("se apaga con agua")"""
+    return " ".join(_WORD_RE.findall(_fold(question or "")))
+
+
+def is_cacheable(question):
+    return len(normalize_question(question)) >= ANSWER_CACHE_MIN_KEY
+
+
+def cards_signature(cards):
+    """id:huella de las tarjetas de contexto (cambia si se edita front/back)"""
+    parts = []
+    for card in cards or ():
+        content = f"{card.get('front') or ''}\x1f{card.get('back') or ''}"
+        parts.append(f"{card.get('_id') or card.get('id')}:{hashlib.md5(content.encode()).hexdigest()[:8]}")
+    return ",".join(sorted(parts))
+
+
+def answer_key(kind, question, cards=()):
+    raw = f"{normalize_question(question)}|{cards_signature(cards)}"
+    return f"answer:{kind}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def cached_answer(kind, ttl=ANSWER_CACHE_TTL):
+    """Decorador para fn(question, cards=()) -> respuesta.
+
+    Las excepciones (cola llena, timeout, modelo no disponible) no se cachean
+    y las preguntas idénticas concurrentes se calculan una sola vez. Las
+    preguntas demasiado cortas van siempre al modelo.
+    """
+    def decorator(func):
+        cached = cache_result(ttl=ttl, key_func=lambda question, cards=(): answer_key(kind, question, cards))(func)
+
+        @wraps(func)
+        def wrapper(question, cards=()):
+            if not is_cacheable(question):
+                return func(question, cards)
+            return cached(question, cards)
+
+        return wrapper
+    return decorator
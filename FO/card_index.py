@@ -0,0 +1,247 @@
+# card_index.py - Índice BM25 en memoria de las tarjetas de cada usuario
+"""
+Recuperación de contexto para el chat sin ir a Mongo en cada pregunta.
+
+- Por usuario: índice invertido término -> {card_id: tf} sobre front + back,
+  con ranking BM25. Se construye de forma perezosa con una sola lectura.
+- Las escrituras de tarjetas lo actualizan en el sitio (upsert_card /
+  remove_card / set_box); sync masivo o cambios desde otro proceso se cubren
+  con invalidate() y una reconstrucción en segundo plano cada INDEX_TTL
+  segundos (mientras tanto se sigue sirviendo el índice anterior).
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+INDEX_TTL = int(os.getenv("CARD_INDEX_TTL", "600"))
+INDEX_MAX_USERS = int(os.getenv("CARD_INDEX_MAX_USERS", "500"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+INDEX_FIELDS = {"front": 1, "back": 1, "box": 1, "deck": 1}
+
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset("""
+a al algo como con de del el en es esta este esto la las lo los mas me mi no o para
+pero por que se si sin sobre su sus un una uno unos unas y ya cual cuales cuando donde
+hay ser son tiene tienen the of and to in is what how
+""".split())
+
+
+def _fold(text):
+    """minúsculas y sin tildes"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _stem(token):
+    # Plurales simples (mangueras -> manguera, presiones -> presion)
+    if len(token) > 5 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 4 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [
+        _stem(tok) for tok in _WORD_RE.findall(_fold(text or ""))
+        if len(tok) > 1 and tok not in _STOPWORDS
+    ]
+
+
+class UserCardIndex:
+    """Índice invertido BM25 de las tarjetas de un usuario"""
+
+    def __init__(self, user):
+        self.user = user
+        self.lock = threading.Lock()
+        self.cards = {}       # card_id -> {front, back, box, deck}
+        self.lengths = {}     # card_id -> nº de términos
+        self.postings = {}    # término -> {card_id: tf}
+        self.total_length = 0
+        self._norms = None    # card_id -> normalización BM25 por longitud
+        self.built_at = 0.0
+        self.dirty = False    # invalidado: reconstruir en segundo plano
+        self.rebuilding = False
+
+    # ----- estado -----
+    def built(self):
+        return self.built_at > 0.0
+
+    def stale(self):
+        return self.dirty or time.monotonic() - self.built_at > INDEX_TTL
+
+    # ----- mantenimiento -----
+    def _remove(self, card_id):
+        card = self.cards.pop(card_id, None)
+        if card is None:
+            return
+        for term in card["_terms"]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(card_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(card_id, 0)
+        self._norms = None
+
+    def _add(self, card_id, doc):
+        terms = Counter(tokenize(f"{doc.get('front') or ''} {doc.get('back') or ''}"))
+        self.cards[card_id] = {
+            "_id": doc.get("_id", card_id),
+            "front": doc.get("front") or "",
+            "back": doc.get("back") or "",
+            "box": int(doc.get("box", 1)),
+            "deck": doc.get("deck", "general"),
+            "_terms": tuple(terms),
+        }
+        length = sum(terms.values())
+        self.lengths[card_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[card_id] = tf
+        self._norms = None
+
+    def load(self, docs):
+        """Sustituir el contenido del índice (reconstrucción completa)"""
+        fresh = UserCardIndex(self.user)
+        for doc in docs:
+            fresh._add(str(doc["_id"]), doc)
+        with self.lock:
+            self.cards, self.lengths = fresh.cards, fresh.lengths
+            self.postings, self.total_length = fresh.postings, fresh.total_length
+            self._norms = None
+            self.built_at = time.monotonic()
+            self.dirty = False
+
+    def upsert(self, doc):
+        card_id = str(doc["_id"])
+        with self.lock:
+            self._remove(card_id)
+            self._add(card_id, doc)
+
+    def remove(self, card_id):
+        with self.lock:
+            self._remove(str(card_id))
+
+    def set_box(self, card_id, box):
+        with self.lock:
+            card = self.cards.get(str(card_id))
+            if card is not None:
+                card["box"] = int(box)
+
+    # ----- búsqueda -----
+    def _card_norms(self):
+        """k1 * (1 - b + b * len / avg_len) por tarjeta (cacheado hasta la próxima escritura)"""
+        if self._norms is None:
+            avg_len = self.total_length / len(self.cards) or 1.0
+            self._norms = {
+                card_id: BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+                for card_id, length in self.lengths.items()
+            }
+        return self._norms
+
+    def search(self, query, deck="", limit=6):
+        terms = set(tokenize(query))
+        with self.lock:
+            n = len(self.cards)
+            if not terms or not n:
+                return []
+            norms = self._card_norms()
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                weight = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5)) * (BM25_K1 + 1)
+                for card_id, tf in postings.items():
+                    scores[card_id] = scores.get(card_id, 0.0) + weight * tf / (tf + norms[card_id])
+            if deck:
+                scores = {cid: s for cid, s in scores.items() if self.cards[cid]["deck"] == deck}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [
+                {k: v for k, v in self.cards[cid].items() if k != "_terms"} | {"score": score}
+                for cid, score in best
+            ]
+
+
+class CardIndexRegistry:
+    """Índices por usuario con límite LRU"""
+
+    def __init__(self, max_users=INDEX_MAX_USERS):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user, create=True):
+        with self._lock:
+            index = self._indexes.get(user)
+            if index is None and create:
+                index = UserCardIndex(user)
+                self._indexes[user] = index
+                if len(self._indexes) > self.max_users:
+                    self._indexes.popitem(last=False)
+            elif index is not None:
+                self._indexes.move_to_end(user)
+            return index
+
+    def _rebuild(self, index, cards_col):
+        index.load(cards_col.find({"user": index.user}, INDEX_FIELDS))
+
+    def _rebuild_async(self, index, cards_col):
+        with index.lock:
+            if index.rebuilding:
+                return
+            index.rebuilding = True
+
+        def run():
+            try:
+                self._rebuild(index, cards_col)
+            except Exception as e:
+                print(f"⚠️ Error reconstruyendo índice de tarjetas de {index.user}: {e}")
+            finally:
+                index.rebuilding = False
+
+        threading.Thread(target=run, name="card-index-rebuild", daemon=True).start()
+
+    def search(self, user, query, cards_col, deck="", limit=6):
+        """Tarjetas más relevantes (BM25); Mongo solo en la primera construcción"""
+        index = self._get(user)
+        if not index.built():
+            self._rebuild(index, cards_col)
+        elif index.stale():
+            self._rebuild_async(index, cards_col)
+        return index.search(query, deck=deck, limit=limit)
+
+    # ----- escrituras (solo si el índice ya existe) -----
+    def upsert_card(self, user, doc):
+        index = self._get(user, create=False)
+        if index is not None and index.built():
+            index.upsert(doc)
+
+    def remove_card(self, user, card_id):
+        index = self._get(user, create=False)
+        if index is not None:
+            index.remove(card_id)
+
+    def set_box(self, user, card_id, box):
+        index = self._get(user, create=False)
+        if index is not None:
+            index.set_box(card_id, box)
+
+    def invalidate(self, user):
+        """Reconstruir en la próxima búsqueda (sync masivo)"""
+        index = self._get(user, create=False)
+        if index is not None:
+            with index.lock:
+                index.dirty = True
+
+
+card_index = CardIndexRegistry()
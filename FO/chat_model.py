@@ -1,49 +1,89 @@
+import json
+import os
+
+from keyword_matcher import KeywordMatcher, normalize
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ficheros de conocimiento (separados por os.pathsep):
+# {"default", "topics": [{id, answer, keywords: {palabra: peso}, priority?, requires?: [palabra]}]}
+KNOWLEDGE_PATHS = os.getenv(
+    "CHAT_KNOWLEDGE_PATHS", os.path.join(BASE_DIR, "data", "questions", "knowledge_base.json")
+).split(os.pathsep)
+
+DEFAULT_ANSWER = "Pregunta sobre: extintores, RCP, temperatura de fuego, evacuación o materiales peligrosos."
+
+
+def load_knowledge(paths=KNOWLEDGE_PATHS):
+    """Temas de todos los ficheros, en orden (el orden desempata la puntuación)"""
+    topics, default = [], None
+    for path in paths:
+        if not path:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar conocimiento de {path}: {e}")
+            continue
+        default = default or data.get("default")
+        topics.extend(t for t in data.get("topics", []) if t.get("id") and t.get("answer"))
+    return topics, default or DEFAULT_ANSWER
+
+
 class FirefighterChatModel:
-    def __init__(self):
+    def __init__(self, paths=KNOWLEDGE_PATHS):
         print("🚒 Iniciando modelo de chat para bomberos...")
-        
-        self.knowledge_base = {
-            "extintor": "Protocolo PASO: Pull (quitar seguro), Aim (apuntar base del fuego), Squeeze (apretar palanca), Sweep (barrer de lado a lado). Tipos: ABC (sólidos/líquidos/eléctricos), CO2 (eléctricos), Agua (sólidos).",
-            "incendio": "Procedimiento: Activar alarma, evacuar área, usar extintor si es seguro, llamar al 112. No usar ascensores. Punto de encuentro exterior.",
-            "rcp": "Reanimación Cardiopulmonar: 30 compresiones torácicas + 2 ventilaciones. Frecuencia: 100-120/min. Profundidad: 5-6 cm adultos. Usar DEA si disponible.",
-            "temperatura fuego": "Temperaturas fuego: Incendio vivienda 600-1000°C, flashover 500-600°C, backdraft 800-1200°C. Equipo protección: hasta 1000°C breve exposición.",
-            "fuego electrico": "Fuego eléctrico: Cortar corriente primero. Usar extintor CO2 o polvo ABC. Nunca usar agua. Mantener distancia 1m de equipos energizados.",
-            "evacuacion": "Evacuación: Salida ordenada, punto de encuentro designado, no volver atrás, cuenta de personas. Ayudar a personas con movilidad reducida.",
-            "material peligroso": "Protocolo: Identificar placas de peligro, mantener distancia, establecer zonas caliente/limpia, esperar especialistas hazmat. No tocar.",
-            "protocolo mayday": "MAYDAY 3 veces + LUNAR: Ubicación exacta, Unidad, Nombre, Asignación, Recursos. Repetir cada 30 segundos si no hay respuesta."
-        }
-        print("✅ Modelo cargado con conocimiento de bomberos")
+
+        topics, self.default_answer = load_knowledge(paths)
+        self.knowledge_base = {}    # tema -> respuesta
+        self._rank = {}             # tema -> posición (desempate)
+        self._priority = {}         # tema -> prioridad (gana a cualquier puntuación)
+        self._requires = {}         # tema -> palabras de las que debe aparecer alguna
+        self._keywords = {}         # palabra normalizada -> [(tema, peso)]
+        for topic in topics:
+            topic_id = topic["id"]
+            if topic_id not in self.knowledge_base:
+                self._rank[topic_id] = len(self._rank)
+            self.knowledge_base[topic_id] = topic["answer"]
+            self._priority[topic_id] = float(topic.get("priority", 0))
+            requires = {normalize(word).strip() for word in topic.get("requires") or ()} - {""}
+            if requires:
+                self._requires[topic_id] = requires
+            for word, weight in (topic.get("keywords") or {}).items():
+                self._keywords.setdefault(normalize(word).strip(), []).append((topic_id, float(weight)))
+        self._keywords.pop("", None)
+        required_words = set().union(*self._requires.values())
+        self.matcher = KeywordMatcher(set(self._keywords) | required_words)
+        print(f"✅ Modelo cargado con conocimiento de bomberos ({len(self.knowledge_base)} temas)")
+
+    def best_topic(self, question):
+        """
+        Tema con mayor prioridad y, dentro de ella, mayor peso acumulado (None
+        si ninguna palabra clave aparece). Un tema con requires solo cuenta si
+        aparece alguna de esas palabras.
+        """
+        found = self.matcher.find(question)
+        scores = {}
+        for word in found:
+            for topic_id, weight in self._keywords.get(word, ()):
+                scores[topic_id] = scores.get(topic_id, 0.0) + weight
+        for topic_id in [t for t in scores if t in self._requires and not self._requires[t] & found]:
+            del scores[topic_id]
+        if not scores:
+            return None
+        return max(scores, key=lambda t: (self._priority[t], scores[t], -self._rank[t]))
 
     def generate_response(self, question):
         """Genera respuesta basada en palabras clave"""
         if not question or len(question.strip()) < 2:
             return "Por favor, haz una pregunta sobre bomberos."
-        
-        question_lower = question.lower()
-        
-        # Búsqueda por keywords
-        if any(word in question_lower for word in ['extintor', 'fuego', 'incendio']):
-            if 'electric' in question_lower:
-                return self.knowledge_base['fuego electrico']
-            elif 'temperatura' in question_lower or 'grados' in question_lower or 'calor' in question_lower:
-                return self.knowledge_base['temperatura fuego']
-            else:
-                return self.knowledge_base['incendio']
-        
-        elif any(word in question_lower for word in ['rcp', 'reanimacion', 'corazon', 'paro']):
-            return self.knowledge_base['rcp']
-        
-        elif any(word in question_lower for word in ['evacuar', 'salida', 'emergencia']):
-            return self.knowledge_base['evacuacion']
-        
-        elif any(word in question_lower for word in ['material', 'peligroso', 'quimico']):
-            return self.knowledge_base['material peligroso']
-        
-        elif any(word in question_lower for word in ['mayday', 'ayuda', 'emergencia']):
-            return self.knowledge_base['protocolo mayday']
-        
-        # Respuesta por defecto
-        return "Pregunta sobre: extintores, RCP, temperatura de fuego, evacuación o materiales peligrosos."
+
+        topic_id = self.best_topic(question)
+        if topic_id is None:
+            # Respuesta por defecto
+            return self.default_answer
+        return self.knowledge_base[topic_id]
 
 # Instancia global
-chat_model = FirefighterChatModel()
\ No newline at end of file
+chat_model = FirefighterChatModel()
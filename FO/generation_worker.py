@@ -0,0 +1,337 @@
+# generation_worker.py - Worker de generación de texto con cola y micro-batching
+"""
+Un único hilo es dueño del pipeline de transformers; las rutas encolan el
+prompt y esperan el resultado. El worker junta las peticiones que llegan en
+la misma ventana (GEN_BATCH_WAIT_MS, hasta GEN_MAX_BATCH) y las genera en una
+sola llamada al modelo por cada max_new_tokens distinto (nadie genera ni
+espera más tokens de los que pidió), de modo que los usuarios concurrentes
+comparten la CPU en vez de competir por ella.
+
+- Cola acotada: si está llena, GenerationBusyError (la ruta responde 429).
+- Presupuestos: max_new_tokens limitado a GEN_MAX_NEW_TOKENS y un plazo por
+  petición; las que caducan en cola se descartan sin generar (GenerationTimeout).
+- shutdown() termina el hilo; lo que quede en cola falla con GenerationUnavailable.
+
+Variables de entorno:
+- GEN_QUEUE_LIMIT: prompts en espera antes de rechazar (por defecto 16)
+- GEN_MAX_BATCH: prompts por llamada al modelo (por defecto 8)
+- GEN_BATCH_WAIT_MS: espera para completar un lote (por defecto 20)
+- GEN_MAX_NEW_TOKENS: tope de tokens generados por prompt (por defecto 128)
+- GEN_TIMEOUT_S: plazo por defecto de cada petición (por defecto 20)
+- GEN_PRELOAD: cargar el modelo al arrancar en vez de en la primera pregunta
+  (por defecto 0). Con gunicorn.conf.py activa además preload_app: el master
+  carga los pesos una vez y los workers los comparten por copy-on-write.
+- GEN_WARMUP: generación corta tras cargar, antes de declararse listo (por defecto 1)
+- GEN_TORCH_THREADS: hilos de torch por worker (por defecto, los de torch)
+"""
+
+import gc
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+GEN_QUEUE_LIMIT = int(os.getenv("GEN_QUEUE_LIMIT", "16"))
+GEN_MAX_BATCH = int(os.getenv("GEN_MAX_BATCH", "8"))
+GEN_BATCH_WAIT_MS = int(os.getenv("GEN_BATCH_WAIT_MS", "20"))
+GEN_MAX_NEW_TOKENS = int(os.getenv("GEN_MAX_NEW_TOKENS", "128"))
+GEN_TIMEOUT_S = float(os.getenv("GEN_TIMEOUT_S", "20"))
+GEN_PRELOAD = os.getenv("GEN_PRELOAD", "0").lower() in ("1", "true", "yes")
+GEN_WARMUP = os.getenv("GEN_WARMUP", "1").lower() in ("1", "true", "yes")
+GEN_TORCH_THREADS = int(os.getenv("GEN_TORCH_THREADS", "0"))
+
+
+class GenerationBusyError(RuntimeError):
+    """La cola de generación está llena (responder 429 y reintentar)"""
+
+
+class GenerationTimeout(RuntimeError):
+    """La petición superó su plazo antes de generarse"""
+
+
+class GenerationUnavailable(RuntimeError):
+    """No hay modelo de generación cargado"""
+
+
+def load_pipeline():
+    """Cargar DialoGPT-small (o distilgpt2 de respaldo) listo para lotes"""
+    try:
+        from transformers import pipeline
+        import torch
+        print("🔍 Cargando modelo de IA (DialoGPT-small)...")
+        pipe = pipeline(
+            "text-generation",
+            model="microsoft/DialoGPT-small",
+            tokenizer="microsoft/DialoGPT-small",
+            device=0 if torch.cuda.is_available() else -1
+        )
+        print("✅ Modelo cargado (DialoGPT-small).")
+    except Exception as e:
+        print(f"⚠️ Error con DialoGPT-small: {e}. Probando distilgpt2…")
+        try:
+            from transformers import pipeline
+            pipe = pipeline("text-generation", model="distilgpt2")
+            print("✅ Respaldo cargado (distilgpt2).")
+        except Exception as e2:
+            print(f"❌ Sin modelos: {e2}")
+            return None
+
+    # Lotes con modelos decoder-only: padding a la izquierda con EOS
+    tokenizer = pipe.tokenizer
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token_id = tokenizer.eos_token_id
+    tokenizer.padding_side = "left"
+    return pipe
+
+
+# Marca en la cola para que el hilo termine (shutdown)
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ("prompt", "max_new_tokens", "deadline", "enqueued_at", "future")
+
+    def __init__(self, prompt, max_new_tokens, deadline):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.deadline = deadline
+        self.enqueued_at = time.perf_counter()
+        self.future = Future()
+
+
+class GenerationWorker:
+    """Hilo dueño del modelo que atiende una cola de prompts por lotes"""
+
+    def __init__(self, loader=load_pipeline, queue_limit=GEN_QUEUE_LIMIT,
+                 max_batch=GEN_MAX_BATCH, batch_wait_ms=GEN_BATCH_WAIT_MS):
+        self.loader = loader
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = max(0, batch_wait_ms) / 1000
+        self._queue = queue.Queue(maxsize=max(1, queue_limit))
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.pipe = None
+        self.loaded = threading.Event()
+        self.ready = threading.Event()   # cargado y calentado (o sin modelo)
+        self.preloaded = False
+        self.load_ms = 0.0
+        self.warmup_ms = 0.0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.batches = 0
+        self.peak_batch = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    # ----- ciclo de vida -----
+    def start(self):
+        with self._lock:
+            if self._stopping:
+                raise GenerationUnavailable("Worker de generación detenido")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="generation-worker", daemon=True)
+                self._thread.start()
+
+    def _load(self):
+        """Cargar el modelo una sola vez (lo llame preload() o el hilo)"""
+        with self._load_lock:
+            if self.loaded.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                self.pipe = self.loader()
+            except Exception as e:
+                print(f"❌ Error cargando el modelo de generación: {e}")
+            finally:
+                self.load_ms = (time.perf_counter() - started) * 1000
+                self.loaded.set()
+
+    def preload(self):
+        """
+        Cargar los pesos en el hilo actual, sin arrancar el worker.
+
+        Pensado para el master de gunicorn con preload_app: tras cargar se
+        congelan los objetos vivos (gc.freeze) para que el recolector de los
+        workers no los toque y las páginas sigan compartidas tras el fork.
+        No genera nada: el calentamiento se hace ya en cada worker.
+        """
+        self._load()
+        self.preloaded = True
+        gc.collect()
+        gc.freeze()
+
+    def _warm_up(self):
+        if self.pipe is None:
+            return
+        started = time.perf_counter()
+        try:
+            self.pipe(["Hola"], max_new_tokens=1, do_sample=False, return_full_text=False)
+        except Exception as e:
+            print(f"⚠️ Calentamiento del modelo fallido: {e}")
+        self.warmup_ms = (time.perf_counter() - started) * 1000
+
+    def _run(self):
+        if GEN_TORCH_THREADS > 0:
+            try:
+                import torch
+                torch.set_num_threads(GEN_TORCH_THREADS)
+            except Exception:
+                pass
+        self._load()
+        if GEN_WARMUP:
+            self._warm_up()
+        self.ready.set()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if batch:
+                self._generate(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Parar el hilo tras el lote en curso; lo que quede en cola falla con GenerationUnavailable"""
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    # ----- cola -----
+    def submit(self, prompt, max_new_tokens=GEN_MAX_NEW_TOKENS, timeout=GEN_TIMEOUT_S):
+        """Encolar un prompt; devuelve un Future con el texto generado"""
+        self.start()
+        request = _Request(prompt, max(1, min(max_new_tokens, GEN_MAX_NEW_TOKENS)), time.monotonic() + timeout)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise GenerationBusyError("Demasiadas preguntas en curso")
+        return request.future
+
+    def generate(self, prompt, max_new_tokens=GEN_MAX_NEW_TOKENS, timeout=GEN_TIMEOUT_S):
+        """Generar bloqueando hasta el resultado o el plazo"""
+        future = self.submit(prompt, max_new_tokens, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise GenerationTimeout("La generación superó el tiempo máximo")
+
+    def _drain(self, batch):
+        """Fallar las peticiones pendientes al parar"""
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for request in batch:
+            if request is not _STOP and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(GenerationUnavailable("Worker de generación detenido"))
+
+    def _next_batch(self):
+        """Siguiente lote de peticiones vivas (None al parar)"""
+        batch = [self._queue.get()]
+        window_end = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch and batch[-1] is not _STOP:
+            remaining = window_end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        if self._stopping or batch[-1] is _STOP:
+            self._drain(batch)
+            return None
+
+        now = time.monotonic()
+        live = []
+        for request in batch:
+            if not request.future.set_running_or_notify_cancel():
+                continue
+            if request.deadline <= now:
+                request.future.set_exception(GenerationTimeout("La petición caducó en cola"))
+                with self._lock:
+                    self.expired += 1
+                continue
+            live.append(request)
+        return live
+
+    def _generate(self, batch):
+        """Una llamada al modelo por presupuesto de tokens, de menor a mayor"""
+        groups = {}
+        for request in batch:
+            groups.setdefault(request.max_new_tokens, []).append(request)
+        for max_new_tokens in sorted(groups):
+            self._generate_group(groups[max_new_tokens], max_new_tokens)
+
+    def _generate_group(self, batch, max_new_tokens):
+        if self.pipe is None:
+            for request in batch:
+                request.future.set_exception(GenerationUnavailable("IA no disponible"))
+            return
+
+        started = time.perf_counter()
+        try:
+            outputs = self.pipe(
+                [r.prompt for r in batch],
+                max_new_tokens=max_new_tokens,
+                num_return_sequences=1,
+                temperature=0.7,
+                do_sample=True,
+                return_full_text=False,
+                batch_size=len(batch),
+            )
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.batches += 1
+            self.peak_batch = max(self.peak_batch, len(batch))
+            self.completed += len(batch)
+            self.total_run += elapsed
+            self.total_wait += sum(started - r.enqueued_at for r in batch)
+        for request, output in zip(batch, outputs):
+            # Con lista de prompts el pipeline devuelve una lista por prompt
+            result = output[0] if isinstance(output, list) else output
+            request.future.set_result(result.get("generated_text", "").strip())
+
+    def stats(self):
+        """Métricas de la cola de generación"""
+        with self._lock:
+            completed = self.completed or 1
+            batches = self.batches or 1
+            return {
+                "loaded": self.loaded.is_set() and self.pipe is not None,
+                "ready": self.ready.is_set(),
+                "preloaded": self.preloaded,
+                "load_ms": round(self.load_ms, 2),
+                "warmup_ms": round(self.warmup_ms, 2),
+                "queue_limit": self._queue.maxsize,
+                "queued": self._queue.qsize(),
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "avg_batch": round(self.completed / batches, 2),
+                "peak_batch": self.peak_batch,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "avg_wait_ms": round(self.total_wait / completed * 1000, 2),
+                "avg_batch_run_ms": round(self.total_run / batches * 1000, 2),
+            }
+
+
+generation_worker = GenerationWorker()
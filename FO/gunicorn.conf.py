@@ -0,0 +1,33 @@
+# gunicorn.conf.py - Configuración de gunicorn para el FO
+"""
+Con GEN_PRELOAD=1 se activa preload_app: el master importa la app y carga el
+modelo una vez; los workers se crean con fork y comparten esos pesos
+(copy-on-write), así que añadir workers no multiplica la RSS ni el arranque
+en frío. Cada worker arranca su hilo de generación en post_fork y lo calienta
+antes de que /health responda 200.
+
+El master también ha creado el backend de cache al importar la app; sus hilos
+(suscriptor pub/sub, limpieza de la L1) no pasan al worker y los rehace
+reinit_after_fork (registrado además con os.register_at_fork).
+
+Solo CPU: CUDA no sobrevive a un fork, con GPU dejar GEN_PRELOAD=0.
+"""
+
+import os
+
+from generation_worker import GEN_PRELOAD
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+timeout = 180
+graceful_timeout = 180
+preload_app = GEN_PRELOAD
+
+
+def post_fork(server, worker):
+    from simple_memory_cache import reinit_after_fork
+    reinit_after_fork()
+    if GEN_PRELOAD:
+        from generation_worker import generation_worker
+        generation_worker.start()
@@ -0,0 +1,164 @@
+# html_rewriter.py - Reescritura en una pasada del HTML del proxy de certificaciones
+"""
+Sustituye las pasadas sucesivas de _process_html_content (quitar metas
+restrictivas, neutralizar X-Frame-Options/CSP, rutas de CSS/JS/imágenes,
+URLs absolutas del dominio e inyección del script), que copiaban la página
+entera en cada re.sub, por una sola reescritura:
+
+1. Se localizan los tramos a cambiar con patrones precompilados que empiezan
+   por un literal (href=, src=, <meta, http, </head>...); el motor de re los
+   busca a velocidad de C, mucho más rápido que una alternancia única, y los
+   textos que no aparecen en la página (comprobado con `in`) ni se buscan.
+2. Los tramos se ordenan y la página se recompone en una pasada; un tramo
+   contenido en otro (p. ej. un dominio dentro de un href ya reescrito o lo que
+   haya dentro de un <meta> eliminado) lo resuelve el exterior.
+
+Reglas (idénticas a la versión por pasadas; los golden files de
+tests/unit/frontend/fixtures/proxy_pages lo fijan):
+- <meta> X-Frame-Options / Content-Security-Policy: se eliminan.
+- X-Frame-Options, frame-ancestors, SAMEORIGIN, DENY: se neutralizan.
+- href con .css y src con .js o imagen, relativos: pasan a proxy_path (y a
+  comillas dobles).
+- https?://<dominio>/ pasa a proxy_path.
+- Antes de cada </head> se inyecta el script de bypass (al principio si no hay).
+"""
+
+import re
+from functools import lru_cache
+
+# Sustituciones de texto (case-sensitive, como antes)
+TEXT_REPLACEMENTS = {
+    "X-Frame-Options": "X-Frame-Options-Disabled",
+    "frame-ancestors": "frame-ancestors-disabled",
+    "SAMEORIGIN": "ALLOWALL",
+    "DENY": "ALLOWALL",
+}
+
+_RESTRICTIVE_META_RE = re.compile(
+    r"""<meta[^>]*(?:http-equiv|name)=["']?(?:X-Frame-Options|Content-Security-Policy)["']?[^>]*>""",
+    re.IGNORECASE,
+)
+_TOKEN_RES = {token: re.compile(re.escape(token)) for token in TEXT_REPLACEMENTS}
+_TOKENS_RE = re.compile("|".join(re.escape(token) for token in TEXT_REPLACEMENTS))
+_CSS_RE = re.compile(r"""href=(?:"([^"]*\.css[^"]*)"|'([^']*\.css[^']*)')""")
+_SRC_RE = re.compile(
+    r"""src=(?:"([^"]*\.(?:js|png|jpg|jpeg|gif|webp|svg|ico)[^"]*)"|'([^']*\.(?:js|png|jpg|jpeg|gif|webp|svg|ico)[^']*)')"""
+)
+_IMG_EXT_RE = re.compile(r"\.(?:png|jpg|jpeg|gif|webp|svg|ico)")
+_EXTERNAL_PREFIXES = ("http:", "https:", "data:", "mailto:", "tel:", "javascript:", "//", "#", "?")
+_HEAD_CLOSE = "</head>"
+
+BYPASS_JS = '''
+    <script>
+    console.log('🔥 FirefighterAI Proxy v7.0 - Clean Processing');
+    
+    // Frame busting protection
+    if (window.top !== window.self) {
+        window.top = window.self;
+        window.parent = window.self;
+        
+        // Disable problematic methods
+        window.location.replace = function() { console.log('🔥 Blocked location.replace'); };
+        window.location.assign = function() { console.log('🔥 Blocked location.assign'); };
+    }
+    
+    // Remove any remaining restrictive meta tags
+    document.addEventListener('DOMContentLoaded', function() {
+        const restrictiveMetas = document.querySelectorAll(
+            'meta[http-equiv*="X-Frame"], meta[name*="X-Frame"], ' +
+            'meta[http-equiv*="Content-Security-Policy"], meta[name*="Content-Security-Policy"]'
+        );
+        restrictiveMetas.forEach(meta => {
+            console.log('🔥 Removing:', meta.outerHTML);
+            meta.remove();
+        });
+    });
+    </script>
+    '''
+
+
+class HtmlRewriter:
+    """Reescritor precompilado para un dominio y su ruta en el proxy"""
+
+    def __init__(self, domain, proxy_path):
+        self.domain = domain
+        self.proxy_path = proxy_path
+        self._proxy_marker = proxy_path.rstrip("/")
+        self._domain_hint = f"://{domain}/"
+        self._domain_re = re.compile(rf"https?://{re.escape(domain)}/")
+
+    # ----- reglas -----
+    def _is_valid_asset(self, url):
+        return bool(url) and self._proxy_marker not in url and not url.startswith(_EXTERNAL_PREFIXES)
+
+    def _asset_path(self, name, url):
+        """Nueva ruta del asset, o None si la URL se deja como está"""
+        if not self._is_valid_asset(url):
+            return None
+        if name == "href":
+            if not (url.endswith(".css") or ".css?" in url):
+                return None
+        elif not (url.endswith(".js") or ".js?" in url) and not _IMG_EXT_RE.search(url):
+            return None
+        return self.proxy_path + (url[1:] if url.startswith("/") else url)
+
+    def _attr(self, name, match):
+        """(atributo reescrito, 1 si cambió la ruta)"""
+        value, quote = match.group(1), '"'
+        if value is None:
+            value, quote = match.group(2), "'"
+        value = _TOKENS_RE.sub(lambda m: TEXT_REPLACEMENTS[m.group(0)], value)
+        new_path = self._asset_path(name, value)
+        changed = new_path is not None
+        if changed:
+            value, quote = new_path, '"'
+        if self._domain_hint in value:
+            value = self._domain_re.sub(self.proxy_path, value)
+        return f"{name}={quote}{value}{quote}", int(changed)
+
+    # ----- reescritura -----
+    def _spans(self, html):
+        """Tramos (inicio, fin, sustitución, rutas cambiadas) a aplicar"""
+        spans = [(m.start(), m.end(), "", 0) for m in _RESTRICTIVE_META_RE.finditer(html)]
+        for name, pattern in (("href", _CSS_RE), ("src", _SRC_RE)):
+            for m in pattern.finditer(html):
+                spans.append((m.start(), m.end(), *self._attr(name, m)))
+        for token, pattern in _TOKEN_RES.items():
+            if token in html:
+                replacement = TEXT_REPLACEMENTS[token]
+                spans.extend((m.start(), m.end(), replacement, 0) for m in pattern.finditer(html))
+        if self._domain_hint in html:
+            spans.extend((m.start(), m.end(), self.proxy_path, 0) for m in self._domain_re.finditer(html))
+        start = html.find(_HEAD_CLOSE)
+        while start != -1:
+            spans.append((start, start + len(_HEAD_CLOSE), BYPASS_JS + _HEAD_CLOSE, 0))
+            start = html.find(_HEAD_CLOSE, start + 1)
+        return spans
+
+    def rewrite(self, html):
+        """(HTML reescrito, nº de rutas de assets cambiadas)"""
+        spans = self._spans(html)
+        spans.sort(key=lambda span: (span[0], -span[1]))
+        out, pos, paths, injected = [], 0, 0, False
+        for start, end, replacement, changed in spans:
+            if start < pos:
+                continue  # dentro de un tramo ya sustituido
+            out.append(html[pos:start])
+            out.append(replacement)
+            pos = end
+            paths += changed
+            injected = injected or replacement.endswith(_HEAD_CLOSE)
+        out.append(html[pos:])
+        if not injected:
+            out.insert(0, BYPASS_JS)
+        return "".join(out), paths
+
+
+@lru_cache(maxsize=32)
+def get_rewriter(domain, proxy_path):
+    return HtmlRewriter(domain, proxy_path)
+
+
+def rewrite_html(html, domain, proxy_path):
+    """HTML listo para servir bajo proxy_path"""
+    return get_rewriter(domain, proxy_path).rewrite(html)[0]
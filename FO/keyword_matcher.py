@@ -0,0 +1,78 @@
+# keyword_matcher.py - Matcher multi-patrón (Aho-Corasick) para el chat
+"""
+Todas las palabras clave se compilan en un autómata de Aho-Corasick: una sola
+pasada sobre la pregunta encuentra todas las apariciones, da igual cuántas
+palabras clave haya (O(len(pregunta) + coincidencias)).
+
+Texto y palabras clave se normalizan igual (minúsculas, sin tildes). Una
+palabra clave solo cuenta si empieza al principio de una palabra, así
+"electric" encuentra "eléctrico" pero "paro" no encuentra "disparo".
+"""
+
+import unicodedata
+
+
+def normalize(text):
+    """minúsculas y sin tildes"""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+class KeywordMatcher:
+    """Autómata de Aho-Corasick sobre palabras clave normalizadas"""
+
+    def __init__(self, keywords=()):
+        self._goto = [{}]     # nodo -> {carácter: nodo}
+        self._fail = [0]
+        self._out = [()]      # nodo -> palabras clave que terminan aquí
+        for keyword in keywords:
+            self._add(keyword)
+        self._build()
+
+    def _add(self, keyword):
+        keyword = normalize(keyword).strip()
+        if not keyword:
+            return
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        if keyword not in self._out[node]:
+            self._out[node] = self._out[node] + (keyword,)
+
+    def _build(self):
+        # BFS: enlaces de fallo y salidas heredadas
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text):
+        """Conjunto de palabras clave que aparecen al inicio de una palabra de `text`"""
+        text = normalize(text)
+        found = set()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for keyword in self._out[node]:
+                start = i - len(keyword) + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    found.add(keyword)
+        return found
+
+    def __len__(self):
+        return len(self._goto) - 1
@@ -4,9 +4,12 @@ from datetime import datetime, timedelta, timezone
 from functools import wraps
 
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, ReturnDocument, UpdateOne
 from pymongo.errors import PyMongoError
 
+from card_index import card_index
+from leitner_queue import due_queues
+
 leitner_bp = Blueprint("leitner", __name__)
 
 # ========= Config & helpers =========
@@ -19,6 +22,9 @@ BOX_LABELS = {
     5: ("Caja 5", "Repaso quincenal"),
     6: ("Caja 6", "Repaso mensual"),
 }
+# Modo sesión: tarjetas por lote entregadas al navegador
+SESSION_BATCH_DEFAULT = int(os.getenv("LEITNER_SESSION_BATCH", "20"))
+SESSION_BATCH_MAX = 100
 # Para la plantilla: {box: {days:int, label:str}}
 INTERVALS_MAP = {
     i + 1: {"days": d, "label": ("hoy" if d == 0 else "1 día" if d == 1 else f"{d} días")}
@@ -47,6 +53,32 @@ def _due_for_box(box: int) -> datetime:
     days = DEFAULT_INTERVALS_DAYS[max(0, min(box - 1, len(DEFAULT_INTERVALS_DAYS) - 1))]
     return _now_utc() + timedelta(days=days)
 
+def _answer_update(correct, now):
+    """Update con pipeline: la caja nueva se calcula en Mongo desde la guardada.
+
+    La cola local puede ir hasta QUEUE_TTL segundos por detrás de Mongo (otra
+    pestaña, otro worker), así que solo se usa para leer.
+    """
+    new_box = {"$min": [{"$add": [{"$ifNull": ["$box", 1]}, 1]}, 6]} if correct else 1
+    # Fecha de repaso de cada caja calculada aquí; Mongo elige la que toca
+    due_by_box = [now + timedelta(days=days) for days in DEFAULT_INTERVALS_DAYS]
+    return [
+        {"$set": {
+            "box": new_box,
+            "last_reviewed": now,
+            "history": {"$concatArrays": [
+                {"$ifNull": ["$history", []]},
+                [{"ts": now, "result": "good" if correct else "fail"}],
+            ]},
+        }},
+        {"$set": {"due": {"$arrayElemAt": [due_by_box, {"$subtract": ["$box", 1]}]}}},
+    ]
+
+def _stored_due(doc, now):
+    """pymongo devuelve fechas naive en UTC"""
+    due = doc.get("due") or now
+    return due if due.tzinfo is not None else due.replace(tzinfo=timezone.utc)
+
 def _empty_board():
     board = {}
     for b in range(1, 7):
@@ -84,7 +116,11 @@ def get_cards_collection():
         # Índices idempotentes
         _cards.create_index([("user", ASCENDING), ("deck", ASCENDING), ("front", ASCENDING)], unique=True)
         _cards.create_index([("user", ASCENDING), ("due", ASCENDING), ("box", ASCENDING)])
+        # Precarga de la cola de vencidas (orden box, due)
+        _cards.create_index([("user", ASCENDING), ("box", ASCENDING), ("due", ASCENDING)])
         _cards.create_index([("box", ASCENDING)])
+        # Diff de la sincronización con el BO ($in sobre source_id)
+        _cards.create_index([("user", ASCENDING), ("source", ASCENDING), ("source_id", ASCENDING)])
         _safe_print("✅ Conectado a MongoDB para Leitner")
         return _cards
     except Exception as e:
@@ -195,7 +231,7 @@ def _ensure_user_has_cards(username, cards_col):
             inserted = 0
             for card in demo_cards:
                 try:
-                    cards_col.insert_one({
+                    doc = {
                         "user": username,
                         "deck": "general",
                         "front": card["front"],
@@ -204,7 +240,9 @@ def _ensure_user_has_cards(username, cards_col):
                         "due": _due_for_box(1),
                         "created_at": now,
                         "history": []
-                    })
+                    }
+                    cards_col.insert_one(doc)
+                    card_index.upsert_card(username, doc)
                     inserted += 1
                 except Exception as e:
                     # Ignorar errores de duplicados
@@ -212,6 +250,7 @@ def _ensure_user_has_cards(username, cards_col):
                         print(f"⚠️ Error sembrando carta: {e}")
             
             print(f"✅ Sembradas {inserted} tarjetas de demo para '{username}'")
+            due_queues.invalidate(username)
             return True
     except Exception as e:
         print(f"⚠️ Error verificando/sembrando tarjetas: {e}")
@@ -250,34 +289,22 @@ def api_next_card():
         print(f"🔍 DEBUG - Tarjeta encontrada (memoria): {card['question'][:50]}...")
         return jsonify({"ok": True, "card": card, "state": state})
 
-    # Con DB
+    # Con DB: cola local de vencidas (Mongo solo al recargar o rellenar)
     try:
-        print("🔍 DEBUG - Modo MongoDB")
+        queue = due_queues.get(username, deck)
+        if queue.stale():
+            # Verificar y sembrar tarjetas si el usuario no tiene ninguna
+            _ensure_user_has_cards(username, cards_col)
         
-        # Verificar y sembrar tarjetas si el usuario no tiene ninguna
-        _ensure_user_has_cards(username, cards_col)
-        
-        query = {'user': username, 'due': {'$lte': now}}
-
-        if deck:
-            query["deck"] = deck
-            
-        print(f"🔍 DEBUG - Query: {query}")
-        
-        doc = cards_col.find_one(query, sort=[("box", ASCENDING), ("due", ASCENDING)])
+        doc = queue.next_card(cards_col, now)
         
         if not doc:
-            print("🔍 DEBUG - No hay tarjetas en MongoDB que cumplan query")
-            # Debug: ver qué tarjetas hay en la DB
-            all_cards = list(cards_col.find({"user": username}))
-            print(f"🔍 DEBUG - Total tarjetas usuario: {len(all_cards)}")
-            for c in all_cards:
-                print(f"  - {c.get('front')} | Due: {c.get('due')} | Box: {c.get('box')}")
+            print(f"🔍 DEBUG - No hay tarjetas vencidas para {username}")
             return jsonify({"ok": True, "card": None})
         
         card = _normalize_card_out(doc)
         state = {"box": card["box"], "next_review_at": (doc.get("due") or now).isoformat()}
-        print(f"🔍 DEBUG - Tarjeta encontrada (DB): {card['question'][:50]}...")
+        print(f"🔍 DEBUG - Tarjeta encontrada (cola): {card['question'][:50]}...")
         return jsonify({"ok": True, "card": card, "state": state})
         
     except PyMongoError as e:
@@ -335,30 +362,22 @@ def api_answer():
     # Con DB
     from bson import ObjectId
     try:
-        doc = cards_col.find_one({"_id": ObjectId(card_id), "user": username}, {"box": 1, "deck": 1})
+        doc = cards_col.find_one_and_update(
+            {"_id": ObjectId(card_id), "user": username},
+            _answer_update(correct, now),
+            projection={"box": 1, "due": 1, "deck": 1},
+            return_document=ReturnDocument.AFTER,
+        )
         if not doc:
             return jsonify({"ok": False, "detail": "Carta no encontrada"}), 404
+        new_box = int(doc["box"])
+        new_due = _stored_due(doc, now)
+        due_queues.apply_answer(username, str(card_id), new_box, new_due, now)
+        card_index.set_box(username, card_id, new_box)
 
-        old_box = int(doc.get("box", 1))
-        new_box = 1 if not correct else min(old_box + 1, 6)
-        new_due = _due_for_box(new_box)
-
-        cards_col.update_one(
-            {"_id": ObjectId(card_id)},
-            {
-                "$set": {"box": new_box, "due": new_due, "last_reviewed": now},
-                "$push": {"history": {"ts": now, "result": "good" if correct else "fail"}}
-            }
-        )
-
-        # Siguiente tarjeta (mismo deck si lo tenía) - CORRECCIÓN AQUÍ
+        # Siguiente tarjeta (mismo deck si lo tenía) desde la cola
         deck = (doc.get("deck") or "").lower()
-        
-        # Llamar directamente a la función con los parámetros necesarios
-        next_card_doc = cards_col.find_one(
-            {'user': username, 'due': {'$lte': now}, **({'deck': deck} if deck else {})},
-            sort=[("box", ASCENDING), ("due", ASCENDING)]
-        )
+        next_card_doc = due_queues.get(username, deck).next_card(cards_col, now)
         
         if next_card_doc:
             next_card = _normalize_card_out(next_card_doc)
@@ -378,6 +397,153 @@ def api_answer():
         return jsonify({"ok": False, "detail": str(e)}), 500
 
 
+# ========= Modo sesión (lotes) =========
+def _session_limit(value):
+    try:
+        limit = int(value if value is not None else SESSION_BATCH_DEFAULT)
+    except (TypeError, ValueError):
+        limit = SESSION_BATCH_DEFAULT
+    return max(0, min(limit, SESSION_BATCH_MAX))
+
+def _session_card_out(doc, now):
+    card = _normalize_card_out(doc)
+    card["next_review_at"] = (doc.get("due") or now).isoformat()
+    return card
+
+def _session_batch(username, deck, limit, cards_col, now):
+    """Lote de tarjetas vencidas en orden (box, due) con una sola consulta"""
+    if limit <= 0:
+        return []
+
+    if cards_col is None:
+        pool = [c for c in _mem_user_list(username) if c.get("due", now) <= now]
+        if deck:
+            pool = [c for c in pool if (c.get("deck") or "general").lower() == deck]
+        pool.sort(key=lambda c: (c.get("box", 1), c.get("due", now)))
+        return [_session_card_out(c, now) for c in pool[:limit]]
+
+    query = {"user": username, "due": {"$lte": now}}
+    if deck:
+        query["deck"] = deck
+    cursor = cards_col.find(query, {"front": 1, "back": 1, "box": 1, "due": 1, "deck": 1})
+    cursor = cursor.sort([("box", ASCENDING), ("due", ASCENDING)]).limit(limit)
+    return [_session_card_out(doc, now) for doc in cursor]
+
+def _parse_session_answers(data):
+    """[{card_id|cardId, correct|result}] -> [(card_id, correct)] (última respuesta por carta)"""
+    answers = {}
+    for item in data.get("answers") or []:
+        if not isinstance(item, dict):
+            continue
+        card_id = item.get("card_id") or item.get("cardId")
+        if not card_id:
+            continue
+        if "correct" in item:
+            correct = bool(item.get("correct"))
+        else:
+            correct = (item.get("result") == "good")
+        answers[str(card_id)] = correct
+    return list(answers.items())
+
+@leitner_bp.route("/api/leitner/session", methods=["GET"])
+@login_required_bp
+def api_session_start():
+    """
+    Inicia una sesión de estudio: devuelve de una vez hasta ?limit= tarjetas vencidas.
+    Soporta ?deck=
+    """
+    username = session.get("user")
+    deck = (request.args.get("deck") or "").strip().lower()
+    limit = _session_limit(request.args.get("limit"))
+    now = _now_utc()
+    cards_col = get_cards_collection()
+
+    try:
+        if cards_col is not None:
+            _ensure_user_has_cards(username, cards_col)
+        cards = _session_batch(username, deck, limit, cards_col, now)
+        return jsonify({"ok": True, "cards": cards})
+    except PyMongoError as e:
+        return jsonify({"ok": False, "detail": str(e)}), 500
+
+@leitner_bp.route("/api/leitner/session", methods=["POST"])
+@login_required_bp
+def api_session_answers():
+    """
+    Aplica un lote de respuestas con un único bulk_write y devuelve el siguiente lote.
+    body: { answers: [{card_id, correct}, ...], deck?: "...", limit?: N }
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    username = session.get("user")
+    deck = (data.get("deck") or "").strip().lower()
+    limit = _session_limit(data.get("limit", 0))
+    now = _now_utc()
+
+    answers = _parse_session_answers(data)
+    if len(answers) > SESSION_BATCH_MAX:
+        return jsonify({"ok": False, "detail": f"Máximo {SESSION_BATCH_MAX} respuestas por lote"}), 400
+
+    cards_col = get_cards_collection()
+    results = []
+
+    if cards_col is None:
+        # Memoria
+        by_id = {str(c.get("id")): c for c in _mem_user_list(username)}
+        for card_id, correct in answers:
+            c = by_id.get(card_id)
+            if not c:
+                continue
+            new_box = 1 if not correct else min(int(c.get("box", 1)) + 1, 6)
+            c["box"] = new_box
+            c["due"] = _due_for_box(new_box)
+            c.setdefault("history", []).append({"ts": now.isoformat(), "result": "good" if correct else "fail"})
+            results.append({"card_id": card_id, "box": new_box, "due": c["due"].isoformat()})
+        return jsonify({
+            "ok": True,
+            "applied": len(results),
+            "results": results,
+            "cards": _session_batch(username, deck, limit, None, now)
+        })
+
+    # Con DB
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    try:
+        operations = []
+        card_ids = []
+        object_ids = []
+        for card_id, correct in answers:
+            try:
+                object_id = ObjectId(card_id)
+            except (InvalidId, TypeError):
+                continue
+            card_ids.append(card_id)
+            object_ids.append(object_id)
+            operations.append(UpdateOne({"_id": object_id, "user": username}, _answer_update(correct, now)))
+
+        if operations:
+            cards_col.bulk_write(operations, ordered=False)
+            # Estado resultante tal y como quedó guardado (en el orden de las respuestas)
+            stored = {doc["_id"]: doc for doc in cards_col.find({"_id": {"$in": object_ids}, "user": username}, {"box": 1, "due": 1})}
+            for card_id, object_id in zip(card_ids, object_ids):
+                doc = stored.get(object_id)
+                if doc:
+                    results.append({"card_id": card_id, "box": int(doc["box"]), "due": _stored_due(doc, now)})
+        for r in results:
+            due_queues.apply_answer(username, r["card_id"], r["box"], r["due"], now)
+            card_index.set_box(username, r["card_id"], r["box"])
+            r["due"] = r["due"].isoformat()
+
+        return jsonify({
+            "ok": True,
+            "applied": len(results),
+            "results": results,
+            "cards": _session_batch(username, deck, limit, cards_col, now)
+        })
+    except PyMongoError as e:
+        return jsonify({"ok": False, "detail": str(e)}), 500
+
+
 @leitner_bp.route("/api/leitner/summary", methods=["GET"])
 @login_required_bp
 def api_summary():
@@ -474,7 +640,7 @@ def api_seed():
             exists = cards_col.find_one({"user": username, "deck": deck, "front": c["front"]})
             if exists:
                 continue
-            cards_col.insert_one({
+            doc = {
                 "user": username,
                 "deck": deck,
                 "front": c["front"],
@@ -483,8 +649,12 @@ def api_seed():
                 "due": _due_for_box(1),
                 "created_at": now,
                 "history": []
-            })
+            }
+            cards_col.insert_one(doc)
+            card_index.upsert_card(username, doc)
             inserted += 1
+        if inserted:
+            due_queues.invalidate(username)
         return jsonify({"ok": True, "inserted": inserted})
     except PyMongoError as e:
         return jsonify({"ok": False, "detail": str(e)}), 500
@@ -0,0 +1,233 @@
+# leitner_queue.py - Cola de tarjetas vencidas por usuario (en proceso)
+"""
+Cola Leitner por usuario/deck para /api/leitner/next y /api/leitner/answer.
+
+- Las tarjetas se precargan de Mongo por bloques (QUEUE_CHUNK) en orden
+  (box, due, _id) con paginación keyset; se incluyen las que vencen dentro de
+  QUEUE_HORIZON para no volver a Mongo cuando pasa el tiempo.
+- ready: heap (box, due) de tarjetas ya vencidas; pending: heap (due) de las
+  que vencerán pronto. "Siguiente tarjeta" es un peek local.
+- api_answer actualiza la tarjeta en la cola (entradas antiguas del heap se
+  descartan de forma perezosa por número de secuencia).
+- Con pocas tarjetas se rellena en segundo plano; la cola entera se recarga
+  cada QUEUE_TTL segundos o al invalidarla (seed / sync).
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+QUEUE_CHUNK = int(os.getenv("LEITNER_QUEUE_CHUNK", "50"))
+QUEUE_LOW_WATERMARK = int(os.getenv("LEITNER_QUEUE_LOW_WATERMARK", "10"))
+QUEUE_TTL = int(os.getenv("LEITNER_QUEUE_TTL", "120"))
+QUEUE_HORIZON = timedelta(minutes=int(os.getenv("LEITNER_QUEUE_HORIZON_MIN", "10")))
+QUEUE_MAX_QUEUES = int(os.getenv("LEITNER_QUEUE_MAX", "1000"))
+
+QUEUE_FIELDS = {"front": 1, "back": 1, "box": 1, "due": 1, "deck": 1}
+QUEUE_SORT = [("box", 1), ("due", 1), ("_id", 1)]
+
+
+def _aware(dt):
+    """pymongo devuelve fechas naive en UTC; la app compara con fechas aware"""
+    if dt is None:
+        return None
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+class DueQueue:
+    """Cola de tarjetas vencidas de un usuario (opcionalmente de un deck)"""
+
+    def __init__(self, user, deck=""):
+        self.user = user
+        self.deck = deck
+        self.lock = threading.Lock()
+        self.cards = {}      # card_id -> doc con el estado local
+        self.ready = []      # (box, due, seq, card_id) ya vencidas
+        self.pending = []    # (due, seq, card_id) vencen dentro del horizonte
+        self._seq = itertools.count()
+        self.loaded_at = 0.0
+        self.last_key = None  # (box, due, _id) del último doc leído de Mongo
+        self.exhausted = False
+        self.refilling = False
+        self.generation = 0   # cambia en cada reset (descarta rellenos en vuelo)
+
+    # ----- estado -----
+    def stale(self):
+        return time.monotonic() - self.loaded_at > QUEUE_TTL
+
+    def reset(self):
+        with self.lock:
+            self.cards.clear()
+            self.ready.clear()
+            self.pending.clear()
+            self.last_key = None
+            self.exhausted = False
+            self.loaded_at = 0.0
+            self.generation += 1
+
+    def _push(self, card_id, doc, now):
+        seq = next(self._seq)
+        doc["_seq"] = seq
+        self.cards[card_id] = doc
+        if doc["due"] <= now:
+            heapq.heappush(self.ready, (doc["box"], doc["due"], seq, card_id))
+        else:
+            heapq.heappush(self.pending, (doc["due"], seq, card_id))
+
+    def _valid(self, card_id, seq):
+        doc = self.cards.get(card_id)
+        return doc is not None and doc["_seq"] == seq
+
+    # ----- Mongo -----
+    def _query(self, now):
+        query = {"user": self.user, "due": {"$lte": now + QUEUE_HORIZON}}
+        if self.deck:
+            query["deck"] = self.deck
+        if self.last_key:
+            box, due, _id = self.last_key
+            query["$or"] = [
+                {"box": {"$gt": box}},
+                {"box": box, "due": {"$gt": due}},
+                {"box": box, "due": due, "_id": {"$gt": _id}},
+            ]
+        return query
+
+    def fill(self, cards_col, now=None):
+        """Leer el siguiente bloque de Mongo y fusionarlo (sin pisar el estado local)"""
+        now = now or datetime.now(timezone.utc)
+        with self.lock:
+            if self.loaded_at == 0.0:
+                self.loaded_at = time.monotonic()
+            query = self._query(now)
+            generation = self.generation
+        docs = list(cards_col.find(query, QUEUE_FIELDS).sort(QUEUE_SORT).limit(QUEUE_CHUNK))
+        with self.lock:
+            if generation != self.generation:
+                return 0
+            for doc in docs:
+                card_id = str(doc["_id"])
+                if card_id in self.cards:
+                    continue
+                self._push(card_id, {
+                    "_id": doc["_id"],
+                    "front": doc.get("front") or "",
+                    "back": doc.get("back") or "",
+                    "box": int(doc.get("box", 1)),
+                    "due": _aware(doc.get("due")) or now,
+                    "deck": doc.get("deck", "general"),
+                }, now)
+            if docs:
+                last = docs[-1]
+                self.last_key = (last.get("box", 1), last.get("due"), last["_id"])
+            self.exhausted = len(docs) < QUEUE_CHUNK
+        return len(docs)
+
+    def _refill_async(self, cards_col):
+        with self.lock:
+            if self.refilling or self.exhausted or len(self.cards) >= QUEUE_LOW_WATERMARK:
+                return
+            self.refilling = True
+
+        def run():
+            try:
+                self.fill(cards_col)
+            except Exception as e:
+                print(f"⚠️ Error rellenando cola Leitner de {self.user}: {e}")
+            finally:
+                self.refilling = False
+
+        threading.Thread(target=run, name="leitner-refill", daemon=True).start()
+
+    # ----- operaciones -----
+    def peek(self, now):
+        """Tarjeta vencida con menor (box, due), sin sacarla de la cola"""
+        with self.lock:
+            while self.pending and self.pending[0][0] <= now:
+                due, seq, card_id = heapq.heappop(self.pending)
+                if self._valid(card_id, seq):
+                    heapq.heappush(self.ready, (self.cards[card_id]["box"], due, seq, card_id))
+            while self.ready:
+                _, _, seq, card_id = self.ready[0]
+                if self._valid(card_id, seq):
+                    return dict(self.cards[card_id], id=card_id)
+                heapq.heappop(self.ready)
+            return None
+
+    def next_card(self, cards_col, now):
+        """Siguiente tarjeta: peek local; Mongo solo al recargar o si la cola se vacía"""
+        if self.stale():
+            self.reset()
+            self.fill(cards_col, now)
+        doc = self.peek(now)
+        if doc is None and not self.exhausted:
+            self.fill(cards_col, now)
+            doc = self.peek(now)
+        self._refill_async(cards_col)
+        return doc
+
+    def get(self, card_id):
+        with self.lock:
+            doc = self.cards.get(card_id)
+            return dict(doc) if doc else None
+
+    def apply_answer(self, card_id, box, due, now):
+        """Actualizar la tarjeta respondida en la cola"""
+        with self.lock:
+            doc = self.cards.get(card_id)
+            if doc is None:
+                return
+            if due > now + QUEUE_HORIZON:
+                # Fuera del horizonte: volverá a leerse de Mongo cuando toque
+                del self.cards[card_id]
+                return
+            self._push(card_id, dict(doc, box=box, due=due), now)
+
+
+class DueQueueRegistry:
+    """Colas por (usuario, deck) con límite LRU"""
+
+    def __init__(self, max_queues=QUEUE_MAX_QUEUES):
+        self.max_queues = max_queues
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user, deck=""):
+        key = (user, deck or "")
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = DueQueue(user, deck or "")
+                self._queues[key] = queue
+                if len(self._queues) > self.max_queues:
+                    self._queues.popitem(last=False)
+            else:
+                self._queues.move_to_end(key)
+            return queue
+
+    def _user_queues(self, user):
+        with self._lock:
+            return [q for (u, _), q in self._queues.items() if u == user]
+
+    def lookup(self, user, card_id):
+        """Estado local de una tarjeta en cualquier cola del usuario (o None)"""
+        for queue in self._user_queues(user):
+            doc = queue.get(card_id)
+            if doc:
+                return doc
+        return None
+
+    def apply_answer(self, user, card_id, box, due, now):
+        for queue in self._user_queues(user):
+            queue.apply_answer(card_id, box, due, now)
+
+    def invalidate(self, user):
+        """Forzar recarga (nuevas tarjetas por seed / sync)"""
+        for queue in self._user_queues(user):
+            queue.reset()
+
+
+due_queues = DueQueueRegistry()
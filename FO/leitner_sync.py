@@ -3,10 +3,108 @@
 import requests
 from datetime import datetime, timezone
 from bson import ObjectId
+from flask import jsonify, session
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError
 
-def sync_memory_cards_to_leitner(username, cards_collection, api_base_url="http://firefighter_backend:5000", auth_token=None):
+from card_index import card_index
+from leitner import get_cards_collection, leitner_bp, login_required_bp
+from leitner_queue import due_queues
+
+# Campos de la memory card que usa la sincronización y tamaño de página
+SYNC_FIELDS = "question,answer,category,difficulty"
+SYNC_PAGE_SIZE = 500
+# Token del feed de cambios (/api/memory-cards/changes) por usuario
+SYNC_STATE_COLLECTION = "leitner_sync_state"
+
+def fetch_memory_card_changes(api_base_url, headers, since=None, page_size=SYNC_PAGE_SIZE):
+    """
+    Lee el feed de cambios del BO desde el token `since` (None = todas las cartas).
+    Devuelve {"upserts", "deletes", "next", "reset"} o None si falla.
+    """
+    changes = {"upserts": [], "deletes": [], "next": since, "reset": False}
+    params = {"limit": page_size, "fields": SYNC_FIELDS}
+    while True:
+        if changes["next"]:
+            params["since"] = changes["next"]
+        response = requests.get(f"{api_base_url}/api/memory-cards/changes", headers=headers, params=params, timeout=10)
+        
+        if response.status_code != 200:
+            print(f"❌ Error obteniendo cambios de memory cards: {response.status_code}")
+            return None
+            
+        data = response.json()
+        if not data.get('ok'):
+            print(f"❌ API error: {data.get('detail', 'Unknown error')}")
+            return None
+            
+        changes["upserts"].extend(data.get('upserts', []))
+        changes["deletes"].extend(d['id'] for d in data.get('deletes', []))
+        changes["reset"] = changes["reset"] or bool(data.get('reset'))
+        changes["next"] = data.get('next')
+        if not data.get('has_more'):
+            return changes
+
+def _sync_state_collection(cards_collection):
+    return cards_collection.database[SYNC_STATE_COLLECTION]
+
+def _build_sync_operations(username, memory_cards, cards_collection, now):
+    """
+    Diff con una sola consulta $in sobre source_id -> operaciones para bulk_write
+    """
+    by_source = {str(card['id']): card for card in memory_cards if card.get('id') is not None}
+    if not by_source:
+        return []
+        
+    existing = {
+        doc['source_id']: doc
+        for doc in cards_collection.find(
+            {"user": username, "source": "backoffice", "source_id": {"$in": list(by_source)}},
+            {"source_id": 1, "front": 1, "back": 1, "category": 1}
+        )
+    }
+    
+    operations = []
+    for source_id, card in by_source.items():
+        category = card.get('category', 'general')
+        doc = existing.get(source_id)
+        if doc:
+            # Actualizar solo si hay cambios
+            update_data = {}
+            if doc.get('front') != card['question']:
+                update_data['front'] = card['question']
+            if doc.get('back') != card['answer']:
+                update_data['back'] = card['answer']
+            if doc.get('category') != category:
+                update_data['category'] = category
+            if update_data:
+                update_data['last_synced'] = now
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update_data}))
+        else:
+            # Upsert por source_id: idempotente aunque otra sincronización la cree antes
+            operations.append(UpdateOne(
+                {"user": username, "source": "backoffice", "source_id": source_id},
+                {"$setOnInsert": {
+                    "deck": category,
+                    "category": category,
+                    "front": card['question'],
+                    "back": card['answer'],
+                    "box": 1,
+                    "due": now,  # Disponible inmediatamente
+                    "created_at": now,
+                    "last_synced": now,
+                    "difficulty": card.get('difficulty', 'medium'),
+                    "history": []
+                }},
+                upsert=True
+            ))
+    return operations
+
+def sync_memory_cards_to_leitner(username, cards_collection, api_base_url="http://firefighter_backend:5000", auth_token=None, full=False):
     """
-    Sincroniza memory cards del BackOffice al sistema Leitner
+    Sincroniza memory cards del BackOffice al sistema Leitner.
+    Incremental: solo pide al BO los cambios desde el último token del feed
+    (full=True recarga todo) y los aplica con un único bulk_write.
     """
     try:
         print(f"🔄 Sincronizando memory cards para usuario: {username}")
@@ -16,74 +114,55 @@ def sync_memory_cards_to_leitner(username, cards_collection, api_base_url="http:
         if auth_token:
             headers['Authorization'] = f'Bearer {auth_token}'
             
-        response = requests.get(f"{api_base_url}/api/memory-cards", headers=headers, timeout=10)
+        state_col = _sync_state_collection(cards_collection)
+        state = None if full else state_col.find_one({"_id": username})
+        since = (state or {}).get("changes_token")
         
-        if response.status_code != 200:
-            print(f"❌ Error obteniendo memory cards: {response.status_code}")
+        changes = fetch_memory_card_changes(api_base_url, headers, since=since)
+        if changes is None:
             return 0
+        reload_all = not since or changes["reset"]
             
-        data = response.json()
-        if not data.get('ok'):
-            print(f"❌ API error: {data.get('detail', 'Unknown error')}")
-            return 0
-            
-        memory_cards = data.get('cards', [])
-        print(f"📋 Encontradas {len(memory_cards)} memory cards en el BO")
+        print(f"📋 {len(changes['upserts'])} memory cards nuevas/modificadas y "
+              f"{len(changes['deletes'])} eliminadas en el BO")
         
-        # Sincronizar cada card
-        synced_count = 0
         now = datetime.now(timezone.utc)
+        operations = _build_sync_operations(username, changes["upserts"], cards_collection, now)
+        
+        source_filter = {"user": username, "source": "backoffice"}
+        if reload_all:
+            # Recarga completa: sobran las cartas cuyo origen ya no existe en el BO
+            keep = [str(card['id']) for card in changes["upserts"] if card.get('id') is not None]
+            operations.append(DeleteMany({**source_filter, "source_id": {"$nin": keep}}))
+        elif changes["deletes"]:
+            operations.append(DeleteMany({**source_filter, "source_id": {"$in": [str(d) for d in changes["deletes"]]}}))
         
-        for card in memory_cards:
+        synced_count = 0
+        complete = True
+        if operations:
             try:
-                # Verificar si ya existe en Leitner
-                existing = cards_collection.find_one({
-                    "user": username,
-                    "source_id": card['id'],
-                    "source": "backoffice"
-                })
-                
-                if existing:
-                    # Actualizar si hay cambios
-                    update_data = {}
-                    if existing.get('front') != card['title']:
-                        update_data['front'] = card['title']
-                    if existing.get('back') != card['content']:
-                        update_data['back'] = card['content']
-                    if existing.get('category') != card.get('category', 'general'):
-                        update_data['category'] = card.get('category', 'general')
-                        
-                    if update_data:
-                        update_data['last_synced'] = now
-                        cards_collection.update_one({"_id": existing["_id"]}, {"$set": update_data})
-                        print(f"📝 Actualizada: {card['title'][:50]}...")
-                        synced_count += 1
-                else:
-                    # Crear nueva carta Leitner
-                    leitner_card = {
-                        "user": username,
-                        "deck": card.get('category', 'general'),
-                        "front": card['title'],
-                        "back": card['content'],
-                        "box": 1,
-                        "due": now,  # Disponible inmediatamente
-                        "created_at": now,
-                        "last_synced": now,
-                        "source": "backoffice",
-                        "source_id": card['id'],
-                        "difficulty": card.get('difficulty', 'medium'),
-                        "history": []
-                    }
-                    
-                    cards_collection.insert_one(leitner_card)
-                    print(f"➕ Creada: {card['title'][:50]}...")
-                    synced_count += 1
-                    
-            except Exception as e:
-                print(f"⚠️ Error procesando card {card.get('id')}: {e}")
-                continue
+                result = cards_collection.bulk_write(operations, ordered=False)
+                synced_count = result.upserted_count + result.modified_count + result.deleted_count
+            except BulkWriteError as e:
+                details = e.details or {}
+                synced_count = details.get('nUpserted', 0) + details.get('nModified', 0) + details.get('nRemoved', 0)
+                # Duplicados (mismo deck/front que una carta propia) no se arreglan reintentando
+                errors = details.get('writeErrors', [])
+                complete = all(err.get('code') == 11000 for err in errors)
+                for err in errors[:5]:
+                    print(f"⚠️ Error procesando card: {err.get('errmsg')}")
+        
+        if complete and changes["next"]:
+            state_col.update_one(
+                {"_id": username},
+                {"$set": {"changes_token": changes["next"], "last_synced": now}},
+                upsert=True
+            )
                 
         print(f"✅ Sincronización completada: {synced_count} tarjetas procesadas")
+        if synced_count:
+            due_queues.invalidate(username)
+            card_index.invalidate(username)
         return synced_count
         
     except Exception as e:
@@ -100,8 +179,8 @@ def create_memory_card_from_leitner(leitner_card, api_base_url="http://firefight
             headers['Authorization'] = f'Bearer {auth_token}'
             
         card_data = {
-            "title": leitner_card.get('front', ''),
-            "content": leitner_card.get('back', ''),
+            "question": leitner_card.get('front', ''),
+            "answer": leitner_card.get('back', ''),
             "category": leitner_card.get('deck', 'general'),
             "difficulty": leitner_card.get('difficulty', 'medium')
         }
@@ -134,7 +213,7 @@ def api_sync_memory_cards():
     username = session.get("user")
     cards_col = get_cards_collection()
     
-    if not cards_col:
+    if cards_col is None:
         return jsonify({"ok": False, "detail": "Base de datos no disponible"}), 500
         
     # TODO: Obtener token de autenticación desde la sesión
@@ -7,6 +7,7 @@ from datetime import datetime
 from functools import wraps
 from dotenv import load_dotenv
 from leitner import get_cards_collection
+from card_index import card_index
 import re
 import warnings
 import numpy as np
@@ -62,79 +63,42 @@ try:
 except Exception as e:
     _safe_print(f"âš ï¸ No se pudo registrar el blueprint Leitner: {e}")
 
-# --- IA: carga perezosa (evita errores raros de stdout) ---
-chatbot_pipeline = None
-def get_chatbot():
-    global chatbot_pipeline
-    if chatbot_pipeline is not None:
-        return chatbot_pipeline
-    try:
-        from transformers import pipeline
-        import torch
-        print("ðŸ” Cargando modelo de IA (DialoGPT-small)...")
-        chatbot_pipeline = pipeline(
-            "text-generation",
-            model="microsoft/DialoGPT-small",
-            tokenizer="microsoft/DialoGPT-small",
-            device=0 if torch.cuda.is_available() else -1
-        )
-        print("âœ… Modelo cargado (DialoGPT-small).")
-    except Exception as e:
-        print(f"âš ï¸ Error con DialoGPT-small: {e}. Probando distilgpt2â€¦")
-        try:
-            from transformers import pipeline
-            chatbot_pipeline = pipeline("text-generation", model="distilgpt2")
-            print("âœ… Respaldo cargado (distilgpt2).")
-        except Exception as e2:
-            print(f"âŒ Sin modelos: {e2}")
-            chatbot_pipeline = None
-    return chatbot_pipeline
-
-def _ensure_text_index(col):
-    # Creamos Ã­ndice de texto una sola vez
-    try:
-        col.create_index([("front", "text"), ("back", "text")], name="text_search")
-    except Exception:
-        pass
+# --- IA: worker de generación con cola y micro-batching (carga perezosa) ---
+from generation_worker import generation_worker, GenerationBusyError, GenerationTimeout, GenerationUnavailable, GEN_PRELOAD
+from answer_cache import cached_answer
+
+if GEN_PRELOAD:
+    # Bajo gunicorn con preload_app se ejecuta en el master: pesos compartidos por los workers
+    generation_worker.preload()
+
+@cached_answer("ask")
+def _ask_answer(question, cards=()):
+    """Respuesta del modelo (con tarjetas de contexto si las hay)"""
+    if cards:
+        prompt = build_prompt(question, cards, strict=False)
+    else:
+        prompt = f"Como experto bombero, responde conciso: {question}\nRespuesta:"
+    return generation_worker.generate(prompt, max_new_tokens=120)
+
+def _generation_busy_response():
+    resp = jsonify({"response": "⏳ Hay muchas preguntas en curso. Inténtalo de nuevo en unos segundos."})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = "2"
+    return resp
 
 def find_relevant_cards(query: str, username: str, deck: str = "", limit: int = 6):
     """
-    Busca tarjetas relevantes por $text (si hay Ã­ndice) y cae a regex si no.
+    Busca tarjetas relevantes en el índice BM25 en memoria del usuario
+    (Mongo solo para construirlo la primera vez).
     """
     col = get_cards_collection()
-    if not col:
+    if col is None:
         return []
 
-    _ensure_text_index(col)
-
-    q_filter = {"user": username}
-    if deck:
-        q_filter["deck"] = deck.strip().lower()
-
-    # 1) intenta bÃºsqueda texto
-    try:
-        cursor = col.find(
-            {**q_filter, "$text": {"$search": query}},
-            {"front": 1, "back": 1, "box": 1, "deck": 1, "score": {"$meta": "textScore"}}
-        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
-        docs = list(cursor)
-        if docs:
-            return docs
-    except Exception:
-        pass
-
-    # 2) fallback simple por regex
     try:
-        rx = re.compile(re.escape(query), re.IGNORECASE)
-        cursor = col.find(
-            {
-                **q_filter,
-                "$or": [{"front": rx}, {"back": rx}]
-            },
-            {"front": 1, "back": 1, "box": 1, "deck": 1}
-        ).limit(limit)
-        return list(cursor)
-    except Exception:
+        return card_index.search(username, query, col, deck=deck.strip().lower(), limit=limit)
+    except Exception as e:
+        _safe_print(f"⚠️ Error buscando tarjetas relevantes: {e}")
         return []
 
 def build_prompt(user_question: str, cards: list, strict: bool) -> str:
@@ -263,6 +227,10 @@ def login_local_fallback(username, password):
     return redirect(url_for('home'))
 from chat_model import chat_model
 
+@cached_answer("chat")
+def _chat_answer(question, cards=()):
+    return chat_model.generate_response(question)
+
 @app.route('/api/chat/ask', methods=['POST'])
 def chat_ask():
     """Endpoint robusto para chat de bomberos"""
@@ -293,8 +261,8 @@ def chat_ask():
         
         print(f"ðŸ’¬ Chat: '{user_message}'")
         
-        # Generar respuesta
-        response_text = chat_model.generate_response(user_message)
+        # Generar respuesta (cacheada por pregunta normalizada)
+        response_text = _chat_answer(user_message)
         print(f"âœ… Respuesta: '{response_text}'")
         
         # Respuesta exitosa
@@ -324,10 +292,18 @@ def chat_status():
         "status": "active",
         "model": "local_bert",
         "knowledge_topics": len(chat_model.knowledge_base),
-        "has_generator": chat_model.generator is not None,
-        "device": "cuda" if torch.cuda.is_available() else "cpu"
+        "has_generator": generation_worker.stats()["loaded"],
+        "generation": generation_worker.stats()
     })
 
+@app.route("/health", methods=["GET"])
+def health():
+    """Liveness/readiness: con GEN_PRELOAD, 503 hasta que el modelo esté cargado y calentado"""
+    stats = generation_worker.stats()
+    if GEN_PRELOAD and not stats["ready"]:
+        return jsonify({"status": "starting", "generation": stats}), 503
+    return jsonify({"status": "ok", "model_loaded": stats["loaded"], "generation": stats}), 200
+
 @app.route('/logout')
 def logout():
     """Cerrar sesión - versión corregida."""
@@ -529,12 +505,12 @@ def generate():
             f"Respuesta correcta: {correct_option}\n"
             f"Â¿Es correcta? Explica brevemente:"
         )
-        pipe = get_chatbot()
-        if pipe is None:
+        try:
+            response = generation_worker.generate(prompt, max_new_tokens=80)
+        except GenerationBusyError:
+            return _generation_busy_response()
+        except (GenerationTimeout, GenerationUnavailable):
             return jsonify({"response": "âœ… Revisa tu respuesta comparando con el material de estudio oficial."})
-
-        result = pipe(prompt, max_length=150, num_return_sequences=1, temperature=0.7, do_sample=True)
-        response = result[0]['generated_text'].replace(prompt, '').strip()
         return jsonify({"response": response})
     except Exception:
         return jsonify({"response": "âœ… Revisa tu respuesta con el material de estudio."})
@@ -548,13 +524,13 @@ def ask():
         if not user_question or len(user_question) < 3:
             return jsonify({"response": "âŒ Formula una pregunta mÃ¡s clara."})
 
-        prompt = f"Como experto bombero, responde conciso: {user_question}\nRespuesta:"
-        pipe = get_chatbot()
-        if pipe is None:
+        cards = find_relevant_cards(user_question, session.get("user"))
+        try:
+            response = _ask_answer(user_question, cards)
+        except GenerationBusyError:
+            return _generation_busy_response()
+        except (GenerationTimeout, GenerationUnavailable):
             return jsonify({"response": "âš ï¸ IA no disponible. Consulta el manual."})
-
-        result = pipe(prompt, max_length=200, num_return_sequences=1, temperature=0.7, do_sample=True)
-        response = result[0]['generated_text'].replace(prompt, '').strip()
         if len(response) > 300:
             response = response[:300] + "..."
         if len(response) < 10:
@@ -612,13 +588,20 @@ def certificaciones():
                          available_urls=urls)
 
 
+# Orígenes de los sitios de certificación (configurables para probar contra un origen local)
+from proxy_cache import proxy_cache
+from html_rewriter import get_rewriter
+ONFIRE_ORIGIN = os.getenv("PROXY_ONFIRE_ORIGIN", "https://www.onfireacademy.es").rstrip("/")
+FORMACION_ORIGIN = os.getenv("PROXY_FORMACION_ORIGIN", "https://www.formacioncertificadoprofesional.com").rstrip("/")
+
+
 # PROXY PRINCIPAL - ONFIREACADEMY.ES (mejorado)
 @app.route("/onfire-academy/")
 @app.route("/onfire-academy/<path:subpath>")
 @login_required  
 def proxy_onfire(subpath=""):
     """Proxy avanzado para www.onfireacademy.es"""
-    return _enhanced_proxy("https://www.onfireacademy.es", subpath)
+    return _enhanced_proxy(ONFIRE_ORIGIN, subpath, "/onfire-academy/")
 
 
 # PROXY PARA FORMACIONCERTIFICADOPROFESIONAL.COM
@@ -627,88 +610,68 @@ def proxy_onfire(subpath=""):
 @login_required  
 def proxy_formacion(subpath=""):
     """Proxy avanzado para www.formacioncertificadoprofesional.com"""
-    return _enhanced_proxy("https://www.formacioncertificadoprofesional.com", subpath)
+    return _enhanced_proxy(FORMACION_ORIGIN, subpath, "/formacion-certificada/")
 
 
 # FUNCIÃ“N CENTRALIZADA DE PROXY (DRY principle)
-def _enhanced_proxy(base_url, subpath=""):
-    """FunciÃ³n centralizada para proxy con bypass completo"""
-    import requests
-    import re
+def _enhanced_proxy(base_url, subpath="", proxy_path=None):
+    """Función centralizada para proxy con bypass completo (respuestas servidas desde proxy_cache)"""
     from urllib.parse import urlparse
-    
+
+    domain = urlparse(base_url).netloc
     try:
         # Construir URL objetivo
         if subpath:
             target_url = f"{base_url}/{subpath}"
         else:
             target_url = base_url + "/"
-        
-        domain = urlparse(base_url).netloc
-        print(f"ðŸ”— Proxy request: {target_url} (domain: {domain})")
-        
-        # Headers realistas
+
+        if proxy_path is None:
+            # Determinar proxy path basado en el dominio
+            if 'onfireacademy' in domain:
+                proxy_path = '/onfire-academy/'
+            elif 'formacioncertificado' in domain:
+                proxy_path = '/formacion-certificada/'
+            else:
+                proxy_path = '/proxy-generic/'
+
+        # Headers realistas (Accept-Encoding lo pone la sesión según lo que sabe descomprimir)
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
             'Sec-Fetch-Dest': 'document',
             'Sec-Fetch-Mode': 'navigate',
             'Sec-Fetch-Site': 'none',
             'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
             'Referer': base_url
         }
-        
-        response = requests.get(target_url, headers=headers, timeout=20, allow_redirects=True)
-        
-        if response.status_code == 200:
-            content = response.text
-            content_type = response.headers.get('content-type', 'text/html')
-            
-            if 'text/html' in content_type:
-                # Determinar proxy path basado en el dominio
-                if 'onfireacademy' in domain:
-                    proxy_path = '/onfire-academy/'
-                elif 'formacioncertificado' in domain:
-                    proxy_path = '/formacion-certificada/'
-                else:
-                    proxy_path = '/proxy-generic/'
-                
-                content = _process_html_content(content, base_url, domain, proxy_path)
-            
-            # Crear respuesta
-            resp = make_response(content)
-            resp.headers['Content-Type'] = content_type
-            
-            # Eliminar headers restrictivos
-            headers_to_remove = [
-                'X-Frame-Options', 'Content-Security-Policy', 'X-Content-Type-Options',
-                'X-XSS-Protection', 'Strict-Transport-Security', 'X-Frame-Options'
-            ]
-            
-            for header in headers_to_remove:
-                resp.headers.pop(header, None)
-            
+
+        entry, outcome = proxy_cache.fetch(
+            target_url, headers=headers, timeout=20,
+            transform=lambda html: _process_html_content(html, base_url, domain, proxy_path)
+        )
+
+        if entry.status == 200:
+            resp = make_response(entry.body)
+            resp.headers['Content-Type'] = entry.content_type
+            resp.headers['X-Proxy-Cache'] = outcome.upper()
+
             # Headers permisivos
             resp.headers['X-Frame-Options'] = 'ALLOWALL'
             resp.headers['Content-Security-Policy'] = "frame-ancestors *; default-src * 'unsafe-inline' 'unsafe-eval' data: blob:"
             resp.headers['X-Content-Type-Options'] = 'nosniff'
-            
-            print(f"âœ… Proxy success: {domain} - {response.status_code} - {len(content)} chars")
             return resp
         else:
-            print(f"âŒ Proxy failed: {response.status_code}")
+            print(f"❌ Proxy failed: {entry.status}")
             return redirect(target_url, code=302)
-            
+
     except requests.exceptions.Timeout:
-        print(f"âš ï¸ Proxy timeout: {domain}")
+        print(f"⚠️ Proxy timeout: {domain}")
         return redirect(base_url, code=302)
     except Exception as e:
-        print(f"âš ï¸ Proxy error: {domain} - {e}")
+        print(f"⚠️ Proxy error: {domain} - {e}")
         return redirect(base_url, code=302)
 
 
@@ -716,157 +679,9 @@ def _enhanced_proxy(base_url, subpath=""):
 
 
 def _process_html_content(content, base_url, domain, proxy_path):
-    """Procesa HTML para assets - VERSIÃ“N LIMPIA Y FINAL"""
-    import re
-    
-    print(f"ðŸ”§ Processing HTML for {domain} with proxy_path: {proxy_path}")
-    
-    # PASO 1: Eliminar meta tags restrictivos
-    patterns_to_remove = [
-        r'<meta[^>]*http-equiv=["\']?X-Frame-Options["\']?[^>]*>',
-        r'<meta[^>]*name=["\']?X-Frame-Options["\']?[^>]*>',
-        r'<meta[^>]*http-equiv=["\']?Content-Security-Policy["\']?[^>]*>',
-        r'<meta[^>]*name=["\']?Content-Security-Policy["\']?[^>]*>'
-    ]
-    
-    for pattern in patterns_to_remove:
-        content = re.sub(pattern, '', content, flags=re.IGNORECASE)
-    
-    # PASO 2: Reemplazar referencias restrictivas
-    replacements = {
-        'X-Frame-Options': 'X-Frame-Options-Disabled',
-        'frame-ancestors': 'frame-ancestors-disabled',
-        "frame-ancestors 'none'": "frame-ancestors *",
-        "frame-ancestors 'self'": "frame-ancestors *",
-        'SAMEORIGIN': 'ALLOWALL',
-        'DENY': 'ALLOWALL'
-    }
-    
-    for old, new in replacements.items():
-        content = content.replace(old, new)
-    
-    # PASO 3: Procesamiento de assets
-    replacements_made = 0
-    
-    # Helper function para verificar si es un asset vÃ¡lido
-    def is_valid_asset(url):
-        if not url:
-            return False
-        if proxy_path.rstrip('/') in url:
-            return False
-        if any(url.startswith(prefix) for prefix in ['http:', 'https:', 'data:', 'mailto:', 'tel:', 'javascript:', '//']):
-            return False
-        if url.startswith(('#', '?')):
-            return False
-        return True
-    
-    # CSS Links
-    def replace_css(match):
-        nonlocal replacements_made
-        original = match.group(1)
-        
-        if not is_valid_asset(original):
-            return match.group(0)
-            
-        if not original.endswith('.css') and '.css?' not in original:
-            return match.group(0)
-        
-        if original.startswith('/'):
-            new_path = proxy_path + original[1:]
-        else:
-            new_path = proxy_path + original
-            
-        print(f"ðŸŽ¨ CSS: {original} â†’ {new_path}")
-        replacements_made += 1
-        return f'href="{new_path}"'
-    
-    content = re.sub(r'href="([^"]*\.css[^"]*)"', replace_css, content)
-    content = re.sub(r"href='([^']*\.css[^']*)'", replace_css, content)
-    
-    # JavaScript
-    def replace_js(match):
-        nonlocal replacements_made
-        original = match.group(1)
-        
-        if not is_valid_asset(original):
-            return match.group(0)
-            
-        if not original.endswith('.js') and '.js?' not in original:
-            return match.group(0)
-        
-        if original.startswith('/'):
-            new_path = proxy_path + original[1:]
-        else:
-            new_path = proxy_path + original
-            
-        print(f"ðŸ“œ JS: {original} â†’ {new_path}")
-        replacements_made += 1
-        return f'src="{new_path}"'
-    
-    content = re.sub(r'src="([^"]*\.js[^"]*)"', replace_js, content)
-    content = re.sub(r"src='([^']*\.js[^']*)'", replace_js, content)
-    
-    # Images
-    def replace_img(match):
-        nonlocal replacements_made
-        original = match.group(1)
-        
-        if not is_valid_asset(original):
-            return match.group(0)
-        
-        if original.startswith('/'):
-            new_path = proxy_path + original[1:]
-        else:
-            new_path = proxy_path + original
-            
-        print(f"ðŸ–¼ï¸ IMG: {original} â†’ {new_path}")
-        replacements_made += 1
-        return f'src="{new_path}"'
-    
-    content = re.sub(r'src="([^"]*\.(png|jpg|jpeg|gif|webp|svg|ico)[^"]*)"', replace_img, content)
-    content = re.sub(r"src='([^']*\.(png|jpg|jpeg|gif|webp|svg|ico)[^']*)'", replace_img, content)
-    
-    # PASO 4: URLs absolutas del dominio
-    domain_pattern = f'https?://{re.escape(domain)}/'
-    content = re.sub(domain_pattern, proxy_path, content)
-    
-    print(f"âœ… Made {replacements_made} path replacements")
-    
-    # PASO 5: JavaScript bypass
-    bypass_js = f'''
-    <script>
-    console.log('ðŸ”¥ FirefighterAI Proxy v7.0 - Clean Processing');
-    
-    // Frame busting protection
-    if (window.top !== window.self) {{
-        window.top = window.self;
-        window.parent = window.self;
-        
-        // Disable problematic methods
-        window.location.replace = function() {{ console.log('ðŸ”¥ Blocked location.replace'); }};
-        window.location.assign = function() {{ console.log('ðŸ”¥ Blocked location.assign'); }};
-    }}
-    
-    // Remove any remaining restrictive meta tags
-    document.addEventListener('DOMContentLoaded', function() {{
-        const restrictiveMetas = document.querySelectorAll(
-            'meta[http-equiv*="X-Frame"], meta[name*="X-Frame"], ' +
-            'meta[http-equiv*="Content-Security-Policy"], meta[name*="Content-Security-Policy"]'
-        );
-        restrictiveMetas.forEach(meta => {{
-            console.log('ðŸ”¥ Removing:', meta.outerHTML);
-            meta.remove();
-        }});
-    }});
-    </script>
-    '''
-    
-    # Inyectar JavaScript
-    if '</head>' in content:
-        content = content.replace('</head>', f'{bypass_js}</head>')
-    else:
-        content = bypass_js + content
-    
+    """Procesa HTML para assets (reescritura en una pasada, ver html_rewriter)"""
+    content, replacements_made = get_rewriter(domain, proxy_path).rewrite(content)
+    print(f"✅ Made {replacements_made} path replacements ({domain})")
     return content
 
 
@@ -961,45 +776,63 @@ def debug_html():
 @app.route("/formacion-assets/<path:subpath>")
 @login_required
 def proxy_assets(subpath):
-    """Proxy mejorado para assets"""
-    import requests
-    
+    """Proxy de assets en streaming (copia en disco de proxy_cache, Range incluido)"""
+    from flask import Response, send_file
+
     # Determinar origen basado en la ruta
     if request.path.startswith('/onfire-academy-assets/'):
-        base_url = "https://www.onfireacademy.es"
+        base_url = ONFIRE_ORIGIN
     else:
-        base_url = "https://www.formacioncertificadoprofesional.com"
-    
+        base_url = FORMACION_ORIGIN
+
     try:
         target_url = f"{base_url}/{subpath}"
-        print(f"ðŸ”— Asset request: {target_url}")  # Debug
-        
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Referer': f'{base_url}/',
             'Accept': '*/*',
             'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
         }
-        
-        response = requests.get(target_url, headers=headers, timeout=10)
-        print(f"ðŸ“„ Asset response: {response.status_code}")  # Debug
-        
-        if response.status_code == 200:
-            resp = make_response(response.content)
-            if 'content-type' in response.headers:
-                resp.headers['Content-Type'] = response.headers['content-type']
-            
-            # CORS headers para evitar bloqueos
-            resp.headers['Access-Control-Allow-Origin'] = '*'
-            resp.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            resp.headers['Access-Control-Allow-Headers'] = '*'
-            
-            return resp
-        else:
-            print(f"âŒ Asset not found: {response.status_code}")
+
+        upstream = proxy_cache.stream(target_url, headers=headers, timeout=10,
+                                      byte_range=request.headers.get('Range'))
+        entry = upstream.entry
+
+        if upstream.status not in (200, 206):
+            upstream.close()
+            print(f"❌ Asset not found: {upstream.status}")
             return "Asset not found", 404
+
+        if upstream.length is not None and upstream.length > upstream.max_bytes:
+            # Demasiado grande para pasar por el proxy: que el navegador vaya al origen
+            upstream.close()
+            return redirect(target_url, code=302)
+
+        if upstream.outcome in ("hit", "revalidated", "stale"):
+            if entry.path is not None:
+                # Desde disco: werkzeug atiende Range / If-None-Match sin leer el fichero entero
+                resp = send_file(entry.path, mimetype=entry.content_type, conditional=True)
+            else:
+                resp = make_response(entry.body)
+                resp.headers['Content-Type'] = entry.content_type
+        else:
+            resp = Response(upstream.chunks(), status=upstream.status, content_type=upstream.content_type,
+                            direct_passthrough=True)
+            if upstream.length is not None:
+                resp.headers['Content-Length'] = str(upstream.length)
+            for header in ('Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified'):
+                if header in upstream.headers:
+                    resp.headers[header] = upstream.headers[header]
+        resp.headers['X-Proxy-Cache'] = upstream.outcome.upper()
+
+        # CORS headers para evitar bloqueos
+        resp.headers['Access-Control-Allow-Origin'] = '*'
+        resp.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+        resp.headers['Access-Control-Allow-Headers'] = '*'
+
+        return resp
     except Exception as e:
-        print(f"âš ï¸ Asset error: {e}")
+        print(f"⚠️ Asset error: {e}")
         return "Asset error", 500
 
 
@@ -1019,4 +852,6 @@ if __name__ == "__main__":
         _safe_print(f"âš ï¸ API no disponible: {e}")
         _safe_print("ðŸ”„ Funcionando en modo fallback (local)")
     _safe_print("ðŸŒ Frontend corriendo en http://localhost:8000")
+    if GEN_PRELOAD:
+        generation_worker.start()
     app.run(host="0.0.0.0", port=8000, debug=False)
@@ -0,0 +1,589 @@
+# proxy_cache.py - Cache HTTP del proxy de certificaciones
+"""
+Cache con semántica HTTP delante de los sitios de certificación
+(onfireacademy.es, formacioncertificadoprofesional.com).
+
+- Una requests.Session con pool de conexiones y reintentos para todos los
+  orígenes (keep-alive en vez de un handshake TLS por petición).
+- Frescura según Cache-Control (no-store, private, no-cache, s-maxage, max-age),
+  Expires o la heurística del 10% sobre Last-Modified; si el origen no dice
+  nada, PROXY_DEFAULT_TTL. Es una cache compartida entre usuarios: `private`
+  cuenta como no-store y no se guarda nada con Vary (salvo Accept-Encoding,
+  que negocia y descomprime requests). Caducada la entrada, se revalida con
+  If-None-Match / If-Modified-Since: un 304 reutiliza el cuerpo guardado.
+- HTML: se guarda ya reescrito (transform), en memoria con límite LRU. Un 304
+  no vuelve a pasar el HTML por el reescritor.
+- Resto (CSS, JS, imágenes, PDFs): en disco (PROXY_CACHE_DIR) con límite de
+  bytes y desalojo LRU; sobrevive a reinicios y lo comparten los workers
+  (el límite de bytes lo lleva cada worker por su cuenta).
+- Si el origen falla y hay copia, se sirve la copia caducada (stale-if-error).
+- stream(): para los assets, el cuerpo pasa del origen al cliente por trozos
+  (memoria acotada por petición) y a la vez se copia a disco; los Range del
+  cliente se reenvían al origen (las respuestas 206 no se guardan).
+
+Variables de entorno:
+- PROXY_CACHE_DIR: directorio de la cache en disco (por defecto /tmp/fo-proxy-cache)
+- PROXY_CACHE_MAX_BYTES: tamaño máximo en disco por worker (por defecto 512 MB)
+- PROXY_HTML_MAX_ENTRIES: páginas reescritas en memoria (por defecto 200)
+- PROXY_DEFAULT_TTL: frescura sin cabeceras de cache (por defecto 300 s)
+- PROXY_MAX_TTL: tope de frescura (por defecto 1 día)
+- PROXY_POOL_SIZE: conexiones por origen (por defecto 20)
+- PROXY_STREAM_MAX_BYTES: tamaño máximo de una descarga por el proxy (por defecto 512 MB)
+- PROXY_CACHE_MAX_ENTRY_BYTES: tamaño máximo de un asset guardado en disco (por defecto 32 MB)
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PROXY_CACHE_DIR = os.getenv("PROXY_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fo-proxy-cache"))
+PROXY_CACHE_MAX_BYTES = int(os.getenv("PROXY_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PROXY_HTML_MAX_ENTRIES = int(os.getenv("PROXY_HTML_MAX_ENTRIES", "200"))
+PROXY_DEFAULT_TTL = int(os.getenv("PROXY_DEFAULT_TTL", "300"))
+PROXY_MAX_TTL = int(os.getenv("PROXY_MAX_TTL", "86400"))
+PROXY_POOL_SIZE = int(os.getenv("PROXY_POOL_SIZE", "20"))
+PROXY_STREAM_MAX_BYTES = int(os.getenv("PROXY_STREAM_MAX_BYTES", str(512 * 1024 * 1024)))
+PROXY_CACHE_MAX_ENTRY_BYTES = int(os.getenv("PROXY_CACHE_MAX_ENTRY_BYTES", str(32 * 1024 * 1024)))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Cabeceras del origen que se guardan con la entrada
+STORED_HEADERS = ("content-type", "cache-control", "etag", "last-modified", "expires", "date")
+
+
+def create_session(pool_size=PROXY_POOL_SIZE):
+    """Session con pool de conexiones y reintentos en errores transitorios"""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset({"GET", "HEAD"}))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_cache_control(value):
+    """'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': True}"""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('" ') if arg else True
+    return directives
+
+
+def _http_date(value):
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return parsed.timestamp() if parsed else None
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _varies(headers):
+    """True si la respuesta depende de cabeceras de la petición que la clave (la URL) no recoge"""
+    names = {name.strip().lower() for name in (headers.get("vary") or "").split(",")}
+    return bool(names - {"", "accept-encoding"})
+
+
+def freshness_lifetime(headers, default_ttl=PROXY_DEFAULT_TTL, now=None):
+    """Segundos de frescura según las cabeceras (None = no se puede guardar)"""
+    now = time.time() if now is None else now
+    cc = parse_cache_control(headers.get("cache-control"))
+    # Cache compartida: lo privado de un usuario no se sirve a otro
+    if "no-store" in cc or "private" in cc or _varies(headers):
+        return None
+    if "no-cache" in cc:
+        return 0
+    for directive in ("s-maxage", "max-age"):
+        if directive in cc:
+            try:
+                return min(max(0, int(cc[directive])), PROXY_MAX_TTL)
+            except (TypeError, ValueError):
+                return 0
+    expires = _http_date(headers.get("expires"))
+    if headers.get("expires") is not None:
+        date = _http_date(headers.get("date")) or now
+        return min(max(0, int(expires - date)), PROXY_MAX_TTL) if expires else 0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified:
+        return min(max(0, int((now - last_modified) * 0.1)), PROXY_MAX_TTL)
+    return default_ttl
+
+
+class CachedResponse:
+    """Respuesta del origen (o de la cache) lista para servir"""
+
+    __slots__ = ("status", "headers", "_body", "path", "stored_at", "expires_at")
+
+    def __init__(self, status, headers, body, stored_at=None, lifetime=0, path=None):
+        self.status = status
+        self.headers = headers           # minúsculas, solo STORED_HEADERS
+        self._body = body                # bytes (None si está en disco)
+        self.path = path                 # fichero con el cuerpo (DiskStore)
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.expires_at = self.stored_at + (lifetime or 0)
+
+    @property
+    def body(self):
+        if self._body is None and self.path is not None:
+            with open(self.path, "rb") as f:
+                return f.read()
+        return self._body
+
+    @classmethod
+    def from_response(cls, response, body=None, lifetime=0, stream=False):
+        headers = {k: response.headers[k] for k in STORED_HEADERS if k in response.headers}
+        if body is None and not stream:
+            body = response.content
+        return cls(response.status_code, headers, body, lifetime=lifetime)
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "application/octet-stream")
+
+    def fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires_at
+
+    def validators(self):
+        """Cabeceras condicionales para revalidar con el origen"""
+        conditional = {}
+        if self.headers.get("etag"):
+            conditional["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            conditional["If-Modified-Since"] = self.headers["last-modified"]
+        return conditional
+
+    def refresh(self, headers, lifetime):
+        """Aplicar un 304: nuevas cabeceras de cache, mismo cuerpo"""
+        for k in STORED_HEADERS:
+            if k != "content-type" and k in headers:
+                self.headers[k] = headers[k]
+        self.stored_at = time.time()
+        self.expires_at = self.stored_at + lifetime
+
+    def meta(self):
+        return {"status": self.status, "headers": self.headers,
+                "stored_at": self.stored_at, "expires_at": self.expires_at}
+
+
+class MemoryStore:
+    """Entradas en memoria con límite LRU por número de entradas"""
+
+    def __init__(self, max_entries=PROXY_HTML_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskStore:
+    """
+    Entradas en disco: <sha256>.body con el cuerpo y <sha256>.json con estado
+    y cabeceras. Escrituras atómicas (fichero temporal + os.replace), de modo
+    que varios workers pueden compartir el directorio.
+
+    total_bytes y el LRU son de este proceso: cada worker solo cuenta (y
+    desaloja) lo que ha escrito él o encontró al arrancar, así que con N
+    workers el directorio puede llegar a unos N × max_bytes.
+    """
+
+    def __init__(self, directory=PROXY_CACHE_DIR, max_bytes=PROXY_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()      # nombre -> bytes, de menos a más reciente
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        bodies = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".body"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                bodies.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, name, size in sorted(bodies):
+            self._sizes[name] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def _name(key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _paths(self, name):
+        base = os.path.join(self.directory, name)
+        return base + ".json", base + ".body"
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key):
+        name = self._name(key)
+        meta_path, body_path = self._paths(name)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        entry = CachedResponse(meta["status"], meta["headers"], None, stored_at=meta["stored_at"], path=body_path)
+        entry.expires_at = meta["expires_at"]
+        with self._lock:
+            if name in self._sizes:
+                self._sizes.move_to_end(name)
+        return entry
+
+    def writer(self, key):
+        """Escritura por trozos de un cuerpo nuevo (commit() lo publica)"""
+        return _DiskWriter(self, key)
+
+    def set(self, key, entry):
+        body = entry.body
+        if len(body) > self.max_bytes:
+            return
+        writer = self.writer(key)
+        writer.write(body)
+        writer.commit(entry)
+
+    def update_meta(self, key, entry):
+        """Guardar cabeceras/frescura nuevas sin tocar el cuerpo (tras un 304)"""
+        meta_path, _ = self._paths(self._name(key))
+        self._write(meta_path, json.dumps(entry.meta()).encode("utf-8"))
+
+    def _publish(self, key, tmp_path, size, entry):
+        name = self._name(key)
+        meta_path, body_path = self._paths(name)
+        os.replace(tmp_path, body_path)
+        self._write(meta_path, json.dumps(entry.meta()).encode("utf-8"))
+        entry.path, entry._body = body_path, None
+        with self._lock:
+            self.total_bytes += size - self._sizes.pop(name, 0)
+            self._sizes[name] = size
+            evict = []
+            while self.total_bytes > self.max_bytes and self._sizes:
+                old, old_size = self._sizes.popitem(last=False)
+                self.total_bytes -= old_size
+                evict.append(old)
+        for old in evict:
+            for path in self._paths(old):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def delete(self, key):
+        name = self._name(key)
+        with self._lock:
+            self.total_bytes -= self._sizes.pop(name, 0)
+        removed = False
+        for path in self._paths(name):
+            try:
+                os.unlink(path)
+                removed = True
+            except OSError:
+                pass
+        return removed
+
+    def __len__(self):
+        return len(self._sizes)
+
+
+class _DiskWriter:
+    """Cuerpo a medio escribir en un temporal del directorio de la cache"""
+
+    def __init__(self, store, key):
+        self.store = store
+        self.key = key
+        self.size = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.directory, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self, entry):
+        self._file.close()
+        if self.size > self.store.max_bytes:
+            self.abort()
+            return
+        self.store._publish(self.key, self.tmp_path, self.size, entry)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+
+
+class ProxyStreamTooLarge(Exception):
+    """El origen envía más de max_bytes sin haber anunciado la longitud"""
+
+
+class ProxyStream:
+    """
+    Respuesta de stream(): o bien una entrada de la cache (entry, con el cuerpo
+    en disco o en memoria) o bien el cuerpo del origen por trozos (chunks()).
+    """
+
+    def __init__(self, outcome, entry=None, response=None, writer=None, max_bytes=PROXY_STREAM_MAX_BYTES):
+        self.outcome = outcome
+        self.entry = entry
+        self._response = response
+        self._writer = writer
+        self.max_bytes = max_bytes
+        if response is not None:
+            self.status = response.status_code
+            self.headers = response.headers
+            # Con Content-Encoding requests entrega el cuerpo descomprimido: longitud desconocida
+            length = response.headers.get("content-length")
+            encoded = response.headers.get("content-encoding", "identity").lower() != "identity"
+            self.length = int(length) if length and length.isdigit() and not encoded else None
+        else:
+            self.status = entry.status
+            self.headers = entry.headers
+            self.length = None
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type", "application/octet-stream")
+
+    def chunks(self, chunk_size=STREAM_CHUNK_SIZE):
+        """Cuerpo del origen por trozos; se copia a disco y se publica al terminar.
+
+        Si se superan max_bytes lanza ProxyStreamTooLarge: el servidor corta la
+        conexión y el cliente no recibe un cuerpo truncado como si fuera completo.
+        """
+        writer, sent, complete = self._writer, 0, False
+        try:
+            for chunk in self._response.iter_content(chunk_size):
+                if not chunk:
+                    continue
+                sent += len(chunk)
+                if sent > self.max_bytes:
+                    raise ProxyStreamTooLarge(f"{self._response.url}: más de {self.max_bytes} bytes")
+                if writer is not None:
+                    if writer.size + len(chunk) > PROXY_CACHE_MAX_ENTRY_BYTES:
+                        writer.abort()
+                        writer = None
+                    else:
+                        writer.write(chunk)
+                yield chunk
+            else:
+                complete = self.length is None or sent == self.length
+        finally:
+            self._response.close()
+            if writer is not None:
+                if complete:
+                    writer.commit(self.entry)
+                else:
+                    writer.abort()
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+        if self._writer is not None:
+            self._writer.abort()
+
+
+class ProxyCache:
+    """Cache HTTP con revalidación delante de los orígenes del proxy"""
+
+    def __init__(self, session=None, html_store=None, asset_store=None, default_ttl=PROXY_DEFAULT_TTL):
+        self.session = session or create_session()
+        self.html_store = html_store if html_store is not None else MemoryStore()
+        self._asset_store = asset_store
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.counters = {"hit": 0, "revalidated": 0, "miss": 0, "stale": 0, "bypass": 0}
+
+    @property
+    def asset_store(self):
+        # Perezoso: el directorio solo se crea si se llega a usar el proxy
+        if self._asset_store is None:
+            with self._lock:
+                if self._asset_store is None:
+                    self._asset_store = DiskStore()
+        return self._asset_store
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def _lookup(self, url):
+        entry = self.html_store.get(url)
+        if entry is None:
+            entry = self.asset_store.get(url)
+        return entry
+
+    def fetch(self, url, headers=None, timeout=20, transform=None):
+        """
+        (CachedResponse, resultado) para un GET a `url`; resultado es hit,
+        revalidated, miss, stale (origen caído, copia caducada) o bypass (no
+        cacheable). `transform(texto) -> texto` se aplica a las respuestas HTML
+        200 antes de guardarlas.
+        """
+        entry = self._lookup(url)
+        if entry is not None and entry.fresh():
+            self._count("hit")
+            return entry, "hit"
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout, allow_redirects=True)
+        except requests.exceptions.RequestException:
+            if entry is None:
+                raise
+            self._count("stale")
+            return entry, "stale"
+
+        if response.status_code == 304 and entry is not None:
+            lifetime = freshness_lifetime(response.headers, self.default_ttl)
+            entry.refresh(response.headers, lifetime or 0)
+            self._store(url, entry)
+            self._count("revalidated")
+            return entry, "revalidated"
+
+        if response.status_code != 200:
+            if entry is not None and response.status_code >= 500:
+                self._count("stale")
+                return entry, "stale"
+            self._count("bypass")
+            return CachedResponse.from_response(response), "bypass"
+
+        lifetime = freshness_lifetime(response.headers, self.default_ttl)
+        body = None
+        if transform is not None and "text/html" in response.headers.get("content-type", ""):
+            body = transform(response.text).encode("utf-8")
+        fetched = CachedResponse.from_response(response, body=body, lifetime=lifetime or 0)
+        if lifetime is None or not (fetched.validators() or lifetime):
+            # no-store, o nada con lo que reutilizarla
+            self._count("bypass")
+            return fetched, "bypass"
+        self._store(url, fetched)
+        self._count("miss")
+        return fetched, "miss"
+
+    def _store(self, url, entry):
+        if "text/html" in entry.content_type:
+            self.html_store.set(url, entry)
+        elif entry.path is not None and entry._body is None:
+            self.asset_store.update_meta(url, entry)
+        else:
+            self.asset_store.set(url, entry)
+
+    def stream(self, url, headers=None, timeout=10, byte_range=None, max_bytes=PROXY_STREAM_MAX_BYTES):
+        """
+        Como fetch() pero sin cargar el cuerpo en memoria. Si la copia en cache
+        sirve (fresca, revalidada o stale) se devuelve la entrada; si no, el
+        cuerpo del origen por trozos. `byte_range` (cabecera Range del
+        cliente) se atiende desde la copia si la hay y, si no, se reenvía al
+        origen sin guardar la respuesta parcial.
+        """
+        entry = self._lookup(url)
+        if entry is not None and entry.fresh():
+            self._count("hit")
+            return ProxyStream("hit", entry=entry)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+        elif byte_range:
+            request_headers["Range"] = byte_range
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout,
+                                        allow_redirects=True, stream=True)
+        except requests.exceptions.RequestException:
+            if entry is None:
+                raise
+            self._count("stale")
+            return ProxyStream("stale", entry=entry)
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            lifetime = freshness_lifetime(response.headers, self.default_ttl)
+            entry.refresh(response.headers, lifetime or 0)
+            self._store(url, entry)
+            self._count("revalidated")
+            return ProxyStream("revalidated", entry=entry)
+
+        if response.status_code >= 500 and entry is not None:
+            response.close()
+            self._count("stale")
+            return ProxyStream("stale", entry=entry)
+
+        writer = None
+        lifetime = freshness_lifetime(response.headers, self.default_ttl)
+        fetched = CachedResponse.from_response(response, lifetime=lifetime or 0, stream=True)
+        length = response.headers.get("content-length")
+        cacheable = (
+            response.status_code == 200
+            and lifetime is not None
+            and (lifetime or fetched.validators())
+            and "text/html" not in fetched.content_type
+            and not (length and length.isdigit() and int(length) > PROXY_CACHE_MAX_ENTRY_BYTES)
+        )
+        if cacheable:
+            writer = self.asset_store.writer(url)
+        self._count("miss" if cacheable else "bypass")
+        return ProxyStream("miss" if cacheable else "bypass", entry=fetched, response=response,
+                           writer=writer, max_bytes=max_bytes)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters["html_entries"] = len(self.html_store)
+        if self._asset_store is not None:
+            counters["asset_entries"] = len(self._asset_store)
+            counters["asset_bytes"] = self._asset_store.total_bytes
+        return counters
+
+
+proxy_cache = ProxyCache()
@@ -0,0 +1,79 @@
+# bench_html_rewriter.py - Micro-benchmark del reescritor HTML del proxy
+"""
+Mide el tiempo de reescritura por página sobre los fixtures de
+tests/unit/frontend/fixtures/proxy_pages/input (o los ficheros indicados).
+
+    python FO/scripts/bench_html_rewriter.py [-n 200] [pagina.html ...]
+
+Con --capture descarga antes las páginas reales de los sitios de
+certificación y las guarda como fixtures (regenerar después los golden files
+con UPDATE_GOLDEN=1 y revisar el diff).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+FO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FO_DIR)
+
+from html_rewriter import get_rewriter  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(FO_DIR), "tests", "unit", "frontend", "fixtures", "proxy_pages", "input")
+ORIGINS = {
+    "onfire": ("www.onfireacademy.es", "/onfire-academy/"),
+    "formacion": ("www.formacioncertificadoprofesional.com", "/formacion-certificada/"),
+}
+CAPTURE_PAGES = {
+    "onfire_index.html": "https://www.onfireacademy.es/",
+    "onfire_examinadores.html": "https://www.onfireacademy.es/examinadores.html",
+    "formacion_index.html": "https://www.formacioncertificadoprofesional.com/",
+}
+
+
+def capture():
+    import requests
+    for name, url in CAPTURE_PAGES.items():
+        response = requests.get(url, timeout=20, headers={"User-Agent": "Mozilla/5.0"})
+        response.raise_for_status()
+        with open(os.path.join(FIXTURES, name), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"📥 {name}: {len(response.text)} chars")
+
+
+def bench(path, rounds):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    domain, proxy_path = ORIGINS.get(os.path.basename(path).split("_", 1)[0], ORIGINS["onfire"])
+    rewriter = get_rewriter(domain, proxy_path)
+    rewriter.rewrite(html)  # calentamiento
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        rewriter.rewrite(html)
+        samples.append(time.perf_counter() - started)
+    median = statistics.median(samples)
+    p95 = sorted(samples)[int(len(samples) * 0.95) - 1]
+    mb_s = len(html.encode("utf-8")) / median / 1e6
+    print(f"{os.path.basename(path):32s} {len(html):8d} chars  "
+          f"mediana {median * 1000:7.3f} ms  p95 {p95 * 1000:7.3f} ms  {mb_s:7.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rounds", type=int, default=200)
+    parser.add_argument("--capture", action="store_true", help="descargar las páginas reales como fixtures")
+    parser.add_argument("pages", nargs="*")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture()
+    pages = args.pages or sorted(os.path.join(FIXTURES, name) for name in os.listdir(FIXTURES))
+    for path in pages:
+        bench(path, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -174,38 +174,91 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   }
 
+  // === SESSION MODE ===
+  // Lote de tarjetas en el navegador; las respuestas se envían agrupadas
+  const SESSION_BATCH = 20;
+  const FLUSH_EVERY = 10;
+  let sessionQueue = [];
+  let pendingAnswers = [];
+  // Envíos de respuestas en serie: refillSession espera al que esté en vuelo
+  let flushChain = Promise.resolve();
+
+  function renderCard(card) {
+    currentCard = card;
+    elements.question.textContent = currentCard.question || currentCard.front || 'Sin pregunta';
+    elements.answer.textContent = currentCard.answer || currentCard.back || 'Sin respuesta';
+    elements.stateBox.textContent = `Caja ${currentCard.box}`;
+    elements.stateNext.textContent = formatDate(currentCard.next_review_at);
+    
+    hideAnswer();
+    enableAnswerButtons(true);
+    elements.emptyState.hidden = true;
+  }
+
+  function flushAnswers(limit = 0) {
+    const run = flushChain.then(() => sendAnswers(limit));
+    flushChain = run.catch(() => null);
+    return run;
+  }
+
+  async function sendAnswers(limit) {
+    const answers = pendingAnswers;
+    if (!answers.length && !limit) return null;
+    pendingAnswers = [];
+    
+    const response = await fetchJSON('/api/leitner/session', {
+      method: 'POST',
+      body: JSON.stringify({ answers, limit })
+    });
+    
+    if (!response || !response.ok) {
+      // Reintentar en el siguiente envío
+      pendingAnswers = answers.concat(pendingAnswers);
+      return null;
+    }
+    return response;
+  }
+
+  async function refillSession() {
+    // Un lote pedido antes de que llegue el envío en vuelo traería tarjetas ya respondidas
+    await flushChain;
+    let response;
+    if (pendingAnswers.length) {
+      response = await flushAnswers(SESSION_BATCH);
+    } else {
+      response = await fetchJSON(`/api/leitner/session?limit=${SESSION_BATCH}`);
+    }
+    
+    if (response && response.ok) {
+      sessionQueue = response.cards || [];
+      await loadBoxSummary();
+    }
+    return response;
+  }
+
   async function loadNextCard() {
     setLoading(elements.btnNext, true);
     hideAnswer();
     elements.emptyState.hidden = true;
     enableAnswerButtons(false);
     
-    const response = await fetchJSON('/api/leitner/next');
+    if (currentCard && sessionQueue.length > 1 && sessionQueue[0].id === currentCard.id) {
+      // Saltar: la actual pasa al final del lote
+      sessionQueue.push(sessionQueue.shift());
+    }
+    if (!sessionQueue.length) {
+      await refillSession();
+    }
     
     setLoading(elements.btnNext, false);
     
-    if (!response || !response.ok) {
-      showEmptyState();
-      return;
-    }
-    
-    if (!response.card) {
+    if (!sessionQueue.length) {
+      currentCard = null;
       showEmptyState();
       return;
     }
     
-    currentCard = response.card;
-    elements.question.textContent = currentCard.question || currentCard.front || 'Sin pregunta';
-    elements.answer.textContent = currentCard.answer || currentCard.back || 'Sin respuesta';
-    elements.stateBox.textContent = `Caja ${currentCard.box}`;
-    elements.stateNext.textContent = formatDate(response.state?.next_review_at);
-    
-    hideAnswer();
-    enableAnswerButtons(true);
-    elements.emptyState.hidden = true;
-    
-    // Actualizar contadores
-    await loadBoxSummary();
+    renderCard(sessionQueue[0]);
   }
 
   function showEmptyState() {
@@ -231,38 +284,19 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     updateSessionStats();
     
-    const response = await fetchJSON('/api/leitner/answer', {
-      method: 'POST',
-      body: JSON.stringify({
-        card_id: currentCard.id,
-        correct: isCorrect
-      })
-    });
+    pendingAnswers.push({ card_id: currentCard.id, correct: isCorrect });
+    sessionQueue = sessionQueue.filter(card => card.id !== currentCard.id);
+    currentCard = null;
     
-    if (response && response.ok) {
-      // Mostrar feedback visual
-      showAnswerFeedback(isCorrect);
-      
-      // Cargar siguiente tarjeta después de un breve delay
-      setTimeout(() => {
-        if (response.next && response.next.card) {
-          // La API ya devuelve la siguiente tarjeta
-          currentCard = response.next.card;
-          elements.question.textContent = currentCard.question || currentCard.front || 'Sin pregunta';
-          elements.answer.textContent = currentCard.answer || currentCard.back || 'Sin respuesta';
-          elements.stateBox.textContent = `Caja ${currentCard.box}`;
-          elements.stateNext.textContent = formatDate(response.next.state?.next_review_at);
-          
-          hideAnswer();
-          enableAnswerButtons(true);
-          elements.emptyState.hidden = true;
-        } else {
-          loadNextCard();
-        }
-      }, 1000);
-    } else {
-      enableAnswerButtons(true);
+    // Mostrar feedback visual
+    showAnswerFeedback(isCorrect);
+    
+    if (pendingAnswers.length >= FLUSH_EVERY && sessionQueue.length) {
+      flushAnswers();
     }
+    
+    // Siguiente tarjeta del lote (o nuevo lote) después de un breve delay
+    setTimeout(loadNextCard, 1000);
   }
 
   function showAnswerFeedback(isCorrect) {
@@ -291,6 +325,11 @@ document.addEventListener('DOMContentLoaded', function() {
     
     if (response && response.ok) {
       showNotification(`✅ Sincronizadas ${response.synced} tarjetas`, 'success');
+      if (pendingAnswers.length) {
+        await flushAnswers();
+      }
+      sessionQueue = [];
+      currentCard = null;
       await loadBoxSummary();
       await loadNextCard();
     } else {
@@ -366,9 +405,16 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   });
 
+  // Enviar las respuestas pendientes al salir de la página
+  window.addEventListener('pagehide', function() {
+    if (!pendingAnswers.length) return;
+    const body = new Blob([JSON.stringify({ answers: pendingAnswers, limit: 0 })], { type: 'application/json' });
+    navigator.sendBeacon('/api/leitner/session', body);
+    pendingAnswers = [];
+  });
+
   // === INITIALIZATION ===
   updateSessionStats();
-  loadBoxSummary();
   loadNextCard();
   
   // Auto-refresh summary every 30 seconds
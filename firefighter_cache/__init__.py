@@ -0,0 +1,71 @@
+"""
+FirefighterAI Cache - Paquete de cache compartido
+=================================================
+Única fuente del sistema de cache usado por API, BO y FO.
+
+Backend seleccionado con CACHE_BACKEND:
+- memory (por defecto): cache en memoria del proceso
+- redis: cache compartido en REDIS_URL
+- tiered: L1 en proceso + L2 Redis con invalidación pub/sub entre servicios
+"""
+
+from .memory import SimpleMemoryCache
+from .backends import (
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    TieredBackend,
+    create_backend,
+)
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .decorators import (
+    memory_cache,
+    get_backend,
+    set_backend,
+    make_cache_key,
+    cache_result,
+    async_cache_result,
+    cache_user_route,
+    invalidate_user_routes,
+    async_invalidate_user_routes,
+    cache_user_data,
+    cache_cards_data,
+    cache_chat_data,
+    invalidate_user_cache,
+    get_cache_stats,
+    clear_cache,
+    cache_function,
+    reinit_after_fork,
+)
+
+__all__ = [
+    # Motor
+    "SimpleMemoryCache",
+    # Backends
+    "CacheBackend",
+    "MemoryBackend",
+    "RedisBackend",
+    "TieredBackend",
+    "create_backend",
+    # Coalescencia
+    "SingleFlight",
+    "AsyncSingleFlight",
+    # API
+    "memory_cache",
+    "get_backend",
+    "set_backend",
+    "make_cache_key",
+    "cache_result",
+    "async_cache_result",
+    "cache_user_route",
+    "invalidate_user_routes",
+    "async_invalidate_user_routes",
+    "cache_user_data",
+    "cache_cards_data",
+    "cache_chat_data",
+    "invalidate_user_cache",
+    "get_cache_stats",
+    "clear_cache",
+    "cache_function",
+    "reinit_after_fork",
+]
@@ -0,0 +1,423 @@
+"""
+Cache Backends - Backends intercambiables para API, BO y FO
+===========================================================
+- memory: cache en memoria del proceso (SimpleMemoryCache)
+- redis:  cache compartido en la instancia Redis de infra/redis
+- tiered: L1 en proceso + L2 Redis, con invalidación por pub/sub entre servicios
+
+Además de claves, los backends transportan eventos (publish_event/on_event):
+en memoria solo dentro del proceso, en tiered por el mismo canal pub/sub que
+las invalidaciones. events_since() dice desde cuándo no se ha perdido ninguno.
+"""
+
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .memory import SimpleMemoryCache
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+
+DEFAULT_NAMESPACE = "firefighter:cache:"
+DEFAULT_CHANNEL = "firefighter:cache:invalidate"
+# Espera máxima de cada lectura del canal; no depende del socket_timeout del cliente
+SUBSCRIBER_POLL_SECONDS = float(os.getenv("CACHE_SUBSCRIBER_POLL_SECONDS", "1"))
+
+
+class CacheBackend:
+    """Interfaz común de los backends (misma API que SimpleMemoryCache)"""
+
+    name = "base"
+    # True si get/set pueden esperar por la red (las corrutinas los llevan a un hilo)
+    blocking = False
+
+    def __init__(self):
+        self._event_handlers: Dict[str, List[Callable[[Any], None]]] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def get_local(self, key: str) -> Optional[Any]:
+        """Valor si se puede obtener sin E/S (None si no está o requiere la red)"""
+        return None if self.blocking else self.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Eliminar varias claves"""
+        return sum(1 for key in keys if self.delete(key))
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    # ------------------------------------------------------------------
+    # Eventos entre procesos
+    # ------------------------------------------------------------------
+    def on_event(self, topic: str, handler: Callable[[Any], None]) -> None:
+        """Registrar handler(payload) para los eventos de `topic` (propios y ajenos)"""
+        self._event_handlers.setdefault(topic, []).append(handler)
+
+    def _dispatch(self, topic: str, payload: Any) -> None:
+        for handler in list(self._event_handlers.get(topic, ())):
+            try:
+                handler(payload)
+            except Exception as e:
+                print(f"⚠️ Error atendiendo evento de caché '{topic}': {e}")
+
+    def publish_event(self, topic: str, payload: Any) -> None:
+        """Entregar un evento a este proceso (y al resto si el backend los comparte)"""
+        self._dispatch(topic, payload)
+
+    def events_since(self) -> float:
+        """Momento desde el que se han recibido todos los eventos (inf = ahora no se reciben)"""
+        return 0.0
+
+    def reinit_after_fork(self) -> None:
+        """Rehacer en el hijo de un fork lo que no se hereda (conexiones, hilos)"""
+
+
+def _reset_pool(client) -> None:
+    """Descartar las conexiones Redis heredadas del padre"""
+    pool = getattr(client, "connection_pool", None)
+    if pool is not None:
+        pool.reset()
+
+
+class MemoryBackend(CacheBackend):
+    """Backend en proceso sobre SimpleMemoryCache"""
+
+    name = "memory"
+
+    def __init__(self, default_ttl: int = 300, max_size: int = 1000):
+        super().__init__()
+        self.cache = SimpleMemoryCache(default_ttl=default_ttl, max_size=max_size)
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self.cache.set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        return self.cache.delete(key)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.cache.stats()}
+
+
+class RedisBackend(CacheBackend):
+    """Backend compartido en Redis (valores serializados con pickle).
+
+    No se suscribe al canal: los eventos de otros procesos no llegan.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client, default_ttl: int = 300, namespace: str = DEFAULT_NAMESPACE):
+        super().__init__()
+        self.client = client
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}{key}"
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[Any], float]:
+        """Obtener valor y segundos de vida restantes"""
+        pipe = self.client.pipeline()
+        pipe.get(self._key(key))
+        pipe.pttl(self._key(key))
+        raw, pttl = pipe.execute()
+        if raw is None:
+            return None, 0
+        return pickle.loads(raw), max(pttl, 0) / 1000.0
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self._key(key), pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> bool:
+        return bool(self.client.delete(self._key(key)))
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        keys = [self._key(key) for key in keys]
+        return int(self.client.delete(*keys)) if keys else 0
+
+    def clear(self) -> None:
+        """Borrar solo las claves del namespace (Redis también guarda sesiones del BO)"""
+        batch = []
+        for key in self.client.scan_iter(match=f"{self.namespace}*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def stats(self) -> Dict[str, Any]:
+        total_entries = sum(1 for _ in self.client.scan_iter(match=f"{self.namespace}*", count=500))
+        info = self.client.info("memory")
+        return {
+            "backend": self.name,
+            "total_entries": total_entries,
+            "active_entries": total_entries,
+            "expired_entries": 0,
+            "usage_percent": 0,
+            "used_memory": info.get("used_memory_human", "N/A"),
+        }
+
+    def events_since(self) -> float:
+        return float("inf")
+
+    def reinit_after_fork(self) -> None:
+        _reset_pool(self.client)
+
+
+class TieredBackend(CacheBackend):
+    """L1 en proceso + L2 Redis.
+
+    Las escrituras y borrados se publican en un canal de Redis; el resto de
+    procesos (API, BO, FO y sus workers) descartan su copia L1 al recibir el
+    mensaje, sin esperar a que expire el TTL. Por el mismo canal viajan los
+    eventos de publish_event; mientras no hay suscripción events_since() es inf.
+    """
+
+    name = "tiered"
+    blocking = True
+
+    def __init__(self, client, default_ttl: int = 300, max_size: int = 1000,
+                 namespace: str = DEFAULT_NAMESPACE, channel: str = DEFAULT_CHANNEL,
+                 l1_ttl: Optional[int] = None):
+        super().__init__()
+        self.l1 = SimpleMemoryCache(default_ttl=default_ttl, max_size=max_size)
+        self.l2 = RedisBackend(client, default_ttl=default_ttl, namespace=namespace)
+        self.client = client
+        self.channel = channel
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        # TTL máximo de la copia L1 (acota la ventana si se pierde un mensaje)
+        self.l1_ttl = l1_ttl if l1_ttl is not None else default_ttl
+        self.instance_id = uuid.uuid4().hex
+        self.invalidations_received = 0
+        self._events_since = float("inf")
+        self._closed = threading.Event()
+        self._subscriber: Optional[threading.Thread] = None
+        self._start_subscriber()
+
+    # ------------------------------------------------------------------
+    # Pub/sub
+    # ------------------------------------------------------------------
+    def _publish(self, op: str, keys: Iterable[str] = (), **extra: Any) -> None:
+        message = json.dumps({"origin": self.instance_id, "op": op, "keys": list(keys), **extra})
+        try:
+            self.client.publish(self.channel, message)
+        except Exception as e:
+            print(f"⚠️ Error publicando invalidación de caché: {e}")
+
+    def _handle_message(self, data) -> None:
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.instance_id:
+            return
+        if message.get("op") == "event":
+            self._dispatch(message.get("topic"), message.get("payload"))
+            return
+        self.invalidations_received += 1
+        if message.get("op") == "clear":
+            self.l1.clear()
+        else:
+            for key in message.get("keys", []):
+                self.l1.delete(key)
+
+    def _start_subscriber(self) -> None:
+        def run():
+            reconnecting = False
+            while not self._closed.is_set():
+                pubsub = None
+                try:
+                    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    if reconnecting:
+                        # Las invalidaciones publicadas sin suscripción se han perdido
+                        self.l1.clear()
+                        reconnecting = False
+                    self._events_since = time.time()
+                    # get_message con timeout: un canal inactivo no es un error de conexión
+                    while not self._closed.is_set():
+                        item = pubsub.get_message(timeout=SUBSCRIBER_POLL_SECONDS)
+                        if item and item.get("type") == "message":
+                            self._handle_message(item.get("data"))
+                except Exception as e:
+                    self._events_since = float("inf")
+                    print(f"⚠️ Suscriptor de invalidación desconectado: {e}")
+                    reconnecting = True
+                    time.sleep(2)
+                finally:
+                    if pubsub is not None:
+                        try:
+                            pubsub.close()
+                        except Exception:
+                            pass
+
+        self._subscriber = threading.Thread(target=run, name="cache-invalidation", daemon=True)
+        self._subscriber.start()
+
+    def close(self) -> None:
+        """Detener el suscriptor (y con él la recepción de eventos)"""
+        self._closed.set()
+        self._events_since = float("inf")
+
+    def publish_event(self, topic: str, payload: Any) -> None:
+        self._dispatch(topic, payload)
+        self._publish("event", topic=topic, payload=payload)
+
+    def events_since(self) -> float:
+        return self._events_since
+
+    def reinit_after_fork(self) -> None:
+        """
+        Tras un fork el hilo suscriptor no existe en el hijo y todos los workers
+        compartirían instance_id (e ignorarían los mensajes de los demás).
+        """
+        self.instance_id = uuid.uuid4().hex
+        self._events_since = float("inf")
+        _reset_pool(self.client)
+        if not self._closed.is_set():
+            self._start_subscriber()
+
+    # ------------------------------------------------------------------
+    # API de backend
+    # ------------------------------------------------------------------
+    def get_local(self, key: str) -> Optional[Any]:
+        return self.l1.get(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        try:
+            value, remaining = self.l2.get_with_ttl(key)
+        except Exception as e:
+            print(f"⚠️ Redis no disponible (L2): {e}")
+            return None
+        if value is not None and remaining > 0:
+            self.l1.set(key, value, min(remaining, self.l1_ttl))
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        self.l1.set(key, value, min(ttl, self.l1_ttl))
+        try:
+            self.l2.set(key, value, ttl)
+        except Exception as e:
+            print(f"⚠️ Redis no disponible (L2): {e}")
+            return
+        self._publish("delete", [key])
+
+    def delete(self, key: str) -> bool:
+        return self.delete_many([key]) > 0
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        deleted = sum(1 for key in keys if self.l1.delete(key))
+        try:
+            deleted = max(deleted, self.l2.delete_many(keys))
+        except Exception as e:
+            print(f"⚠️ Redis no disponible (L2): {e}")
+        self._publish("delete", keys)
+        return deleted
+
+    def clear(self) -> None:
+        self.l1.clear()
+        try:
+            self.l2.clear()
+        except Exception as e:
+            print(f"⚠️ Redis no disponible (L2): {e}")
+        self._publish("clear")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"backend": self.name, **self.l1.stats()}
+        stats["invalidations_received"] = self.invalidations_received
+        try:
+            stats["l2"] = self.l2.stats()
+        except Exception as e:
+            stats["l2"] = {"error": str(e)}
+        return stats
+
+
+def _redis_client(redis_url: str):
+    """Crear cliente Redis y comprobar conexión (None si no está disponible)"""
+    if not REDIS_AVAILABLE:
+        print("⚠️ Paquete redis no instalado, usando caché en memoria")
+        return None
+    try:
+        client = redis.Redis.from_url(
+            redis_url,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            health_check_interval=30,
+        )
+        client.ping()
+        return client
+    except Exception as e:
+        print(f"⚠️ Redis no disponible en {redis_url}: {e}, usando caché en memoria")
+        return None
+
+
+def create_backend(kind: Optional[str] = None, redis_url: Optional[str] = None,
+                   default_ttl: Optional[int] = None, max_size: Optional[int] = None) -> CacheBackend:
+    """Crear el backend configurado (CACHE_BACKEND=memory|redis|tiered).
+
+    Si Redis no está disponible cae siempre al backend en memoria.
+    """
+    kind = (kind or os.getenv("CACHE_BACKEND", "memory")).lower()
+    redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    default_ttl = default_ttl if default_ttl is not None else int(os.getenv("CACHE_DEFAULT_TTL", "300"))
+    max_size = max_size if max_size is not None else int(os.getenv("CACHE_MAX_SIZE", "1000"))
+    namespace = os.getenv("CACHE_NAMESPACE", DEFAULT_NAMESPACE)
+
+    if kind in ("redis", "tiered"):
+        client = _redis_client(redis_url)
+        if client is not None:
+            if kind == "redis":
+                print(f"✅ Caché compartido en Redis ({redis_url})")
+                return RedisBackend(client, default_ttl=default_ttl, namespace=namespace)
+            print(f"✅ Caché L1 en memoria + L2 Redis ({redis_url}) con invalidación pub/sub")
+            return TieredBackend(
+                client,
+                default_ttl=default_ttl,
+                max_size=max_size,
+                namespace=namespace,
+                channel=os.getenv("CACHE_INVALIDATION_CHANNEL", DEFAULT_CHANNEL),
+            )
+
+    return MemoryBackend(default_ttl=default_ttl, max_size=max_size)
@@ -0,0 +1,366 @@
+"""
+Cache Decorators - API pública de cache compartida por API, BO y FO
+===================================================================
+"""
+
+import asyncio
+import hashlib
+import inspect
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from .backends import CacheBackend, create_backend
+from .memory import SimpleMemoryCache
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+# Backend global (configurado por entorno: CACHE_BACKEND, REDIS_URL, ...)
+memory_cache: CacheBackend = create_backend()
+
+
+def get_backend() -> CacheBackend:
+    """Obtener el backend activo"""
+    return memory_cache
+
+
+def set_backend(backend: CacheBackend) -> CacheBackend:
+    """Sustituir el backend activo (tests o configuración explícita)"""
+    global memory_cache
+    memory_cache = backend
+    return backend
+
+
+def make_cache_key(func, args, kwargs) -> str:
+    """Clave basada en función y argumentos"""
+    func_name = f"{func.__module__}.{func.__name__}"
+    args_str = str(args) + str(sorted(kwargs.items()))
+    return f"{func_name}:{hashlib.md5(args_str.encode()).hexdigest()}"
+
+
+class _Stamped:
+    """Valor cacheado con stale-while-revalidate: fresco hasta fresh_until, luego obsoleto"""
+
+    __slots__ = ("value", "fresh_until")
+
+    def __init__(self, value: Any, fresh_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+
+
+# Coalescencia de recálculos por clave (por proceso)
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+# Referencias a las tareas de refresco async (evita que el GC las cancele)
+_refresh_tasks = set()
+_stale_served = 0
+
+
+def _unwrap(entry: Any) -> Tuple[Optional[Any], bool]:
+    """Entrada del backend -> (valor, obsoleto)"""
+    if isinstance(entry, _Stamped):
+        return entry.value, time.time() >= entry.fresh_until
+    return entry, False
+
+
+def _wrap(result: Any, ttl: int, stale_ttl: int) -> Tuple[Any, int]:
+    """Valor y TTL a guardar; con stale_ttl la entrada vive ttl + stale_ttl"""
+    if stale_ttl:
+        return _Stamped(result, time.time() + ttl), ttl + stale_ttl
+    return result, ttl
+
+
+def _read(cache_key: str) -> Tuple[Optional[Any], bool]:
+    """Leer del backend; devuelve (valor, obsoleto)"""
+    return _unwrap(memory_cache.get(cache_key))
+
+
+def _store(cache_key: str, result: Any, ttl: int, stale_ttl: int) -> None:
+    """Guardar en el backend"""
+    if result is not None:
+        memory_cache.set(cache_key, *_wrap(result, ttl, stale_ttl))
+
+
+def _fresh(cache_key: str) -> Optional[Any]:
+    """Valor cacheado solo si no está obsoleto"""
+    value, stale = _read(cache_key)
+    return None if stale else value
+
+
+# Variantes para corrutinas: lo que no se resuelve en proceso (L2 Redis,
+# publicación de invalidaciones) se hace en un hilo, fuera del event loop
+async def _aget(key: str) -> Optional[Any]:
+    backend = memory_cache
+    value = backend.get_local(key)
+    if value is None and backend.blocking:
+        value = await asyncio.to_thread(backend.get, key)
+    return value
+
+
+async def _aset(key: str, value: Any, ttl: int) -> None:
+    backend = memory_cache
+    if backend.blocking:
+        await asyncio.to_thread(backend.set, key, value, ttl)
+    else:
+        backend.set(key, value, ttl)
+
+
+async def _aread(cache_key: str) -> Tuple[Optional[Any], bool]:
+    return _unwrap(await _aget(cache_key))
+
+
+async def _astore(cache_key: str, result: Any, ttl: int, stale_ttl: int) -> None:
+    if result is not None:
+        await _aset(cache_key, *_wrap(result, ttl, stale_ttl))
+
+
+async def _afresh(cache_key: str) -> Optional[Any]:
+    value, stale = await _aread(cache_key)
+    return None if stale else value
+
+
+def cache_result(ttl: int = 300, key_func=None, stale_ttl: int = 0, single_flight: bool = True):
+    """Decorador para cachear resultados de funciones.
+
+    - single_flight: si la entrada falta, solo un hilo recalcula la clave y el
+      resto espera su resultado.
+    - stale_ttl: durante stale_ttl segundos tras expirar se sirve el valor
+      obsoleto y se refresca en un hilo en segundo plano (la función no debe
+      depender del contexto de la petición de Flask).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            global _stale_served
+            # Generar clave de cache
+            if key_func:
+                cache_key = key_func(*args, **kwargs)
+            else:
+                cache_key = make_cache_key(func, args, kwargs)
+
+            def compute():
+                # Otro hilo pudo terminar el cálculo mientras tanto
+                cached = _fresh(cache_key) if single_flight else None
+                if cached is not None:
+                    return cached
+                result = func(*args, **kwargs)
+                _store(cache_key, result, ttl, stale_ttl)
+                return result
+
+            # Intentar obtener del cache
+            result, stale = _read(cache_key)
+            if result is not None:
+                if stale and not _flights.in_flight(cache_key):
+                    _stale_served += 1
+                    threading.Thread(
+                        target=_refresh, args=(cache_key, compute),
+                        name="cache-refresh", daemon=True,
+                    ).start()
+                return result
+
+            # Ejecutar función y cachear resultado
+            if not single_flight:
+                return compute()
+            result, _ = _flights.do(cache_key, compute)
+            return result
+
+        return wrapper
+    return decorator
+
+
+def _refresh(cache_key: str, compute) -> None:
+    """Refresco en segundo plano de una entrada obsoleta"""
+    try:
+        _flights.do(cache_key, compute)
+    except Exception as e:
+        print(f"⚠️ Error refrescando caché {cache_key}: {e}")
+
+
+def async_cache_result(ttl: int = 300, key_func=None, stale_ttl: int = 0, single_flight: bool = True):
+    """Variante de cache_result para corrutinas (rutas async de FastAPI).
+
+    Con un backend que hace E/S de red (redis, tiered) las lecturas que no
+    resuelve la L1 y todas las escrituras van a un hilo (asyncio.to_thread).
+    key_func puede ser también una corrutina.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            global _stale_served
+            if key_func:
+                cache_key = key_func(*args, **kwargs)
+                if inspect.isawaitable(cache_key):
+                    cache_key = await cache_key
+            else:
+                cache_key = make_cache_key(func, args, kwargs)
+
+            async def compute():
+                cached = await _afresh(cache_key) if single_flight else None
+                if cached is not None:
+                    return cached
+                result = await func(*args, **kwargs)
+                await _astore(cache_key, result, ttl, stale_ttl)
+                return result
+
+            result, stale = await _aread(cache_key)
+            if result is not None:
+                if stale and not _async_flights.in_flight(cache_key):
+                    _stale_served += 1
+                    task = asyncio.get_running_loop().create_task(_async_refresh(cache_key, compute))
+                    _refresh_tasks.add(task)
+                    task.add_done_callback(_refresh_tasks.discard)
+                return result
+
+            if not single_flight:
+                return await compute()
+            result, _ = await _async_flights.do(cache_key, compute)
+            return result
+
+        return wrapper
+    return decorator
+
+
+async def _async_refresh(cache_key: str, compute) -> None:
+    """Refresco en segundo plano (async) de una entrada obsoleta"""
+    try:
+        await _async_flights.do(cache_key, compute)
+    except Exception as e:
+        print(f"⚠️ Error refrescando caché {cache_key}: {e}")
+
+
+# ============================================================================
+# CACHE DE RUTAS POR USUARIO (FastAPI)
+# ============================================================================
+
+# Generación de la cache de rutas: invalidar = cambiar la generación, sin
+# tener que enumerar las claves (funciona igual en memory, redis y tiered)
+ROUTE_GENERATION_TTL = 86400
+_ALL_USERS = "*"
+
+
+async def _route_generation(scope: str) -> str:
+    """Generación vigente de un scope (usuario o todos)"""
+    key = f"routegen:{scope}"
+    generation = await _aget(key)
+    if generation is None:
+        # Nunca reutilizar una generación anterior si la entrada fue desalojada
+        generation = uuid.uuid4().hex[:12]
+        await _aset(key, generation, ROUTE_GENERATION_TTL)
+    return generation
+
+
+async def _route_key(namespace: str, user: Optional[Dict[str, Any]], shared: bool, kwargs: Dict[str, Any]) -> str:
+    """Clave de ruta: namespace + usuario/rol + generación + hash de parámetros"""
+    params = hashlib.md5(str(sorted(kwargs.items())).encode()).hexdigest()
+    if shared or not user:
+        return f"route:{namespace}:all:{await _route_generation(_ALL_USERS)}:{params}"
+    username = user.get("username", "")
+    role = user.get("role", "user")
+    generation = await _route_generation(username)
+    if role == "admin":
+        # Los admins ven datos agregados de todos los usuarios
+        generation = f"{generation}.{await _route_generation(_ALL_USERS)}"
+    return f"route:{namespace}:{username}:{role}:{generation}:{params}"
+
+
+def cache_user_route(ttl: int = 60, namespace: Optional[str] = None, user_arg: str = "user_data",
+                     shared: bool = False, stale_ttl: int = 0):
+    """Decorador async para rutas FastAPI con clave por usuario.
+
+    La clave se deriva del payload de require_user (username y rol) que la
+    ruta recibe en `user_arg`, más el resto de parámetros. Con shared=True el
+    resultado es común a todos los usuarios. Invalidar con invalidate_user_routes.
+    Se coloca debajo de @router.get (functools.wraps conserva la firma).
+    """
+    def decorator(func):
+        route_namespace = namespace or f"{func.__module__}.{func.__name__}"
+
+        async def key_func(*args, **kwargs):
+            user = kwargs.get(user_arg)
+            params = {k: v for k, v in kwargs.items() if k != user_arg}
+            return await _route_key(route_namespace, user, shared, params)
+
+        return async_cache_result(ttl=ttl, key_func=key_func, stale_ttl=stale_ttl)(func)
+    return decorator
+
+
+def invalidate_user_routes(*usernames: str) -> None:
+    """Invalidar la cache de rutas de los usuarios indicados (y las vistas agregadas)"""
+    for scope in set(filter(None, usernames)) | {_ALL_USERS}:
+        memory_cache.set(f"routegen:{scope}", uuid.uuid4().hex[:12], ROUTE_GENERATION_TTL)
+
+
+async def async_invalidate_user_routes(*usernames: str) -> None:
+    """invalidate_user_routes para corrutinas (la escritura y la publicación van a un hilo)"""
+    backend = memory_cache
+    if backend.blocking:
+        await asyncio.to_thread(invalidate_user_routes, *usernames)
+    else:
+        invalidate_user_routes(*usernames)
+
+
+def cache_user_data(ttl: int = 300):
+    """Decorador específico para datos de usuario"""
+    return cache_result(ttl=ttl, key_func=lambda user_id, *args, **kwargs: f"user:{user_id}")
+
+
+def cache_cards_data(ttl: int = 180):
+    """Decorador específico para datos de cards"""
+    return cache_result(ttl=ttl, key_func=lambda user_id, *args, **kwargs: f"cards:{user_id}")
+
+
+def cache_chat_data(ttl: int = 120):
+    """Decorador específico para datos de chat"""
+    return cache_result(ttl=ttl, key_func=lambda user_id, *args, **kwargs: f"chat:{user_id}")
+
+
+def invalidate_user_cache(user_id: str) -> None:
+    """Invalidar cache de usuario específico (en todos los servicios con backend tiered)"""
+    memory_cache.delete_many([f"user:{user_id}", f"cards:{user_id}", f"chat:{user_id}"])
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Obtener estadísticas del cache"""
+    stats = memory_cache.stats()
+    stats["single_flight"] = {
+        "coalesced": _flights.coalesced + _async_flights.coalesced,
+        "stale_served": _stale_served,
+    }
+    return stats
+
+
+def clear_cache() -> None:
+    """Limpiar todo el cache"""
+    memory_cache.clear()
+
+
+# Para compatibilidad con versiones anteriores
+def cache_function(ttl=300):
+    """Alias para cache_result"""
+    return cache_result(ttl)
+
+
+_fork_pid = os.getpid()
+
+
+def reinit_after_fork() -> None:
+    """
+    Rehacer en el hijo de un fork lo que no sobrevive a él (gunicorn con
+    preload_app): hilos de limpieza y locks de cada SimpleMemoryCache, el
+    suscriptor pub/sub y las conexiones Redis del backend, y la coalescencia.
+    Registrado con os.register_at_fork; en el mismo proceso solo actúa una vez.
+    """
+    global _fork_pid, _flights
+    if os.getpid() == _fork_pid:
+        return
+    _fork_pid = os.getpid()
+    _flights = SingleFlight()
+    for cache in list(SimpleMemoryCache._instances):
+        cache.reinit_after_fork()
+    memory_cache.reinit_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reinit_after_fork)
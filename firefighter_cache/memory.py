@@ -0,0 +1,215 @@
+"""
+Memory Cache Engine - Cache en memoria del proceso
+==================================================
+Motor LRU/TTL segmentado usado como backend en proceso y como L1 del modo tiered
+"""
+
+import heapq
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Optional, Dict, List, Tuple
+
+
+class _CacheSegment:
+    """Segmento del cache: LRU (OrderedDict) + heap de expiración con su propio lock"""
+
+    __slots__ = ("capacity", "entries", "expiry_heap", "lock", "hits", "misses", "evictions")
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        # key -> (value, expiry); el orden del OrderedDict es el orden LRU
+        self.entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # (expiry, key); puede contener entradas obsoletas que se validan al extraerlas
+        self.expiry_heap: List[Tuple[float, str]] = []
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def purge_expired(self, now: float, limit: Optional[int] = None) -> int:
+        """Eliminar entradas expiradas desde la cima del heap (llamar con el lock tomado)"""
+        removed = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            if limit is not None and removed >= limit:
+                break
+            expiry, key = heapq.heappop(heap)
+            entry = self.entries.get(key)
+            # Solo borrar si la entrada del heap sigue siendo la vigente
+            if entry is not None and entry[1] == expiry:
+                del self.entries[key]
+                removed += 1
+        return removed
+
+    def compact_heap(self) -> None:
+        """Reconstruir el heap cuando acumula demasiadas entradas obsoletas"""
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [(expiry, key) for key, (_, expiry) in self.entries.items()]
+            heapq.heapify(self.expiry_heap)
+
+
+class SimpleMemoryCache:
+    """Cache en memoria thread-safe con TTL y LRU.
+
+    get/set/delete son O(1) (O(log n) para el heap de expiración): cada clave
+    cae en un segmento con su propio lock, el orden LRU lo mantiene un
+    OrderedDict y las expiraciones se purgan de forma amortizada en cada set
+    y periódicamente desde un hilo de limpieza en segundo plano.
+    """
+
+    # Entradas expiradas purgadas como máximo por cada set (coste amortizado)
+    PURGE_BATCH = 8
+    # Instancias vivas, para rehacer sus hilos y locks tras un fork
+    _instances: "weakref.WeakSet" = weakref.WeakSet()
+
+    def __init__(self, default_ttl: int = 300, max_size: int = 1000,
+                 segments: int = 16, cleanup_interval: float = 30.0):
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        # Número de segmentos potencia de 2 para repartir con una máscara
+        n_segments = 1
+        while n_segments < max(1, min(segments, max_size)):
+            n_segments <<= 1
+        self._mask = n_segments - 1
+        per_segment = -(-max_size // n_segments)  # ceil
+        self._segments = [_CacheSegment(per_segment) for _ in range(n_segments)]
+        self.cleanup_interval = cleanup_interval
+        self._stop_event = threading.Event()
+        self._janitor: Optional[threading.Thread] = None
+        if cleanup_interval and cleanup_interval > 0:
+            self._start_janitor()
+        SimpleMemoryCache._instances.add(self)
+        print(f"✅ Caché inicializado (TTL: {default_ttl}s, Max: {max_size} entradas, "
+              f"{n_segments} segmentos)")
+
+    def _segment(self, key: str) -> _CacheSegment:
+        return self._segments[hash(key) & self._mask]
+
+    def _start_janitor(self) -> None:
+        """Arrancar el hilo daemon que purga expirados periódicamente"""
+        def run():
+            while not self._stop_event.wait(self.cleanup_interval):
+                try:
+                    self.purge_expired()
+                except Exception as e:
+                    print(f"⚠️ Error limpiando caché: {e}")
+
+        self._janitor = threading.Thread(target=run, name="memory-cache-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop(self) -> None:
+        """Detener el hilo de limpieza"""
+        self._stop_event.set()
+
+    def reinit_after_fork(self) -> None:
+        """En el hijo de un fork: locks nuevos y el hilo de limpieza de nuevo en marcha"""
+        for segment in self._segments:
+            segment.lock = threading.Lock()
+        stopped = self._stop_event.is_set()
+        self._stop_event = threading.Event()
+        if self._janitor is not None and not stopped:
+            self._start_janitor()
+
+    def purge_expired(self) -> int:
+        """Purgar todas las entradas expiradas de todos los segmentos"""
+        now = time.time()
+        removed = 0
+        for segment in self._segments:
+            with segment.lock:
+                removed += segment.purge_expired(now)
+                segment.compact_heap()
+        return removed
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Establecer valor en cache"""
+        if ttl is None:
+            ttl = self.default_ttl
+
+        now = time.time()
+        expiry_time = now + ttl
+        segment = self._segment(key)
+
+        with segment.lock:
+            # Limpieza amortizada: unas pocas entradas expiradas por operación
+            segment.purge_expired(now, self.PURGE_BATCH)
+
+            entries = segment.entries
+            if key in entries:
+                entries.move_to_end(key)
+            else:
+                # Evict LRU si el segmento está lleno
+                while len(entries) >= segment.capacity:
+                    entries.popitem(last=False)
+                    segment.evictions += 1
+
+            entries[key] = (value, expiry_time)
+            heapq.heappush(segment.expiry_heap, (expiry_time, key))
+            segment.compact_heap()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Obtener valor del cache"""
+        segment = self._segment(key)
+        with segment.lock:
+            entry = segment.entries.get(key)
+            if entry is None:
+                segment.misses += 1
+                return None
+
+            value, expiry = entry
+            if expiry < time.time():
+                # Expirado (su entrada en el heap se descarta al extraerla)
+                del segment.entries[key]
+                segment.misses += 1
+                return None
+
+            # Actualizar orden LRU
+            segment.entries.move_to_end(key)
+            segment.hits += 1
+            return value
+
+    def delete(self, key: str) -> bool:
+        """Eliminar entrada del cache"""
+        segment = self._segment(key)
+        with segment.lock:
+            return segment.entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Limpiar todo el cache"""
+        for segment in self._segments:
+            with segment.lock:
+                segment.entries.clear()
+                segment.expiry_heap.clear()
+
+    def __len__(self) -> int:
+        return sum(len(segment.entries) for segment in self._segments)
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del cache"""
+        self.purge_expired()
+
+        total_entries = 0
+        hits = misses = evictions = 0
+        for segment in self._segments:
+            with segment.lock:
+                total_entries += len(segment.entries)
+                hits += segment.hits
+                misses += segment.misses
+                evictions += segment.evictions
+
+        usage_percent = (total_entries / self.max_size) * 100 if self.max_size > 0 else 0
+        lookups = hits + misses
+
+        return {
+            "total_entries": total_entries,
+            "active_entries": total_entries,
+            "expired_entries": 0,  # Ya limpiamos
+            "max_size": self.max_size,
+            "usage_percent": round(usage_percent, 1),
+            "segments": len(self._segments),
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": round(hits / lookups * 100, 1) if lookups else 0
+        }
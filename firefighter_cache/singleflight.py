@@ -0,0 +1,106 @@
+"""
+Single-flight - Coalescencia de peticiones concurrentes por clave
+=================================================================
+Cuando una entrada expira bajo carga solo un llamador recalcula el valor;
+el resto espera y recibe el mismo resultado (o la misma excepción).
+La coalescencia es por proceso: cada worker recalcula como mucho una vez.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    """Cálculo en curso para una clave"""
+
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalescencia para código síncrono (Flask / hilos de waitress y gunicorn)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        """Indica si ya hay un cálculo en curso para la clave"""
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Ejecutar fn una sola vez por clave; devuelve (resultado, compartido)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+
+class AsyncSingleFlight:
+    """Coalescencia para corrutinas (rutas async de FastAPI)"""
+
+    def __init__(self):
+        # (id del event loop, clave) -> future; cada loop tiene sus propios futures
+        self._calls: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: str) -> bool:
+        """Indica si ya hay un cálculo en curso para la clave en el loop actual"""
+        return (id(asyncio.get_running_loop()), key) in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Esperar fn una sola vez por clave; devuelve (resultado, compartido)"""
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        future = self._calls.get(slot)
+        if future is not None:
+            self.coalesced += 1
+            # shield: cancelar a un llamador en espera no cancela el cálculo
+            return await asyncio.shield(future), True
+
+        future = loop.create_future()
+        self._calls[slot] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Evitar el aviso "exception was never retrieved" si nadie esperaba
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._calls.pop(slot, None)
@@ -14,7 +14,7 @@ if ($swarmStatus -ne "active") {
 
 # Build Backend
 Write-Host "🔨 Construyendo Backend..." -ForegroundColor Yellow
-docker build -t ai-firefighter-backend:local ./API
+docker build -t ai-firefighter-backend:local --build-context firefighter_cache=./firefighter_cache ./API
 if ($LASTEXITCODE -ne 0) {
     Write-Host "❌ Error construyendo Backend" -ForegroundColor Red
     exit 1
@@ -24,7 +24,7 @@ Write-Host "✅ Backend construido" -ForegroundColor Green
 # Build Frontend
 Write-Host ""
 Write-Host "🔨 Construyendo Frontend..." -ForegroundColor Yellow
-docker build -t ai-firefighter-frontend:local ./FO
+docker build -t ai-firefighter-frontend:local --build-context firefighter_cache=./firefighter_cache ./FO
 if ($LASTEXITCODE -ne 0) {
     Write-Host "❌ Error construyendo Frontend" -ForegroundColor Red
     exit 1
@@ -34,7 +34,7 @@ Write-Host "✅ Frontend construido" -ForegroundColor Green
 # Build Backoffice
 Write-Host ""
 Write-Host "🔨 Construyendo Backoffice..." -ForegroundColor Yellow
-docker build -t ai-firefighter-backoffice:local ./BO
+docker build -t ai-firefighter-backoffice:local --build-context firefighter_cache=./firefighter_cache ./BO
 if ($LASTEXITCODE -ne 0) {
     Write-Host "❌ Error construyendo Backoffice" -ForegroundColor Red
     exit 1
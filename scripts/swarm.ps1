@@ -64,9 +64,9 @@ function Initialize-Swarm {
 function Build-Images {
     Write-Host "🏗️ Construyendo imágenes..." -ForegroundColor Yellow
     
-    docker build -t ai-firefighter-backend:local ./API
-    docker build -t ai-firefighter-frontend:local ./FO
-    docker build -t ai-firefighter-backoffice:local ./BO
+    docker build -t ai-firefighter-backend:local --build-context firefighter_cache=./firefighter_cache ./API
+    docker build -t ai-firefighter-frontend:local --build-context firefighter_cache=./firefighter_cache ./FO
+    docker build -t ai-firefighter-backoffice:local --build-context firefighter_cache=./firefighter_cache ./BO
     
     Write-Host "✅ Imágenes construidas" -ForegroundColor Green
 }
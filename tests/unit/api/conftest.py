@@ -0,0 +1,68 @@
+"""Shared fixtures for the API route tests.
+
+The routers run in a minimal FastAPI app on top of an in-memory Mongo
+(mongomock_motor), with `require_user` overridden by a fixed principal.
+mongomock has no $unionWith, so the change feed gets a small emulation of it.
+"""
+
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "API")
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+
+def _union_with_stage(in_collection, database, options):
+    """$unionWith de mongomock: documentos de entrada + pipeline sobre `coll`"""
+    other = database[options["coll"]].aggregate(options.get("pipeline", []))
+    return list(in_collection) + list(other)
+
+
+@pytest.fixture(autouse=True)
+def route_cache():
+    """Caché de rutas vacía en cada test (las claves no dependen de la base de datos)"""
+    import firefighter_cache
+
+    previous = firefighter_cache.get_backend()
+    yield firefighter_cache.set_backend(firefighter_cache.MemoryBackend(default_ttl=60, max_size=1000))
+    firefighter_cache.set_backend(previous)
+
+
+@pytest.fixture
+def api_db(monkeypatch):
+    """Base de datos en memoria conectada a API/database.Database"""
+    from mongomock import aggregate
+    from mongomock_motor import AsyncMongoMockClient
+
+    from database import Database
+
+    monkeypatch.setitem(aggregate._PIPELINE_HANDLERS, "$unionWith", _union_with_stage)
+    client = AsyncMongoMockClient()
+    db = client["firefighter_test"]
+    monkeypatch.setattr(Database, "client", client)
+    monkeypatch.setattr(Database, "db", db)
+    monkeypatch.setattr(Database, "users", db["users"])
+    monkeypatch.setattr(Database, "admin_users", db["Adm_Users"])
+    monkeypatch.setattr(Database, "memory_cards", db["memory_cards"])
+    return db
+
+
+@pytest.fixture
+def make_client(api_db):
+    """make_client(router, user) -> TestClient con el router bajo /api"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from dependencies.auth import require_user
+
+    def factory(router, user=None):
+        app = FastAPI()
+        app.include_router(router, prefix="/api")
+        principal = user or {"username": "ana", "role": "user", "user_id": "u1"}
+        app.dependency_overrides[require_user] = lambda: principal
+        return TestClient(app)
+
+    return factory
@@ -0,0 +1,164 @@
+"""Tests for the streaming NDJSON memory-card import."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mongomock_motor")
+
+import services.card_import as card_import  # noqa: E402
+from routes.memory_cards import router  # noqa: E402
+from services.card_import import IMPORTS_COLLECTION, create_import_job, run_ndjson_import  # noqa: E402
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def ndjson(*cards):
+    return "\n".join(c if isinstance(c, str) else json.dumps(c) for c in cards).encode()
+
+
+def card(n):
+    return {"question": f"Pregunta {n}", "answer": f"Respuesta {n}"}
+
+
+def wait_for_job(client, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/memory-cards/imports/{job_id}").json()["job"]
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.02)
+    pytest.fail(f"la importación {job_id} no termina")
+
+
+def test_import_inserts_all_cards(make_client, api_db):
+    with make_client(router) as client:
+        response = client.post("/api/memory-cards/imports", content=ndjson(card(1), card(2), card(3)), headers=NDJSON)
+        assert response.status_code == 202
+        job = wait_for_job(client, response.json()["job_id"])
+
+    assert (job["status"], job["received"], job["inserted"], job["failed"]) == ("done", 3, 3, 0)
+    stored = asyncio.run(api_db["memory_cards"].find({"created_by": "ana"}).to_list(length=10))
+    assert sorted(c["question"] for c in stored) == ["Pregunta 1", "Pregunta 2", "Pregunta 3"]
+
+
+def test_malformed_line_is_reported_and_the_rest_imported(make_client):
+    body = ndjson(card(1), "{no es json", {"question": "x"}, card(4))
+    with make_client(router) as client:
+        response = client.post("/api/memory-cards/imports", content=body, headers=NDJSON)
+        job = wait_for_job(client, response.json()["job_id"])
+
+    assert (job["status"], job["received"], job["inserted"], job["failed"]) == ("done", 4, 2, 2)
+    assert [e["line"] for e in job["errors"]] == [2, 3]
+    assert job["errors"][0]["error"].startswith("JSON inválido")
+
+
+def test_wrong_content_type_is_rejected(make_client):
+    client = make_client(router)
+    response = client.post("/api/memory-cards/imports", content=b"{}", headers={"Content-Type": "application/json"})
+    assert response.status_code == 415
+
+
+def test_two_step_import_returns_the_job_before_the_body(make_client):
+    client = make_client(router)
+    created = client.post("/api/memory-cards/imports")
+    assert created.status_code == 202
+    job_id = created.json()["job_id"]
+    assert client.get(f"/api/memory-cards/imports/{job_id}").json()["job"]["status"] == "pending"
+
+    response = client.put(f"/api/memory-cards/imports/{job_id}", content=ndjson(card(1), card(2)), headers=NDJSON)
+    assert response.status_code == 202
+    job = wait_for_job(client, job_id)
+    assert (job["status"], job["received"], job["inserted"]) == ("done", 2, 2)
+
+    # El cuerpo solo se sube una vez, y solo lo sube quien creó el job
+    again = client.put(f"/api/memory-cards/imports/{job_id}", content=ndjson(card(3)), headers=NDJSON)
+    assert again.status_code == 409
+    other = make_client(router, user={"username": "luis", "role": "user", "user_id": "u2"})
+    assert other.put(f"/api/memory-cards/imports/{job_id}", content=ndjson(card(3)), headers=NDJSON).status_code == 403
+
+
+def test_progress_is_visible_while_the_body_uploads(api_db, monkeypatch):
+    import httpx
+    from fastapi import FastAPI
+
+    from dependencies.auth import require_user
+
+    monkeypatch.setattr(card_import, "IMPORT_CHUNK_SIZE", 1)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[require_user] = lambda: {"username": "ana", "role": "user", "user_id": "u1"}
+    seen = []
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            job_id = (await client.post("/api/memory-cards/imports")).json()["job_id"]
+            status_url = f"/api/memory-cards/imports/{job_id}"
+
+            async def body():
+                for n in range(3):
+                    yield (json.dumps(card(n)) + "\n").encode()
+                # A mitad de la subida el job ya muestra lo recibido
+                for _ in range(250):
+                    job = (await client.get(status_url)).json()["job"]
+                    if job["inserted"]:
+                        break
+                    await asyncio.sleep(0.02)
+                seen.append((job["status"], job["inserted"]))
+                yield (json.dumps(card(3)) + "\n").encode()
+
+            response = await client.put(status_url, content=body(), headers=NDJSON)
+            assert response.status_code == 202
+            for _ in range(250):
+                job = (await client.get(status_url)).json()["job"]
+                if job["status"] != "running":
+                    return job
+                await asyncio.sleep(0.02)
+
+    job = asyncio.run(scenario())
+    status, inserted = seen[0]
+    assert status == "running" and inserted >= 1
+    assert (job["status"], job["received"], job["inserted"]) == ("done", 4, 4)
+
+
+class _BrokenCards:
+    """Colección cuyo insert_many falla como una conexión perdida"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def insert_many(self, docs, ordered=False):
+        self.calls += 1
+        raise ConnectionError("conexión con Mongo perdida")
+
+
+def test_insert_failure_stops_the_reader_and_fails_the_job(api_db, monkeypatch):
+    monkeypatch.setattr(card_import, "IMPORT_CHUNK_SIZE", 1)
+    jobs = api_db[IMPORTS_COLLECTION]
+    cards = _BrokenCards()
+    done = []
+
+    async def body():
+        # Muchos más bloques de los que caben en la cola: antes el lector se quedaba bloqueado
+        for n in range(50):
+            yield (json.dumps(card(n)) + "\n").encode()
+
+    async def scenario():
+        job = await create_import_job(jobs, "ana")
+        writer = await asyncio.wait_for(
+            run_ndjson_import(body(), cards, jobs, job["_id"], build_doc=lambda c: c.model_dump(),
+                              on_done=lambda: done.append(True)),
+            timeout=5,
+        )
+        await writer
+        return await jobs.find_one({"_id": job["_id"]})
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed"
+    assert "conexión con Mongo perdida" in job["detail"]
+    assert cards.calls == 1 and done == [True]
@@ -0,0 +1,64 @@
+"""Tests for the $facet card statistics (utils.mongo and the stats routes)."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mongomock_motor")
+
+from routes.memory_cards import router  # noqa: E402
+from utils.mongo import aggregate_card_stats, card_stats_pipeline  # noqa: E402
+
+CARDS = [
+    {"_id": "c1", "created_by": "ana", "box": 1, "category": "Incendios", "difficulty": "easy",
+     "times_reviewed": 4, "times_correct": 3},
+    {"_id": "c2", "created_by": "ana", "box": 3, "category": "Incendios", "difficulty": "hard",
+     "times_reviewed": 2, "times_correct": 1},
+    # Sin box/categoría/dificultad ni contadores: valores por defecto
+    {"_id": "c3", "created_by": "ana", "question": "q", "answer": "a"},
+    {"_id": "x1", "created_by": "otro", "box": 5, "category": "Rescate", "difficulty": "medium",
+     "times_reviewed": 10, "times_correct": 10},
+]
+
+
+@pytest.fixture
+def cards(api_db):
+    asyncio.run(api_db["memory_cards"].insert_many([dict(c) for c in CARDS]))
+    return api_db["memory_cards"]
+
+
+def test_pipeline_only_projects_the_counted_fields():
+    pipeline = card_stats_pipeline({"created_by": "ana"})
+    assert pipeline[0] == {"$match": {"created_by": "ana"}}
+    assert set(pipeline[1]["$project"]) == {"box", "category", "difficulty", "times_reviewed", "times_correct"}
+    assert set(pipeline[2]["$facet"]) == {"totals", "by_box", "by_category", "by_difficulty"}
+
+
+def test_aggregate_card_stats_for_one_user(cards):
+    stats = asyncio.run(aggregate_card_stats(cards, {"created_by": "ana"}))
+    assert stats == {
+        "total": 3,
+        "total_reviews": 6,
+        "total_correct": 4,
+        "by_box": {"1": 2, "3": 1},
+        "by_category": {"Incendios": 2, "General": 1},
+        "by_difficulty": {"easy": 1, "hard": 1, "medium": 1},
+    }
+
+
+def test_aggregate_card_stats_on_empty_collection(api_db):
+    stats = asyncio.run(aggregate_card_stats(api_db["memory_cards"], {"created_by": "nadie"}))
+    assert stats == {"total": 0, "total_reviews": 0, "total_correct": 0,
+                     "by_box": {}, "by_category": {}, "by_difficulty": {}}
+
+
+def test_stats_route_is_scoped_to_the_user(make_client, cards):
+    body = make_client(router).get("/api/memory-cards/stats").json()
+    assert body["stats"]["total_cards"] == 3
+    assert body["stats"]["accuracy_rate"] == round(4 / 6 * 100, 2)
+
+    admin = make_client(router, user={"username": "root", "role": "admin", "user_id": "u0"})
+    stats = admin.get("/api/memory-cards/stats").json()["stats"]
+    assert stats["total_cards"] == 4 and stats["by_box"]["5"] == 1
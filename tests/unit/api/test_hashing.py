@@ -0,0 +1,100 @@
+"""Tests for the bounded bcrypt executor and its 503 path on the login routes."""
+
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("bcrypt")
+pytest.importorskip("mongomock_motor")
+
+from utils.hashing import HashingBusyError, PasswordHasher  # noqa: E402
+
+USER = {"_id": "u1", "username": "ana", "email": "ana@example.com", "password_hash": "$2b$12$x",
+        "status": "active", "role": "user"}
+
+
+def test_hash_and_verify_run_off_the_event_loop():
+    hasher = PasswordHasher(concurrency=2, queue_limit=2)
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        threads = []
+        original = hasher._run
+
+        def spy(fn, enqueued_at, *args):
+            threads.append(threading.get_ident())
+            return original(fn, enqueued_at, *args)
+
+        hasher._run = spy
+        pwd_hash = await hasher.hash("secreto-123")
+        assert await hasher.verify("secreto-123", pwd_hash)
+        assert not await hasher.verify("otra", pwd_hash)
+        return loop_thread, threads
+
+    loop_thread, threads = asyncio.run(scenario())
+    assert len(threads) == 3 and loop_thread not in threads
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+
+def test_full_queue_rejects_with_busy_error():
+    hasher = PasswordHasher(concurrency=1, queue_limit=1)
+    release = threading.Event()
+
+    def slow(_):
+        release.wait(5)
+        return "hash"
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher._submit(slow, "a"))
+        second = asyncio.ensure_future(hasher._submit(slow, "b"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HashingBusyError):
+            await hasher._submit(slow, "c")
+        release.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == ["hash", "hash"]
+    stats = hasher.stats()
+    assert (stats["rejected"], stats["completed"], stats["queued"], stats["running"]) == (1, 2, 0, 0)
+    hasher.shutdown()
+
+
+@pytest.fixture
+def busy(api_db, monkeypatch):
+    """Usuario existente y executor de hashing saturado"""
+    asyncio.run(api_db["users"].insert_one(dict(USER)))
+
+    async def saturated(*args):
+        raise HashingBusyError("Demasiadas operaciones de contraseña en curso")
+
+    return saturated
+
+
+def _assert_busy(response):
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["detail"] == "Servidor ocupado, reintente en unos segundos"
+
+
+def test_auth_router_login_returns_503_when_busy(make_client, busy, monkeypatch):
+    import routes.auth as auth_routes
+
+    monkeypatch.setattr(auth_routes, "verify_password_async", busy)
+    client = make_client(auth_routes.router)
+    _assert_busy(client.post("/api/login", json={"username": "ana", "password": "secreto-123"}))
+
+
+def test_compat_login_returns_503_when_busy(busy, monkeypatch):
+    pytest.importorskip("uvicorn")
+    pytest.importorskip("dotenv")
+    from fastapi.testclient import TestClient
+
+    import api
+
+    monkeypatch.setattr(api, "verify_password_async", busy)
+    client = TestClient(api.app)
+    _assert_busy(client.post("/api/login", json={"username": "ana", "password": "secreto-123"}))
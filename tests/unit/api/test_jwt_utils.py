@@ -0,0 +1,57 @@
+"""Tests for the JWT verifier and the legacy-secret fallback."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+jwt = pytest.importorskip("jwt")
+
+from utils.jwt_utils import JWTVerifier, legacy_secrets  # noqa: E402
+
+STRONG = "s3cr3t-largo-y-aleatorio-de-produccion"
+PUBLIC_DEFAULTS = ["firefighter-super-secret-jwt-key-2024", "firefighter-secret-key-2024"]
+
+
+def token(key, **claims):
+    payload = {"username": "ana", "exp": datetime.utcnow() + timedelta(minutes=5), **claims}
+    return jwt.encode(payload, key, algorithm="HS256")
+
+
+def test_legacy_secrets_are_off_by_default():
+    assert legacy_secrets({"JWT_SECRET": "viejo", "SECRET_KEY": "otro"}, primary=STRONG) == []
+
+
+def test_legacy_secrets_only_include_values_set_in_the_environment():
+    env = {"JWT_ACCEPT_LEGACY_SECRETS": "true", "SECRET_KEY": "viejo"}
+    assert legacy_secrets(env, primary=STRONG) == ["viejo"]
+    assert legacy_secrets({"JWT_ACCEPT_LEGACY_SECRETS": "true"}, primary=STRONG) == []
+
+
+def test_legacy_secrets_exclude_primary_and_public_defaults():
+    env = {"JWT_ACCEPT_LEGACY_SECRETS": "true", "JWT_SECRET": STRONG, "SECRET_KEY": PUBLIC_DEFAULTS[1]}
+    assert legacy_secrets(env, primary=STRONG) == []
+
+
+@pytest.mark.parametrize("env", [
+    {},
+    {"JWT_ACCEPT_LEGACY_SECRETS": "true"},
+    {"JWT_ACCEPT_LEGACY_SECRETS": "true", "JWT_SECRET": PUBLIC_DEFAULTS[0], "SECRET_KEY": PUBLIC_DEFAULTS[1]},
+])
+@pytest.mark.parametrize("forged_with", PUBLIC_DEFAULTS)
+def test_token_signed_with_default_key_is_rejected(env, forged_with):
+    verifier = JWTVerifier(STRONG, legacy_secrets(env, primary=STRONG))
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.decode(token(forged_with, role="admin"))
+
+
+def test_enabled_legacy_secret_still_verifies_old_sessions():
+    env = {"JWT_ACCEPT_LEGACY_SECRETS": "true", "SECRET_KEY": "viejo"}
+    verifier = JWTVerifier(STRONG, legacy_secrets(env, primary=STRONG))
+    assert verifier.decode(token("viejo"))["username"] == "ana"
+    assert verifier.decode(token(STRONG))["username"] == "ana"
+
+
+def test_expired_token_is_not_retried_with_other_keys():
+    verifier = JWTVerifier(STRONG)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.decode(token(STRONG, exp=datetime.utcnow() - timedelta(minutes=1)))
@@ -0,0 +1,104 @@
+"""Route tests for GET /api/memory-cards/changes (multi-page change feed)."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mongomock_motor")
+
+from bson import ObjectId  # noqa: E402
+from routes.memory_cards import router  # noqa: E402
+from utils.mongo import TOMBSTONES_COLLECTION  # noqa: E402
+
+BASE = datetime.utcnow() - timedelta(hours=1)
+
+
+@pytest.fixture
+def feed(api_db):
+    """Cambios intercalados: c1, d1(borrado), c2, c3, d2 — y una carta de otro usuario"""
+    import asyncio
+
+    async def seed():
+        await api_db["memory_cards"].insert_many([
+            {"_id": "c1", "question": "q1", "answer": "a1", "created_by": "ana",
+             "created_at": BASE, "updated_at": None},
+            {"_id": "c2", "question": "q2", "answer": "a2", "created_by": "ana",
+             "created_at": BASE, "updated_at": BASE + timedelta(minutes=3)},
+            {"_id": "c3", "question": "q3", "answer": "a3", "created_by": "ana",
+             "created_at": BASE + timedelta(minutes=4), "updated_at": None},
+            {"_id": "x1", "question": "ajena", "answer": "-", "created_by": "otro",
+             "created_at": BASE, "updated_at": None},
+        ])
+        await api_db[TOMBSTONES_COLLECTION].insert_many([
+            {"_id": "d1", "created_by": "ana", "deleted_at": BASE + timedelta(minutes=2)},
+            {"_id": "d2", "created_by": "ana", "deleted_at": BASE + timedelta(minutes=5)},
+        ])
+
+    asyncio.run(seed())
+
+
+def drain(client, params):
+    """Recorrer el feed página a página; devuelve (páginas, upserts, deletes)"""
+    pages, upserts, deletes, since = [], [], [], None
+    for _ in range(10):
+        response = client.get("/api/memory-cards/changes", params={**params, **({"since": since} if since else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append(body)
+        upserts += body["upserts"]
+        deletes += [d["id"] for d in body["deletes"]]
+        since = body["next"]
+        if not body["has_more"]:
+            return pages, upserts, deletes
+    pytest.fail("el feed no termina (el token vuelve al principio)")
+
+
+@pytest.mark.parametrize("fields", [None, "question"])
+def test_multi_page_feed_mixing_upserts_and_tombstones(make_client, feed, fields):
+    client = make_client(router)
+    params = {"limit": 2, **({"fields": fields} if fields else {})}
+    pages, upserts, deletes = drain(client, params)
+
+    assert len(pages) == 3
+    # Página 2 termina en un upsert (c3): antes daba 500 por el _id ya quitado
+    assert [u["id"] for u in pages[1]["upserts"]] == ["c2", "c3"]
+    assert [u["id"] for u in upserts] == ["c1", "c2", "c3"]
+    assert deletes == ["d1", "d2"]
+    if fields:
+        assert all(set(u) == {"id", "question"} for u in upserts)
+    else:
+        assert upserts[0]["answer"] == "a1" and "changed_at" in upserts[0]
+
+
+def test_caught_up_token_returns_no_repeats(make_client, feed):
+    client = make_client(router)
+    _, _, _ = drain(client, {"limit": 500, "fields": "question"})
+    first = client.get("/api/memory-cards/changes", params={"limit": 500}).json()
+    again = client.get("/api/memory-cards/changes", params={"since": first["next"]}).json()
+    assert again["upserts"] == [] and again["deletes"] == [] and not again["has_more"]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_batch_review_ties_over_mixed_id_types_reach_the_replica(make_client, api_db, limit):
+    import asyncio
+
+    reviewed = BASE + timedelta(minutes=1)
+    legacy = [ObjectId() for _ in range(3)]
+    ids = ["s2", legacy[1], "s1", legacy[0]]
+
+    async def seed():
+        # Una revisión por lotes: mismo updated_at en cartas nuevas y antiguas
+        await api_db["memory_cards"].insert_many([
+            {"_id": card_id, "question": "q", "answer": "a", "created_by": "ana",
+             "created_at": BASE, "updated_at": reviewed} for card_id in ids
+        ])
+        await api_db[TOMBSTONES_COLLECTION].insert_one(
+            {"_id": legacy[2], "created_by": "ana", "deleted_at": reviewed})
+
+    asyncio.run(seed())
+    _, upserts, deletes = drain(make_client(router), {"limit": limit, "fields": "question"})
+
+    assert [u["id"] for u in upserts] == ["s1", "s2", str(legacy[0]), str(legacy[1])]
+    assert deletes == [str(legacy[2])]
@@ -0,0 +1,103 @@
+"""Tests for keyset pagination and field projection on GET /api/memory-cards."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mongomock_motor")
+
+from bson import ObjectId  # noqa: E402
+from routes.memory_cards import router  # noqa: E402
+from utils.mongo import cursor_filter, decode_cursor, encode_cursor  # noqa: E402
+
+BASE = datetime(2026, 1, 1, 12, 0, 0, 123000)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"_id": "c7", "created_at": BASE, "question": "no se incluye"})
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (BASE, "c7")
+    assert decode_cursor(encode_cursor({"_id": "c8"})) == (None, "c8")
+    oid = ObjectId()
+    assert decode_cursor(encode_cursor({"_id": oid, "created_at": BASE})) == (BASE, oid)
+    # Un ObjectId escrito como string sigue siendo un string
+    assert decode_cursor(encode_cursor({"_id": str(oid)})) == (None, str(oid))
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "bm8tanNvbg", encode_cursor({"_id": "x"})[:-3]])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_filter_breaks_ties_on_id():
+    assert cursor_filter(encode_cursor({"_id": "c2", "created_at": BASE})) == {"$or": [
+        {"created_at": {"$gt": BASE}},
+        {"created_at": BASE, "$or": [{"_id": {"$gt": "c2"}}, {"_id": {"$type": "objectId"}}]},
+    ]}
+    oid = ObjectId()
+    assert cursor_filter(encode_cursor({"_id": oid, "created_at": BASE})) == {"$or": [
+        {"created_at": {"$gt": BASE}},
+        {"created_at": BASE, "_id": {"$gt": oid}},
+    ]}
+
+
+@pytest.fixture
+def cards(api_db):
+    docs = [
+        # Cinco cartas con el mismo created_at (import masivo) y una sin fecha
+        *({"_id": f"c{n}", "question": f"q{n}", "answer": f"a{n}", "created_by": "ana",
+           "created_at": BASE} for n in (3, 1, 5, 2, 4)),
+        {"_id": "c0", "question": "q0", "answer": "a0", "created_by": "ana", "created_at": None},
+        {"_id": "c6", "question": "q6", "answer": "a6", "created_by": "ana", "created_at": BASE + timedelta(seconds=1)},
+        {"_id": "x1", "question": "ajena", "answer": "-", "created_by": "otro", "created_at": BASE},
+    ]
+    asyncio.run(api_db["memory_cards"].insert_many(docs))
+
+
+def pages(client, **params):
+    result, cursor = [], None
+    for _ in range(20):
+        response = client.get("/api/memory-cards", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        result.append([card["id"] for card in body["cards"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return result
+    pytest.fail("la paginación no termina")
+
+
+def test_pages_with_equal_timestamps_do_not_repeat_or_skip(make_client, cards):
+    result = pages(make_client(router), limit=2)
+    assert result == [["c0", "c1"], ["c2", "c3"], ["c4", "c5"], ["c6"]]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4])
+def test_pages_over_mixed_string_and_object_ids(make_client, api_db, limit):
+    legacy = [ObjectId() for _ in range(4)]
+    # Cartas nuevas (_id string) y antiguas (ObjectId) con el mismo created_at, también None
+    ids = {None: ["n2", legacy[1], "n1", legacy[0]], BASE: ["s2", legacy[3], "s1", legacy[2]]}
+    docs = [{"_id": _id, "question": "q", "answer": "a", "created_by": "ana", "created_at": created_at}
+            for created_at, group in ids.items() for _id in group]
+    asyncio.run(api_db["memory_cards"].insert_many(docs))
+
+    seen = [card_id for page in pages(make_client(router), limit=limit) for card_id in page]
+    # Orden BSON: dentro de cada created_at, primero los strings y después los ObjectId
+    expected = sorted(docs, key=lambda d: (d["created_at"] is not None, isinstance(d["_id"], ObjectId), d["_id"]))
+    assert seen == [str(d["_id"]) for d in expected]
+
+
+def test_projection_keeps_only_requested_fields(make_client, cards):
+    body = make_client(router).get("/api/memory-cards", params={"limit": 3, "fields": "question"}).json()
+    assert [set(card) for card in body["cards"]] == [{"id", "question"}] * 3
+    assert body["next_cursor"] is not None
+
+
+def test_bad_cursor_and_unknown_fields_are_400(make_client, cards):
+    client = make_client(router)
+    assert client.get("/api/memory-cards", params={"cursor": "%%%"}).status_code == 400
+    assert client.get("/api/memory-cards", params={"fields": "question,password"}).status_code == 400
@@ -0,0 +1,78 @@
+"""Route-cache invalidation on memory card writes (only when the write hit a card)."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mongomock_motor")
+
+import routes.memory_cards as memory_cards_routes  # noqa: E402
+from database import Database  # noqa: E402
+from routes.memory_cards import router  # noqa: E402
+
+
+@pytest.fixture
+def cards(api_db):
+    asyncio.run(api_db["memory_cards"].insert_one(
+        {"_id": "c1", "question": "q1", "answer": "a1", "created_by": "ana", "box": 1, "category": "General"}
+    ))
+    return api_db["memory_cards"]
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+    original = memory_cards_routes.async_invalidate_user_routes
+
+    async def spy(*usernames):
+        calls.append(usernames)
+        await original(*usernames)
+
+    monkeypatch.setattr(memory_cards_routes, "async_invalidate_user_routes", spy)
+    return calls
+
+
+class _RacingCollection:
+    """La carta se borra entre el find_one de la ruta y su escritura"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one(self, *args, **kwargs):
+        card = await self.collection.find_one(*args, **kwargs)
+        await self.collection.delete_many({})
+        return card
+
+
+def test_update_invalidates_cached_stats(make_client, cards, invalidations):
+    client = make_client(router)
+    assert client.get("/api/memory-cards/stats").json()["stats"]["by_category"] == {"General": 1}
+
+    assert client.put("/api/memory-cards/c1", json={"category": "Rescate"}).status_code == 200
+    assert invalidations == [("ana",)]
+    assert client.get("/api/memory-cards/stats").json()["stats"]["by_category"] == {"Rescate": 1}
+
+
+@pytest.mark.parametrize("method, body, status", [("put", {"category": "Rescate"}, 200), ("delete", None, 404)])
+def test_write_that_matched_nothing_does_not_invalidate(make_client, cards, invalidations, monkeypatch,
+                                                        method, body, status):
+    monkeypatch.setattr(Database, "memory_cards", _RacingCollection(cards))
+    client = make_client(router)
+    kwargs = {"json": body} if body is not None else {}
+    response = getattr(client, method)("/api/memory-cards/c1", **kwargs)
+    assert response.status_code == status
+    assert invalidations == []
+
+
+def test_batch_without_applied_reviews_does_not_invalidate(make_client, cards, invalidations):
+    client = make_client(router)
+    body = client.post("/api/memory-cards/reviews:batch", json={"reviews": [{"card_id": "nada", "correct": True}]}).json()
+    assert body["applied"] == 0 and invalidations == []
+
+    client.post("/api/memory-cards/reviews:batch", json={"reviews": [{"card_id": "c1", "correct": True}]})
+    assert invalidations == [("ana",)]
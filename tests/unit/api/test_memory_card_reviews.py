@@ -0,0 +1,72 @@
+"""Route tests for POST /api/memory-cards/reviews:batch."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("mongomock_motor")
+
+from bson import ObjectId  # noqa: E402
+from routes.memory_cards import router  # noqa: E402
+
+LEGACY = ObjectId()
+
+
+@pytest.fixture
+def cards(api_db):
+    async def seed():
+        await api_db["memory_cards"].insert_many([
+            {"_id": "c1", "question": "q1", "answer": "a1", "created_by": "ana", "box": 1},
+            {"_id": LEGACY, "question": "q2", "answer": "a2", "created_by": "ana", "box": 2},
+            {"_id": "x1", "question": "ajena", "answer": "-", "created_by": "otro", "box": 1},
+        ])
+
+    asyncio.run(seed())
+    return api_db["memory_cards"]
+
+
+def find(cards, card_id):
+    return asyncio.run(cards.find_one({"_id": card_id}))
+
+
+def test_mixed_batch_with_legacy_object_ids(make_client, cards):
+    client = make_client(router)
+    response = client.post("/api/memory-cards/reviews:batch", json={"reviews": [
+        {"card_id": "c1", "correct": True},
+        {"card_id": str(LEGACY), "correct": True},
+        {"card_id": "no-existe", "correct": True},
+        {"card_id": "x1", "correct": True},
+    ]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert body["applied"] == 2
+    results = {r["card_id"]: r for r in body["results"]}
+    assert results["c1"]["ok"] and results["c1"]["new_box"] == 2
+    assert results[str(LEGACY)]["ok"] and results[str(LEGACY)]["new_box"] == 3
+    assert results["no-existe"] == {"card_id": "no-existe", "ok": False, "detail": "Card no encontrado"}
+    assert results["x1"]["detail"] == "Acceso denegado"
+
+    legacy = find(cards, LEGACY)
+    assert (legacy["box"], legacy["times_reviewed"], legacy["times_correct"]) == (3, 1, 1)
+    assert find(cards, "x1")["box"] == 1
+
+
+def test_repeated_reviews_are_applied_in_answer_order(make_client, cards):
+    client = make_client(router)
+    start = (datetime.utcnow() - timedelta(minutes=10)).replace(microsecond=0)
+    response = client.post("/api/memory-cards/reviews:batch", json={"reviews": [
+        # Llegan desordenadas: se aplican por reviewed_at (fallo, acierto, acierto)
+        {"card_id": "c1", "correct": True, "reviewed_at": (start + timedelta(minutes=2)).isoformat()},
+        {"card_id": "c1", "correct": False, "reviewed_at": start.isoformat()},
+        {"card_id": "c1", "correct": True, "reviewed_at": (start + timedelta(minutes=1)).isoformat()},
+    ]})
+    result = response.json()["results"][0]
+    assert (result["new_box"], result["reviews"]) == (3, 3)
+
+    stored = find(cards, "c1")
+    assert (stored["times_reviewed"], stored["times_correct"], stored["times_incorrect"]) == (3, 2, 1)
+    assert stored["last_reviewed"] == start + timedelta(minutes=2)
@@ -0,0 +1,189 @@
+"""Tests for the cached principal behind require_user and the admin-only stats routes."""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("jwt")
+pytest.importorskip("mongomock_motor")
+pytest.importorskip("psutil")
+
+import utils.principal_cache as principal_cache  # noqa: E402
+from database import Database  # noqa: E402
+from dependencies.auth import resolve_principal  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from utils.jwt_utils import make_jwt  # noqa: E402
+from utils.principal_cache import invalidate_principal  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_principals(monkeypatch):
+    cache = principal_cache.SimpleMemoryCache(default_ttl=30, max_size=100)
+    monkeypatch.setattr(principal_cache, "_principals", cache)
+    yield cache
+    cache.stop()
+
+
+class _CountingCollection:
+    """Envoltorio que cuenta los find_one sobre la colección real"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = 0
+
+    async def find_one(self, *args, **kwargs):
+        self.calls += 1
+        return await self.collection.find_one(*args, **kwargs)
+
+
+@pytest.fixture
+def users(api_db, monkeypatch):
+    asyncio.run(api_db["users"].insert_one({"_id": "u1", "username": "ana", "role": "user", "status": "active"}))
+    counting = _CountingCollection(api_db["users"])
+    monkeypatch.setattr(Database, "users", counting)
+    return counting
+
+
+def test_second_request_is_served_from_the_cache(users):
+    token = make_jwt({"username": "ana"})
+    first = asyncio.run(resolve_principal(token))
+    second = asyncio.run(resolve_principal(token))
+    assert first == second == {"username": "ana", "role": "user", "user_id": "u1"}
+    assert users.calls == 1
+
+
+def test_invalidation_forces_a_fresh_lookup(users):
+    token = make_jwt({"username": "ana"})
+    asyncio.run(resolve_principal(token))
+    time.sleep(0.01)
+
+    # Cambio de rol + invalidación: la siguiente petición ve el rol nuevo
+    asyncio.run(users.collection.update_one({"_id": "u1"}, {"$set": {"role": "admin"}}))
+    invalidate_principal("ana")
+    assert asyncio.run(resolve_principal(token))["role"] == "admin"
+    assert users.calls == 2
+
+
+def test_deactivated_user_is_rejected_after_invalidation(users):
+    token = make_jwt({"username": "ana"})
+    asyncio.run(resolve_principal(token))
+    time.sleep(0.01)
+    asyncio.run(users.collection.update_one({"_id": "u1"}, {"$set": {"status": "disabled"}}))
+    invalidate_principal("ana")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(resolve_principal(token))
+    assert error.value.status_code == 401
+
+
+def test_entries_never_outlive_the_token(empty_principals):
+    principal = {"username": "ana", "role": "user", "user_id": "u1"}
+    principal_cache.cache_principal("t1", {"exp": time.time() - 1}, principal)
+    principal_cache.cache_principal("t2", {"jti": "j2", "exp": time.time() + 600}, principal)
+    assert principal_cache.get_principal("t1", {}) is None
+    assert principal_cache.get_principal("otro", {"jti": "j2"}) == principal
+
+
+class _PubSubRedis:
+    """Redis mínimo para TieredBackend: solo pub/sub; cualquier GET falla el test"""
+
+    def __init__(self):
+        self.inbox = []
+        self.published = []
+        self.broken = threading.Event()
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return self
+
+    def subscribe(self, channel):
+        if self.broken.is_set():
+            raise ConnectionError("Redis caído")
+
+    def get_message(self, timeout=0.0):
+        if self.broken.is_set():
+            raise ConnectionError("Redis caído")
+        if self.inbox:
+            return {"type": "message", "data": self.inbox.pop(0)}
+        time.sleep(min(timeout, 0.01))
+        return None
+
+    def close(self):
+        pass
+
+    def publish(self, channel, message):
+        self.published.append(json.loads(message))
+
+    def pipeline(self):
+        raise AssertionError("un acierto del cache de principales no debe ir a Redis")
+
+    get = pipeline
+
+
+def wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def tiered(route_cache):
+    import firefighter_cache
+
+    client = _PubSubRedis()
+    backend = firefighter_cache.TieredBackend(client, default_ttl=60)
+    firefighter_cache.set_backend(backend)
+    assert wait_until(lambda: backend.events_since() < float("inf"))
+    yield backend, client
+    backend.close()
+    firefighter_cache.set_backend(route_cache)
+
+
+PRINCIPAL = {"username": "ana", "role": "user", "user_id": "u1"}
+
+
+def test_tiered_hit_is_served_in_process_and_revoked_by_other_workers(tiered):
+    backend, client = tiered
+    principal_cache.cache_principal("t", {"jti": "j1"}, PRINCIPAL)
+    assert principal_cache.get_principal("t", {"jti": "j1"}) == PRINCIPAL
+
+    # Revocación publicada por otro worker: llega por el canal, sin consultar Redis
+    client.inbox.append(json.dumps({"origin": "otro", "op": "event",
+                                    "topic": principal_cache.REVOKED_EVENT, "payload": ["ana"]}))
+    assert wait_until(lambda: principal_cache.get_principal("t", {"jti": "j1"}) is None)
+
+
+def test_tiered_invalidation_is_published_and_applied_locally(tiered):
+    backend, client = tiered
+    principal_cache.cache_principal("t", {"jti": "j1"}, PRINCIPAL)
+    time.sleep(0.01)
+    invalidate_principal("ana", None)
+    assert principal_cache.get_principal("t", {"jti": "j1"}) is None
+    assert client.published[-1]["op"] == "event" and client.published[-1]["payload"] == ["ana"]
+
+
+def test_tiered_outage_counts_as_revoked(tiered):
+    backend, client = tiered
+    principal_cache.cache_principal("t", {"jti": "j1"}, PRINCIPAL)
+    client.broken.set()
+    assert wait_until(lambda: backend.events_since() == float("inf"))
+    # Sin suscripción las revocaciones se pierden: nada de lo cacheado vale
+    assert principal_cache.get_principal("t", {"jti": "j1"}) is None
+    principal_cache.cache_principal("t", {"jti": "j1"}, PRINCIPAL)
+    assert principal_cache.get_principal("t", {"jti": "j1"}) is None
+
+
+@pytest.mark.parametrize("path", ["/api/cache/stats", "/api/hashing/stats"])
+def test_stats_routes_require_admin(make_client, path):
+    from routes.health import router
+
+    assert make_client(router).get(path).status_code == 403
+    admin = make_client(router, user={"username": "root", "role": "admin", "user_id": "u0"})
+    response = admin.get(path)
+    assert response.status_code == 200 and response.json()["ok"]
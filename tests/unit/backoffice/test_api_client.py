@@ -0,0 +1,165 @@
+"""Unit tests for the shared BackOffice API client against a local origin."""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("flask")
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "BO"))
+
+from app.api_client import (  # noqa: E402
+    ApiClient, CircuitBreaker, CircuitOpenError, breaker_group, create_session, endpoint_name,
+)
+
+
+class _Api(BaseHTTPRequestHandler):
+    """API de prueba: /api/flaky falla con 503 las primeras `flaky` veces"""
+
+    protocol_version = "HTTP/1.1"
+    flaky = 0
+    hits = {}
+    peers = set()
+
+    def _reply(self, status, body=b'{"ok": true}'):
+        _Api.hits[self.path] = _Api.hits.get(self.path, 0) + 1
+        _Api.peers.add(self.client_address)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/flaky" and _Api.flaky > 0:
+            _Api.flaky -= 1
+            return self._reply(503, b'{"ok": false}')
+        if self.path == "/api/down":
+            return self._reply(500, b'{"ok": false}')
+        self._reply(200)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self._reply(503 if self.path == "/api/flaky" else 200)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    _Api.flaky, _Api.hits, _Api.peers = 0, {}, set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Api)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(base_url, retries=2, failures=3, reset=60):
+    return ApiClient(base_url=base_url, session=create_session(pool_size=4, retries=retries, backoff=0),
+                     breaker_factory=lambda: CircuitBreaker(failure_threshold=failures, reset_timeout=reset),
+                     pool_size=4)
+
+
+def test_keep_alive_reuses_one_connection(api):
+    client = make_client(api)
+    for _ in range(5):
+        assert client.list_users().json() == {"ok": True}
+    assert len(_Api.peers) == 1
+
+
+def test_idempotent_requests_are_retried_on_503(api):
+    _Api.flaky = 2
+    client = make_client(api)
+    assert client.get("/api/flaky").status_code == 200
+    assert _Api.hits["/api/flaky"] == 3
+
+
+def test_post_is_not_retried(api):
+    client = make_client(api)
+    assert client.post("/api/flaky", json={}).status_code == 503
+    assert _Api.hits["/api/flaky"] == 1
+
+
+def test_circuit_opens_after_consecutive_failures(api):
+    _Api.flaky = 10
+    client = make_client(api, retries=0, failures=2)
+    client.get("/api/flaky")
+    client.get("/api/flaky")
+    with pytest.raises(CircuitOpenError):
+        client.get("/api/flaky")
+    assert client.stats()["circuits"]["flaky"] == "open"
+    assert _Api.hits["/api/flaky"] == 2
+
+
+def test_failing_endpoint_group_leaves_the_others_working(api):
+    _Api.flaky = 10
+    client = make_client(api, retries=0, failures=2)
+    client.get("/api/flaky")
+    client.get("/api/flaky")
+    with pytest.raises(CircuitOpenError):
+        client.get("/api/flaky")
+    assert client.login({"username": "ana"}).status_code == 200
+    assert client.list_users().status_code == 200
+    assert client.stats()["circuits"]["auth"] == "closed"
+
+
+def test_application_500_does_not_open_the_circuit(api):
+    client = make_client(api, retries=0, failures=2)
+    for _ in range(5):
+        assert client.get("/api/down").status_code == 500
+    assert client.breaker_for("GET /api/down").state == "closed"
+    assert client.stats()["endpoints"]["GET /api/down"]["errors"] == 5
+
+
+def test_half_open_probe_closes_circuit_on_success(api):
+    _Api.flaky = 1
+    client = make_client(api, retries=0, failures=1, reset=0)
+    client.get("/api/flaky")
+    assert client.breaker_for("GET /api/flaky").state == "half-open"
+    assert client.get("/api/flaky").status_code == 200
+    assert client.breaker_for("GET /api/flaky").state == "closed"
+
+
+def test_connection_errors_count_as_failures():
+    client = make_client("http://127.0.0.1:9", retries=0, failures=1)
+    with pytest.raises(Exception) as first:
+        client.health(timeout=1)
+    assert not isinstance(first.value, CircuitOpenError)
+    with pytest.raises(CircuitOpenError):
+        client.health(timeout=1)
+
+
+def test_latency_metrics_group_ids_per_endpoint(api):
+    client = make_client(api)
+    client.get_user("42")
+    client.get_user("507f1f77bcf86cd799439011")
+    client.get("/api/down")
+    endpoints = client.stats()["endpoints"]
+    assert endpoints["GET /api/users/:id"]["calls"] == 2
+    assert endpoints["GET /api/down"]["errors"] == 1
+    assert endpoints["GET /api/users/:id"]["p95_ms"] >= 0
+
+
+def test_submit_runs_calls_on_the_client_pool(api):
+    client = make_client(api)
+    futures = [client.submit(client.get_memory_card, card_id) for card_id in ("1", "2", "3")]
+    assert [f.result().status_code for f in futures] == [200, 200, 200]
+
+
+def test_endpoint_name_strips_host_query_and_ids():
+    assert endpoint_name("get", "http://backend:5000/api/users/7/progress?x=1") == "GET /api/users/:id/progress"
+
+
+def test_breaker_groups_by_first_api_segment():
+    assert breaker_group("GET /api/docker/logs") == breaker_group("GET /api/docker/containers") == "docker"
+    assert breaker_group("POST /api/auth/login") == "auth"
+    assert breaker_group("GET /health") == "health"
@@ -0,0 +1,102 @@
+"""Unit tests for the concurrent source fetch behind the BackOffice dashboard."""
+
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+flask = pytest.importorskip("flask")
+pytest.importorskip("flask_login")
+pytest.importorskip("redis")
+pytest.importorskip("dotenv")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "BO"))
+
+import app.routes.dashboard as dashboard  # noqa: E402
+from app.api_client import (  # noqa: E402
+    API_FANOUT_SOURCES, API_FANOUT_WORKERS, API_POOL_SIZE, WAITRESS_THREADS, ApiClient,
+)
+from app.routes.dashboard import DASHBOARD_DEADLINES, fetch_sources  # noqa: E402
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def _slow(seconds, status=200):
+    def call():
+        time.sleep(seconds)
+        return _Response(status)
+    return call
+
+
+def _failing():
+    raise ConnectionError("API caída")
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    with flask.Flask(__name__).app_context():
+        yield
+
+
+def test_sources_run_concurrently():
+    started = time.perf_counter()
+    responses, timings = fetch_sources(
+        {"a": _slow(0.3), "b": _slow(0.3), "c": _slow(0.3)},
+        deadlines={"a": 2, "b": 2, "c": 2},
+    )
+    elapsed = time.perf_counter() - started
+    assert set(responses) == {"a", "b", "c"}
+    assert elapsed < 0.6
+    assert all(t["status"] == "ok" and t["ms"] >= 250 for t in timings["sources"].values())
+
+
+def test_slow_source_is_dropped_at_its_deadline():
+    started = time.perf_counter()
+    responses, timings = fetch_sources(
+        {"fast": _slow(0.05), "slow": _slow(2)},
+        deadlines={"fast": 1, "slow": 0.3},
+    )
+    assert time.perf_counter() - started < 1
+    assert set(responses) == {"fast"}
+    assert timings["sources"]["slow"]["status"] == "timeout"
+
+
+def test_errors_and_http_statuses_are_reported_per_source():
+    responses, timings = fetch_sources(
+        {"down": _failing, "denied": _slow(0, status=401)},
+        deadlines={"down": 1, "denied": 1},
+    )
+    assert set(responses) == {"denied"}
+    assert timings["sources"]["down"]["status"] == "error"
+    assert timings["sources"]["denied"]["status"] == "http_401"
+    assert timings["total_ms"] >= 0
+
+
+def test_queued_source_is_cancelled_at_its_deadline(monkeypatch):
+    monkeypatch.setattr(dashboard, "api_client", ApiClient(base_url="http://api", fanout_workers=1))
+    ran = []
+
+    def queued():
+        ran.append("queued")
+        return _Response(200)
+
+    responses, timings = fetch_sources(
+        {"busy": _slow(0.4), "queued": queued},
+        deadlines={"busy": 1, "queued": 0.1},
+    )
+    time.sleep(0.1)
+    assert set(responses) == {"busy"}
+    assert timings["sources"]["queued"]["status"] == "timeout"
+    assert ran == []
+
+
+def test_default_pools_cover_every_waitress_thread_fanning_out():
+    assert len(DASHBOARD_DEADLINES) <= API_FANOUT_SOURCES
+    assert API_FANOUT_WORKERS >= WAITRESS_THREADS * len(DASHBOARD_DEADLINES)
+    # Conexiones: las de los hilos de waitress más las de todo el pool de submit()
+    assert API_POOL_SIZE >= WAITRESS_THREADS + API_FANOUT_WORKERS
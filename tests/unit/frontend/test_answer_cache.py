@@ -0,0 +1,58 @@
+"""Unit tests for the FO chat answer cache keys."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+import firefighter_cache  # noqa: E402
+from answer_cache import answer_key, cached_answer, normalize_question  # noqa: E402
+from firefighter_cache import MemoryBackend  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def backend():
+    previous = firefighter_cache.get_backend()
+    yield firefighter_cache.set_backend(MemoryBackend(default_ttl=60, max_size=100))
+    firefighter_cache.set_backend(previous)
+
+
+def test_accents_case_and_punctuation_are_ignored():
+    assert normalize_question("¿Qué es el TRIÁNGULO del fuego?") == "que es el triangulo del fuego"
+    assert answer_key("ask", "¿Qué es el triángulo del fuego?") == answer_key("ask", "que es el triangulo del fuego")
+
+
+@pytest.mark.parametrize("a, b", [
+    ("¿Se apaga con agua?", "¿Se apaga sin agua?"),
+    ("¿No es esto peligroso?", "¿Es esto peligroso?"),
+    ("¿Es más peligroso el humo?", "¿Es peligroso el humo?"),
+    ("¿El agua apaga el fuego?", "¿El fuego apaga el agua?"),
+])
+def test_meaning_changes_give_different_keys(a, b):
+    assert answer_key("ask", a) != answer_key("ask", b)
+
+
+def test_short_questions_are_not_cached():
+    calls = []
+
+    @cached_answer("test")
+    def answer(question, cards=()):
+        calls.append(question)
+        return f"respuesta {len(calls)}"
+
+    # Solo stopwords / casi vacía: siempre al modelo
+    assert answer("¿Y eso?") == "respuesta 1"
+    assert answer("¿Y eso?") == "respuesta 2"
+    assert answer("¿?") == "respuesta 3"
+
+    assert answer("¿Qué es un extintor?") == "respuesta 4"
+    assert answer("que es un extintor") == "respuesta 4"
+    assert len(calls) == 4
+
+
+def test_card_changes_change_the_key():
+    card = {"_id": "c1", "front": "Clase A", "back": "Sólidos"}
+    edited = {**card, "back": "Sólidos combustibles"}
+    assert answer_key("ask", "¿Qué es la clase A?", [card]) != answer_key("ask", "¿Qué es la clase A?", [edited])
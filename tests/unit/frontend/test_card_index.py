@@ -0,0 +1,108 @@
+"""Unit tests for the FO in-memory BM25 card index."""
+
+import os
+import sys
+import time
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+from card_index import CardIndexRegistry, UserCardIndex, tokenize  # noqa: E402
+
+CARDS = [
+    {"_id": "tri", "front": "Triángulo del fuego", "back": "Combustible, oxígeno y calor", "deck": "general"},
+    {"_id": "ext", "front": "Extintor de CO2", "back": "Fuegos eléctricos; no usar en fuego de metales", "deck": "equipos"},
+    {"_id": "man", "front": "Presión en mangueras", "back": "3-5 bar según la manguera y la boquilla", "deck": "equipos"},
+    {"_id": "larga", "front": "Fuego", "back": " ".join(["texto de relleno sobre otra cosa"] * 20), "deck": "general"},
+]
+
+
+def ids(results):
+    return [r["_id"] for r in results]
+
+
+def test_tokenize_folds_accents_drops_stopwords_and_plurals():
+    assert tokenize("¿Qué presión llevan las MANGUERAS?") == ["presion", "llevan", "manguera"]
+
+
+def test_rarer_terms_and_shorter_cards_rank_higher():
+    index = UserCardIndex("ana")
+    index.load(CARDS)
+    results = index.search("fuego oxígeno")
+    # "oxigeno" solo aparece en "tri"; "fuego" en tres tarjetas, y "larga" es muy larga
+    assert ids(results)[0] == "tri"
+    assert ids(results).index("ext") < ids(results).index("larga")
+    assert all(a["score"] >= b["score"] for a, b in zip(results, results[1:]))
+    assert "_terms" not in results[0]
+
+
+def test_deck_filter_and_limit():
+    index = UserCardIndex("ana")
+    index.load(CARDS)
+    assert ids(index.search("fuego", deck="equipos")) == ["ext"]
+    assert len(index.search("fuego", limit=2)) == 2
+    assert index.search("de la y") == []
+    assert index.search("submarino") == []
+
+
+def test_upsert_and_remove_update_postings():
+    index = UserCardIndex("ana")
+    index.load(CARDS)
+    index.upsert({"_id": "man", "front": "Presión en lanzas", "back": "Depende de la boquilla", "deck": "equipos"})
+    assert index.search("manguera") == []
+    assert ids(index.search("lanzas")) == ["man"]
+
+    index.remove("tri")
+    assert "tri" not in ids(index.search("fuego oxígeno"))
+    assert "oxigeno" not in index.postings
+    assert index.total_length == sum(index.lengths.values())
+
+
+@pytest.fixture
+def cards():
+    col = mongomock.MongoClient().db.leitner_cards
+    col.insert_many([dict(card, user="ana") for card in CARDS])
+    return col
+
+
+def test_registry_builds_once_and_applies_writes_in_place(cards):
+    registry = CardIndexRegistry()
+    reads = []
+    original = cards.find
+    cards.find = lambda *a, **k: reads.append(a) or original(*a, **k)
+
+    assert ids(registry.search("ana", "oxígeno", cards)) == ["tri"]
+    registry.upsert_card("ana", {"_id": "nueva", "front": "Oxígeno en espacios confinados", "back": "Medir antes de entrar"})
+    registry.set_box("ana", "tri", 4)
+    results = registry.search("ana", "oxígeno", cards)
+    assert set(ids(results)) == {"tri", "nueva"}
+    assert next(r for r in results if r["_id"] == "tri")["box"] == 4
+
+    registry.remove_card("ana", "nueva")
+    assert ids(registry.search("ana", "oxígeno", cards)) == ["tri"]
+    assert len(reads) == 1
+
+
+def test_invalidate_rebuilds_from_mongo(cards):
+    registry = CardIndexRegistry()
+    registry.search("ana", "fuego", cards)
+    cards.insert_one({"_id": "sync", "user": "ana", "front": "Oxígeno líquido", "back": "Riesgo criogénico"})
+    registry.invalidate("ana")
+
+    # La búsqueda siguiente sirve el índice anterior y reconstruye en segundo plano
+    registry.search("ana", "oxígeno", cards)
+    index = registry._get("ana")
+    for _ in range(100):
+        if not index.rebuilding and not index.dirty:
+            break
+        time.sleep(0.01)
+    assert "sync" in ids(registry.search("ana", "oxígeno", cards))
+
+
+def test_writes_before_first_build_are_ignored(cards):
+    registry = CardIndexRegistry()
+    registry.upsert_card("ana", {"_id": "x", "front": "Oxígeno", "back": ""})
+    assert ids(registry.search("ana", "oxígeno", cards)) == ["tri"]
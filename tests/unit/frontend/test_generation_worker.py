@@ -0,0 +1,154 @@
+"""Unit tests for the FO generation worker (queue, micro-batching, deadlines, shutdown)."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+from generation_worker import (  # noqa: E402
+    GenerationBusyError,
+    GenerationTimeout,
+    GenerationUnavailable,
+    GenerationWorker,
+)
+
+
+class _FakePipe:
+    """Pipeline de transformers simulado: registra los lotes y responde en eco"""
+
+    def __init__(self, delay=0.0, gate=None):
+        self.delay = delay
+        self.gate = gate
+        self.calls = []
+
+    def __call__(self, prompts, max_new_tokens=1, **kwargs):
+        if self.gate is not None:
+            self.gate.wait(5)
+        time.sleep(self.delay)
+        self.calls.append((list(prompts), max_new_tokens, kwargs.get("batch_size")))
+        return [[{"generated_text": f" eco:{p} "}] for p in prompts]
+
+
+def make_worker(pipe, **kwargs):
+    worker = GenerationWorker(loader=lambda: pipe, **kwargs)
+    worker.start()
+    assert worker.ready.wait(5)
+    pipe.calls.clear()  # calentamiento
+    return worker
+
+
+def test_concurrent_prompts_share_one_model_call():
+    pipe = _FakePipe()
+    worker = make_worker(pipe, max_batch=8, batch_wait_ms=200)
+    futures = [worker.submit(f"p{n}", max_new_tokens=40) for n in range(5)]
+    assert [f.result(timeout=5) for f in futures] == [f"eco:p{n}" for n in range(5)]
+
+    prompts, max_new_tokens, batch_size = pipe.calls[0]
+    assert len(pipe.calls) == 1 and prompts == [f"p{n}" for n in range(5)]
+    assert max_new_tokens == 40 and batch_size == 5
+    stats = worker.stats()
+    assert (stats["batches"], stats["peak_batch"], stats["completed"]) == (1, 5, 5)
+    worker.shutdown()
+
+
+def test_each_request_keeps_its_own_token_budget():
+    pipe = _FakePipe()
+    worker = make_worker(pipe, max_batch=8, batch_wait_ms=200)
+    # /ask (120) y /generate (80) en la misma ventana
+    futures = [worker.submit(f"p{n}", max_new_tokens=120 if n % 2 else 80) for n in range(4)]
+    assert [f.result(timeout=5) for f in futures] == [f"eco:p{n}" for n in range(4)]
+
+    assert [(prompts, tokens) for prompts, tokens, _ in pipe.calls] == [
+        (["p0", "p2"], 80), (["p1", "p3"], 120),
+    ]
+    worker.shutdown()
+
+
+def test_batches_are_capped_at_max_batch():
+    pipe = _FakePipe()
+    worker = make_worker(pipe, max_batch=2, batch_wait_ms=200)
+    futures = [worker.submit(f"p{n}") for n in range(5)]
+    [f.result(timeout=5) for f in futures]
+    assert [len(call[0]) for call in pipe.calls] == [2, 2, 1]
+    worker.shutdown()
+
+
+def test_full_queue_is_rejected():
+    gate = threading.Event()
+    pipe = _FakePipe(gate=gate)
+    worker = GenerationWorker(loader=lambda: pipe, queue_limit=2, max_batch=1, batch_wait_ms=0)
+    gate.set()
+    worker.start()
+    assert worker.ready.wait(5)
+    gate.clear()
+
+    first = worker.submit("ocupa el modelo")
+    time.sleep(0.1)
+    queued = [worker.submit("a"), worker.submit("b")]
+    with pytest.raises(GenerationBusyError):
+        worker.submit("c")
+    assert worker.stats()["rejected"] == 1
+    gate.set()
+    assert [f.result(timeout=5) for f in [first, *queued]] == ["eco:ocupa el modelo", "eco:a", "eco:b"]
+    worker.shutdown()
+
+
+def test_requests_expired_in_queue_are_not_generated():
+    gate = threading.Event()
+    pipe = _FakePipe(gate=gate)
+    worker = GenerationWorker(loader=lambda: pipe, max_batch=1, batch_wait_ms=0)
+    gate.set()
+    worker.start()
+    assert worker.ready.wait(5)
+    gate.clear()
+    pipe.calls.clear()
+
+    slow = worker.submit("lenta")
+    time.sleep(0.1)
+    with pytest.raises(GenerationTimeout):
+        worker.generate("caduca", timeout=0.2)
+    gate.set()
+    assert slow.result(timeout=5) == "eco:lenta"
+    for _ in range(100):
+        if worker.stats()["expired"] or len(pipe.calls) > 1:
+            break
+        time.sleep(0.01)
+    assert [call[0] for call in pipe.calls] == [["lenta"]]
+    worker.shutdown()
+
+
+def test_without_model_requests_fail_fast():
+    worker = GenerationWorker(loader=lambda: None)
+    with pytest.raises(GenerationUnavailable):
+        worker.generate("hola", timeout=5)
+    assert not worker.stats()["loaded"]
+    worker.shutdown()
+
+
+def test_shutdown_fails_queued_requests_and_stops_the_thread():
+    gate = threading.Event()
+    pipe = _FakePipe(gate=gate)
+    worker = GenerationWorker(loader=lambda: pipe, max_batch=1, batch_wait_ms=0)
+    gate.set()
+    worker.start()
+    assert worker.ready.wait(5)
+    gate.clear()
+
+    running = worker.submit("en curso")
+    time.sleep(0.1)
+    queued = worker.submit("en cola")
+    stopper = threading.Thread(target=worker.shutdown)
+    stopper.start()
+    gate.set()
+    stopper.join(5)
+
+    assert running.result(timeout=5) == "eco:en curso"
+    with pytest.raises(GenerationUnavailable):
+        queued.result(timeout=5)
+    assert not worker._thread.is_alive()
+    with pytest.raises(GenerationUnavailable):
+        worker.submit("tarde")
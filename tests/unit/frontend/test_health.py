@@ -0,0 +1,62 @@
+"""Route tests for the FO /health readiness gate during model warm-up."""
+
+import os
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_login")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+# El health check de la API al importar main falla al instante en vez de esperar el timeout
+os.environ.setdefault("API_BASE_URL", "http://127.0.0.1:9")
+
+# main registra el blueprint leitner: sus rutas (también las de leitner_sync) han de existir antes
+import leitner_sync  # noqa: E402,F401
+import main  # noqa: E402
+from generation_worker import GenerationWorker  # noqa: E402
+
+
+@pytest.fixture
+def loading_worker(monkeypatch):
+    """Worker cuyo modelo no termina de cargar hasta que se abre `release`"""
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        return lambda prompts, **kwargs: [[{"generated_text": "ok"}] for _ in prompts]
+
+    worker = GenerationWorker(loader=loader)
+    monkeypatch.setattr(main, "generation_worker", worker)
+    worker.start()
+    yield worker, release
+    release.set()
+    worker.shutdown()
+
+
+def test_health_is_503_until_warm_up_finishes(monkeypatch, loading_worker):
+    worker, release = loading_worker
+    monkeypatch.setattr(main, "GEN_PRELOAD", True)
+    client = main.app.test_client()
+
+    starting = client.get("/health")
+    assert starting.status_code == 503
+    assert starting.get_json()["status"] == "starting"
+
+    release.set()
+    assert worker.ready.wait(5)
+    ready = client.get("/health")
+    assert ready.status_code == 200
+    assert ready.get_json()["generation"]["ready"] is True
+
+
+def test_health_without_preload_does_not_wait_for_the_model(monkeypatch, loading_worker):
+    monkeypatch.setattr(main, "GEN_PRELOAD", False)
+    response = main.app.test_client().get("/health")
+    assert response.status_code == 200
+    assert response.get_json()["model_loaded"] is False
@@ -0,0 +1,71 @@
+"""Golden-file tests for the FO proxy HTML rewriter.
+
+Each page in fixtures/proxy_pages/input is rewritten and compared with the
+file of the same name in fixtures/proxy_pages/expected. After an intended
+change in the rewrite rules, regenerate the expected files with:
+
+    UPDATE_GOLDEN=1 python -m pytest tests/unit/frontend/test_html_rewriter.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+from html_rewriter import BYPASS_JS, get_rewriter, rewrite_html  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "proxy_pages")
+ORIGINS = {
+    "onfire": ("www.onfireacademy.es", "/onfire-academy/"),
+    "formacion": ("www.formacioncertificadoprofesional.com", "/formacion-certificada/"),
+    "fragment": ("www.onfireacademy.es", "/onfire-academy/"),
+}
+PAGES = sorted(os.listdir(os.path.join(FIXTURES, "input")))
+
+
+def origin_for(page):
+    return ORIGINS[page.split("_", 1)[0]]
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_rewrite_matches_golden_file(page):
+    with open(os.path.join(FIXTURES, "input", page), encoding="utf-8") as f:
+        html = f.read()
+    rewritten = rewrite_html(html, *origin_for(page))
+
+    expected_path = os.path.join(FIXTURES, "expected", page)
+    if os.getenv("UPDATE_GOLDEN"):
+        with open(expected_path, "w", encoding="utf-8") as f:
+            f.write(rewritten)
+    with open(expected_path, encoding="utf-8") as f:
+        assert rewritten == f.read()
+
+
+def test_restrictive_meta_removed_and_headers_neutralized():
+    html = ('<head><META HTTP-EQUIV="X-Frame-Options" content="DENY">'
+            '<meta name="description" content="SAMEORIGIN frame-ancestors"></head>')
+    out = rewrite_html(html, "www.onfireacademy.es", "/onfire-academy/")
+    assert "HTTP-EQUIV" not in out
+    assert '<meta name="description" content="ALLOWALL frame-ancestors-disabled">' in out
+    assert out.count(BYPASS_JS) == 1 and out.endswith(BYPASS_JS + "</head>")
+
+
+def test_asset_paths_and_absolute_domain_urls():
+    html = ("<link href='css/a.css?v=1'><script src=\"/js/app.js\"></script>"
+            '<img src="img/x.png"><a href="https://www.onfireacademy.es/p.html">p</a>'
+            '<script src="https://www.onfireacademy.es/js/b.js"></script><script src="data.json"></script>')
+    out, paths = get_rewriter("www.onfireacademy.es", "/onfire-academy/").rewrite(html)
+    assert paths == 3
+    assert 'href="/onfire-academy/css/a.css?v=1"' in out
+    assert 'src="/onfire-academy/js/app.js"' in out
+    assert 'src="/onfire-academy/img/x.png"' in out
+    assert 'href="/onfire-academy/p.html"' in out
+    assert 'src="/onfire-academy/js/b.js"' in out
+    assert 'src="data.json"' in out
+
+
+def test_page_without_head_gets_script_prepended():
+    out = rewrite_html("<p>hola</p>", "www.onfireacademy.es", "/onfire-academy/")
+    assert out == BYPASS_JS + "<p>hola</p>"
@@ -0,0 +1,138 @@
+"""Unit tests for the chat keyword matcher and topic selection."""
+
+import itertools
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+from chat_model import KNOWLEDGE_PATHS, FirefighterChatModel  # noqa: E402
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+
+def test_overlapping_keywords_are_all_found():
+    matcher = KeywordMatcher(["fuego", "fuego electrico", "electric", "ego"])
+    assert matcher.find("Un fuego eléctrico") == {"fuego", "fuego electrico", "electric"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("¿Qué es un disparo?", set()),          # "paro" dentro de otra palabra
+    ("Paro cardíaco", {"paro"}),
+    ("(paro)", {"paro"}),
+    ("paros", {"paro"}),                    # prefijo de palabra: plurales y derivados
+    ("EXTINTOR de CO2", {"extintor"}),
+])
+def test_keywords_must_start_a_word(text, expected):
+    assert KeywordMatcher(["paro", "extintor"]).find(text) == expected
+
+
+def test_empty_keywords_and_text():
+    matcher = KeywordMatcher(["", "  "])
+    assert len(matcher) == 0 and matcher.find("lo que sea") == set()
+    assert KeywordMatcher(["fuego"]).find("") == set()
+
+
+def write_topics(tmp_path, name, topics, default=None):
+    path = tmp_path / name
+    path.write_text(json.dumps({"default": default, "topics": topics}), encoding="utf-8")
+    return str(path)
+
+
+def test_heaviest_topic_wins_and_file_order_breaks_ties(tmp_path):
+    path = write_topics(tmp_path, "kb.json", [
+        {"id": "a", "answer": "A", "keywords": {"fuego": 1, "humo": 1}},
+        {"id": "b", "answer": "B", "keywords": {"fuego": 1}},
+        {"id": "c", "answer": "C", "keywords": {"electric": 3, "fuego": 1}},
+    ], default="por defecto")
+    model = FirefighterChatModel(paths=[path])
+    assert model.best_topic("fuego y humo") == "a"
+    assert model.best_topic("fuego") == "a"
+    assert model.best_topic("fuego eléctrico") == "c"
+    assert model.generate_response("nada que ver") == "por defecto"
+
+
+def test_priority_beats_weight_and_requires_gates_topics(tmp_path):
+    path = write_topics(tmp_path, "kb.json", [
+        {"id": "fuego", "answer": "F", "keywords": {"fuego": 1}, "priority": 2},
+        {"id": "calor", "answer": "C", "keywords": {"calor": 3}, "requires": ["fuego"], "priority": 3},
+        {"id": "salida", "answer": "S", "keywords": {"salida": 5}, "priority": 1},
+    ])
+    model = FirefighterChatModel(paths=[path])
+    assert model.best_topic("fuego salida") == "fuego"
+    assert model.best_topic("calor de un fuego") == "calor"
+    assert model.best_topic("calor") is None
+    assert model.best_topic("calor y salida") == "salida"
+
+
+@pytest.fixture(scope="module")
+def kb_model():
+    return FirefighterChatModel(paths=KNOWLEDGE_PATHS)
+
+
+@pytest.mark.parametrize("question, topic", [
+    ("¿Qué pasó en el último turno?", None),
+    ("¿Cuál es el protocolo PASO?", "extintor"),
+    ("¿Cómo se usa un extintor?", "extintor"),
+    ("¿Qué extintor uso en un fuego eléctrico?", "fuego electrico"),
+    ("Paro cardíaco: ¿cómo hago RCP?", "rcp"),
+    ("Hubo un disparo de alarma", None),
+])
+def test_knowledge_base_topics(kb_model, question, topic):
+    assert kb_model.best_topic(question) == topic
+
+
+def old_chain_topic(question):
+    """La cadena if/elif que reemplazó el matcher (tema o None para la respuesta por defecto)"""
+    q = question.lower()
+    if any(word in q for word in ['extintor', 'fuego', 'incendio']):
+        if 'electric' in q:
+            return 'fuego electrico'
+        elif 'temperatura' in q or 'grados' in q or 'calor' in q:
+            return 'temperatura fuego'
+        return 'incendio'
+    elif any(word in q for word in ['rcp', 'reanimacion', 'corazon', 'paro']):
+        return 'rcp'
+    elif any(word in q for word in ['evacuar', 'salida', 'emergencia']):
+        return 'evacuacion'
+    elif any(word in q for word in ['material', 'peligroso', 'quimico']):
+        return 'material peligroso'
+    elif any(word in q for word in ['mayday', 'ayuda', 'emergencia']):
+        return 'protocolo mayday'
+    return None
+
+
+OLD_VOCABULARY = [
+    "extintor", "fuego", "incendio", "electrico", "temperatura", "grados", "calor",
+    "rcp", "reanimacion", "corazon", "paro", "evacuar", "salida", "emergencia",
+    "material", "peligroso", "quimico", "mayday", "ayuda", "hola",
+]
+
+
+def test_knowledge_base_keeps_the_old_chain_precedence(kb_model):
+    # Única diferencia buscada: "extintor" sin "incendio" responde con el protocolo PASO
+    mismatches = []
+    for size in (1, 2, 3):
+        for words in itertools.permutations(OLD_VOCABULARY, size):
+            question = " ".join(words)
+            expected = old_chain_topic(question)
+            if expected == "incendio" and "extintor" in words and "incendio" not in words:
+                expected = "extintor"
+            if kb_model.best_topic(question) != expected:
+                mismatches.append((question, expected, kb_model.best_topic(question)))
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("question, topic", [
+    ("ayuda emergencia", "evacuacion"),
+    ("mayday emergencia", "evacuacion"),
+    ("temperatura", None),
+    ("eléctrico", None),
+    ("rcp antes de buscar la salida y evacuar", "rcp"),
+    ("fuego eléctrico a 600 grados de calor", "fuego electrico"),
+    ("¿A qué temperatura llega un flashover?", "temperatura fuego"),
+])
+def test_old_chain_precedence_examples(kb_model, question, topic):
+    assert kb_model.best_topic(question) == topic
@@ -0,0 +1,119 @@
+"""Route tests for the FO Leitner answer endpoints (single answer and session batch)."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+flask = pytest.importorskip("flask")
+mongomock = pytest.importorskip("mongomock")
+pytest.importorskip("pymongo")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+import leitner  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from leitner_queue import due_queues  # noqa: E402
+
+CARD = ObjectId()
+OTHER = ObjectId()
+
+
+@pytest.fixture
+def cards(monkeypatch):
+    col = mongomock.MongoClient().db.leitner_cards
+    past = datetime.utcnow() - timedelta(days=1)
+    col.insert_many([
+        {"_id": CARD, "user": "ana", "deck": "general", "front": "f1", "back": "b1", "box": 1, "due": past},
+        {"_id": OTHER, "user": "ana", "deck": "general", "front": "f2", "back": "b2", "box": 2, "due": past},
+    ])
+    monkeypatch.setattr(leitner, "_cards", col)
+    due_queues.invalidate("ana")
+    yield col
+    due_queues.invalidate("ana")
+
+
+@pytest.fixture
+def client():
+    app = flask.Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(leitner.leitner_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = "ana"
+    return client
+
+
+def load_queue(cards):
+    """Cargar la cola local (queda con caja 1 aunque Mongo cambie después)"""
+    due_queues.get("ana", "general").next_card(cards, datetime.now(timezone.utc))
+    assert due_queues.lookup("ana", str(CARD))["box"] == 1
+
+
+def test_answer_uses_the_stored_box_not_the_queued_one(client, cards):
+    load_queue(cards)
+    cards.update_one({"_id": CARD}, {"$set": {"box": 3}})  # Otra pestaña / otro worker
+
+    response = client.post("/api/leitner/answer", json={"card_id": str(CARD), "correct": True})
+    assert response.status_code == 200
+    assert response.get_json()["box"] == 4
+    stored = cards.find_one({"_id": CARD})
+    assert stored["box"] == 4
+    assert stored["due"] - datetime.utcnow() > timedelta(days=6)
+    assert [h["result"] for h in stored["history"]] == ["good"]
+    assert due_queues.lookup("ana", str(CARD)) is None  # Fuera del horizonte
+
+
+def test_failed_answer_goes_back_to_box_one(client, cards):
+    cards.update_one({"_id": CARD}, {"$set": {"box": 6, "history": [{"result": "good"}]}})
+    body = client.post("/api/leitner/answer", json={"cardId": str(CARD), "result": "fail"}).get_json()
+    assert body["box"] == 1
+    stored = cards.find_one({"_id": CARD})
+    assert stored["box"] == 1 and [h["result"] for h in stored["history"]] == ["good", "fail"]
+
+
+def test_answer_to_an_unknown_card_is_404(client, cards):
+    response = client.post("/api/leitner/answer", json={"card_id": str(ObjectId()), "correct": True})
+    assert response.status_code == 404
+
+
+def test_session_batch_uses_stored_boxes(client, cards):
+    load_queue(cards)
+    cards.update_one({"_id": CARD}, {"$set": {"box": 3}})
+
+    body = client.post("/api/leitner/session", json={"answers": [
+        {"card_id": str(CARD), "correct": True},
+        {"card_id": "no-es-un-id", "correct": True},
+        {"card_id": str(ObjectId()), "correct": True},
+        {"card_id": str(OTHER), "correct": False},
+    ]}).get_json()
+
+    assert body["applied"] == 2
+    assert [(r["card_id"], r["box"]) for r in body["results"]] == [(str(CARD), 4), (str(OTHER), 1)]
+    assert cards.find_one({"_id": CARD})["box"] == 4
+    assert cards.find_one({"_id": OTHER})["box"] == 1
+
+
+def test_session_start_returns_due_cards_by_box(client, cards):
+    cards.insert_one({"_id": ObjectId(), "user": "ana", "deck": "otro", "front": "f3", "back": "b3", "box": 1,
+                      "due": datetime.utcnow() + timedelta(days=2)})
+    body = client.get("/api/leitner/session?limit=5").get_json()
+    assert [card["id"] for card in body["cards"]] == [str(CARD), str(OTHER)]
+    assert [card["box"] for card in body["cards"]] == [1, 2]
+
+    assert len(client.get("/api/leitner/session?limit=1").get_json()["cards"]) == 1
+    assert client.get("/api/leitner/session?limit=5&deck=otro").get_json()["cards"] == []
+
+
+def test_session_answers_return_the_next_batch_without_answered_cards(client, cards):
+    body = client.post("/api/leitner/session", json={
+        "answers": [{"card_id": str(CARD), "correct": True}], "limit": 5,
+    }).get_json()
+    assert body["applied"] == 1
+    assert [card["id"] for card in body["cards"]] == [str(OTHER)]
+
+
+def test_session_rejects_oversized_batches(client, cards):
+    answers = [{"card_id": str(ObjectId()), "correct": True} for _ in range(leitner.SESSION_BATCH_MAX + 1)]
+    assert client.post("/api/leitner/session", json={"answers": answers}).status_code == 400
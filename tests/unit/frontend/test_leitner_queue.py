@@ -0,0 +1,110 @@
+"""Unit tests for the FO per-user Leitner due queue."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+import leitner_queue  # noqa: E402
+from leitner_queue import DueQueue, DueQueueRegistry  # noqa: E402
+
+# Los rellenos en segundo plano usan la hora real
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+@pytest.fixture
+def cards():
+    col = mongomock.MongoClient(tz_aware=True).db.leitner_cards
+    col.insert_many([
+        {"_id": "b2-old", "user": "ana", "front": "f", "back": "b", "box": 2, "due": NOW - timedelta(days=2)},
+        {"_id": "b1-new", "user": "ana", "front": "f", "back": "b", "box": 1, "due": NOW - timedelta(minutes=1)},
+        {"_id": "b1-old", "user": "ana", "front": "f", "back": "b", "box": 1, "due": NOW - timedelta(days=1)},
+        {"_id": "soon", "user": "ana", "front": "f", "back": "b", "box": 1, "due": NOW + timedelta(minutes=5)},
+        {"_id": "later", "user": "ana", "front": "f", "back": "b", "box": 1, "due": NOW + timedelta(days=3)},
+        {"_id": "other", "user": "luis", "front": "f", "back": "b", "box": 1, "due": NOW - timedelta(days=9)},
+    ])
+    return col
+
+
+def drain(queue, cards, now):
+    """Ids en el orden en que la cola los entrega, respondiendo "bien" a cada uno"""
+    order = []
+    while (doc := queue.next_card(cards, now)) is not None:
+        order.append(doc["id"])
+        queue.apply_answer(doc["id"], doc["box"] + 1, now + timedelta(days=30), now)
+    return order
+
+
+def test_cards_come_out_by_box_then_due(cards):
+    queue = DueQueue("ana")
+    assert drain(queue, cards, NOW) == ["b1-old", "b1-new", "b2-old"]
+
+
+def test_chunked_fill_keeps_the_order(cards, monkeypatch):
+    monkeypatch.setattr(leitner_queue, "QUEUE_CHUNK", 1)
+    queue = DueQueue("ana")
+    assert drain(queue, cards, NOW) == ["b1-old", "b1-new", "b2-old"]
+
+
+def test_pending_cards_become_ready_within_the_horizon(cards):
+    queue = DueQueue("ana")
+    drain(queue, cards, NOW)
+    reads = []
+    original = cards.find
+    cards.find = lambda *a, **k: reads.append(a) or original(*a, **k)
+    # "soon" ya estaba en la cola: vence sin volver a Mongo
+    assert queue.next_card(cards, NOW + timedelta(minutes=6))["id"] == "soon"
+    assert reads == []
+
+
+def test_answered_card_is_requeued_with_its_new_state(cards):
+    queue = DueQueue("ana")
+    assert queue.next_card(cards, NOW)["id"] == "b1-old"
+    # Fallada: vuelve a caja 1 y vence ya, por delante de las de caja 2
+    queue.apply_answer("b1-old", 1, NOW, NOW)
+    assert queue.get("b1-old")["due"] == NOW
+    queue.apply_answer("b1-old", 3, NOW + timedelta(days=7), NOW)
+    assert queue.get("b1-old") is None
+    assert queue.next_card(cards, NOW)["id"] == "b1-new"
+
+
+def test_ttl_expiry_reloads_from_mongo(cards, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(leitner_queue.time, "monotonic", lambda: clock[0])
+    queue = DueQueue("ana")
+    assert queue.next_card(cards, NOW)["id"] == "b1-old"
+
+    # Otro proceso sube la carta de caja en Mongo: la cola local no se entera...
+    cards.update_one({"_id": "b1-old"}, {"$set": {"box": 4}})
+    assert queue.next_card(cards, NOW)["id"] == "b1-old"
+    # ...hasta que vence QUEUE_TTL y se recarga
+    clock[0] += leitner_queue.QUEUE_TTL + 1
+    assert queue.next_card(cards, NOW)["id"] == "b1-new"
+
+
+def test_registry_invalidate_and_answer_reach_every_deck_queue(cards):
+    registry = DueQueueRegistry()
+    general, other_deck = registry.get("ana"), registry.get("ana", "incendios")
+    general.next_card(cards, NOW)
+    assert registry.lookup("ana", "b1-old")["box"] == 1
+
+    registry.apply_answer("ana", "b1-old", 2, NOW + timedelta(minutes=1), NOW)
+    assert registry.lookup("ana", "b1-old")["box"] == 2
+
+    registry.invalidate("ana")
+    assert registry.lookup("ana", "b1-old") is None
+    assert general.stale() and other_deck.stale()
+    assert registry.lookup("luis", "other") is None
+
+
+def test_registry_is_bounded():
+    registry = DueQueueRegistry(max_queues=2)
+    first = registry.get("a")
+    registry.get("b")
+    registry.get("c")
+    assert registry.get("a") is not first
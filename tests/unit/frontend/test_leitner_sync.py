@@ -0,0 +1,105 @@
+"""Unit tests for the incremental BO -> Leitner synchronization."""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+mongomock = pytest.importorskip("mongomock")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+import leitner_sync  # noqa: E402
+from leitner_sync import SYNC_STATE_COLLECTION, sync_memory_cards_to_leitner  # noqa: E402
+
+
+def memory_card(n, question=None, category="general"):
+    return {"id": f"m{n}", "question": question or f"Pregunta {n}", "answer": f"Respuesta {n}",
+            "category": category, "difficulty": "medium"}
+
+
+@pytest.fixture
+def cards():
+    return mongomock.MongoClient().db.leitner_cards
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    """Feed de cambios simulado: cada llamada devuelve la siguiente respuesta"""
+    responses, calls = [], []
+
+    def fetch(api_base_url, headers, since=None, page_size=leitner_sync.SYNC_PAGE_SIZE):
+        calls.append(since)
+        return responses.pop(0)
+
+    monkeypatch.setattr(leitner_sync, "fetch_memory_card_changes", fetch)
+    return responses, calls
+
+
+def changes(upserts=(), deletes=(), next_token="t1", reset=False):
+    return {"upserts": list(upserts), "deletes": list(deletes), "next": next_token, "reset": reset}
+
+
+def backoffice_cards(cards):
+    return {doc["source_id"]: doc for doc in cards.find({"user": "ana", "source": "backoffice"})}
+
+
+def test_first_sync_upserts_every_card_and_stores_the_token(cards, feed):
+    responses, calls = feed
+    responses.append(changes([memory_card(1), memory_card(2), memory_card(3, category="rescate")]))
+
+    assert sync_memory_cards_to_leitner("ana", cards) == 3
+    stored = backoffice_cards(cards)
+    assert set(stored) == {"m1", "m2", "m3"}
+    assert stored["m3"]["deck"] == "rescate" and stored["m1"]["box"] == 1
+    assert calls == [None]
+    assert cards.database[SYNC_STATE_COLLECTION].find_one({"_id": "ana"})["changes_token"] == "t1"
+
+
+def test_incremental_sync_counts_only_real_changes(cards, feed):
+    responses, calls = feed
+    responses.append(changes([memory_card(1), memory_card(2), memory_card(3)]))
+    sync_memory_cards_to_leitner("ana", cards)
+    cards.update_one({"source_id": "m2"}, {"$set": {"box": 4}})
+
+    # m1 sin cambios, m2 editada (conserva su caja), m3 borrada en el BO, m4 nueva
+    responses.append(changes([memory_card(1), memory_card(2, question="Editada"), memory_card(4)],
+                             deletes=["m3"], next_token="t2"))
+    assert sync_memory_cards_to_leitner("ana", cards) == 3
+
+    stored = backoffice_cards(cards)
+    assert set(stored) == {"m1", "m2", "m4"}
+    assert (stored["m2"]["front"], stored["m2"]["box"]) == ("Editada", 4)
+    assert calls == [None, "t1"]
+    assert cards.database[SYNC_STATE_COLLECTION].find_one({"_id": "ana"})["changes_token"] == "t2"
+
+
+def test_reset_reloads_everything_and_drops_missing_sources(cards, feed):
+    responses, _ = feed
+    responses.append(changes([memory_card(1), memory_card(2)]))
+    sync_memory_cards_to_leitner("ana", cards)
+    cards.insert_one({"user": "ana", "deck": "propio", "front": "mía", "back": "-", "box": 1})
+
+    responses.append(changes([memory_card(2)], reset=True, next_token="t9"))
+    assert sync_memory_cards_to_leitner("ana", cards) == 1
+    assert set(backoffice_cards(cards)) == {"m2"}
+    assert cards.count_documents({"user": "ana", "front": "mía"}) == 1
+
+
+def test_nothing_changed_writes_nothing(cards, feed):
+    responses, _ = feed
+    responses.append(changes([memory_card(1)]))
+    sync_memory_cards_to_leitner("ana", cards)
+    responses.append(changes([memory_card(1)], next_token="t2"))
+    assert sync_memory_cards_to_leitner("ana", cards) == 0
+
+
+def test_failed_fetch_keeps_the_previous_token(cards, feed):
+    responses, _ = feed
+    responses.append(changes([memory_card(1)]))
+    sync_memory_cards_to_leitner("ana", cards)
+    responses.append(None)
+    assert sync_memory_cards_to_leitner("ana", cards) == 0
+    assert cards.database[SYNC_STATE_COLLECTION].find_one({"_id": "ana"})["changes_token"] == "t1"
@@ -0,0 +1,218 @@
+"""Unit tests for the FO certification proxy cache against a local origin."""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "..", "FO"))
+
+from proxy_cache import (  # noqa: E402
+    DiskStore,
+    MemoryStore,
+    ProxyCache,
+    ProxyStreamTooLarge,
+    create_session,
+    freshness_lifetime,
+)
+
+
+class _Origin(BaseHTTPRequestHandler):
+    """Origen de prueba: cuenta peticiones y responde 304 si el ETag coincide"""
+
+    routes = {
+        "/page.html": ("text/html; charset=utf-8", "max-age=0", '"p1"', b"<html><head></head><body>hola</body></html>"),
+        "/fresh.css": ("text/css", "max-age=3600", '"c1"', b"body{color:red}"),
+        "/nostore.js": ("application/javascript", "no-store", None, b"var x=1;"),
+        "/private.js": ("application/javascript", "private, max-age=3600", '"v1"', b"var yo=1;"),
+        "/cookie.css": ("text/css", "max-age=3600", '"k1"', b"body{}"),
+        "/star.css": ("text/css", "max-age=3600", '"s1"', b"body{}"),
+        "/gzip.css": ("text/css", "max-age=3600", '"g1"', b"body{}"),
+        "/big.pdf": ("application/pdf", "max-age=3600", '"b1"', bytes(range(256)) * 1024),
+        "/unsized.bin": ("application/octet-stream", "max-age=3600", None, bytes(range(256)) * 1024),
+    }
+    # Sin Content-Length: el cuerpo termina al cerrar la conexión
+    unsized = {"/unsized.bin"}
+    vary = {"/cookie.css": "Cookie", "/star.css": "*", "/gzip.css": "Accept-Encoding"}
+    hits = {}
+
+    def do_GET(self):
+        _Origin.hits[self.path] = _Origin.hits.get(self.path, 0) + 1
+        route = self.routes.get(self.path)
+        if route is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content_type, cache_control, etag, body = route
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        byte_range = self.headers.get("Range")
+        if byte_range:
+            start, _, end = byte_range.replace("bytes=", "").partition("-")
+            start, end = int(start), int(end or len(body) - 1)
+            self.send_response(206)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            self.wfile.write(body[start:end + 1])
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", cache_control)
+        if etag:
+            self.send_header("ETag", etag)
+        if self.path in self.vary:
+            self.send_header("Vary", self.vary[self.path])
+        if self.path not in self.unsized:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    _Origin.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Origin)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ProxyCache(session=create_session(), html_store=MemoryStore(10),
+                      asset_store=DiskStore(str(tmp_path), max_bytes=1024 * 1024))
+
+
+def test_fresh_asset_is_served_without_contacting_origin(cache, origin):
+    entry, outcome = cache.fetch(f"{origin}/fresh.css")
+    assert (outcome, entry.body) == ("miss", b"body{color:red}")
+    entry, outcome = cache.fetch(f"{origin}/fresh.css")
+    assert (outcome, entry.body) == ("hit", b"body{color:red}")
+    assert _Origin.hits["/fresh.css"] == 1
+
+
+def test_assets_survive_in_disk_store(cache, origin, tmp_path):
+    cache.fetch(f"{origin}/fresh.css")
+    other = ProxyCache(session=create_session(), asset_store=DiskStore(str(tmp_path), max_bytes=1024))
+    entry, outcome = other.fetch(f"{origin}/fresh.css")
+    assert (outcome, entry.content_type) == ("hit", "text/css")
+    assert _Origin.hits["/fresh.css"] == 1
+
+
+def test_stale_html_is_revalidated_and_not_rewritten_again(cache, origin):
+    rewrites = []
+
+    def transform(html):
+        rewrites.append(html)
+        return html.replace("hola", "reescrito")
+
+    entry, outcome = cache.fetch(f"{origin}/page.html", transform=transform)
+    assert outcome == "miss" and b"reescrito" in entry.body
+    entry, outcome = cache.fetch(f"{origin}/page.html", transform=transform)
+    assert outcome == "revalidated" and b"reescrito" in entry.body
+    assert len(rewrites) == 1
+    assert _Origin.hits["/page.html"] == 2
+
+
+def test_no_store_is_never_cached(cache, origin):
+    cache.fetch(f"{origin}/nostore.js")
+    _, outcome = cache.fetch(f"{origin}/nostore.js")
+    assert outcome == "bypass"
+    assert _Origin.hits["/nostore.js"] == 2
+
+
+@pytest.mark.parametrize("path", ["/private.js", "/cookie.css", "/star.css"])
+def test_private_and_varying_responses_are_not_shared(cache, origin, path):
+    assert cache.fetch(f"{origin}{path}")[1] == "bypass"
+    assert cache.stream(f"{origin}{path}").outcome == "bypass"
+    assert cache.fetch(f"{origin}{path}")[1] == "bypass"
+    assert _Origin.hits[path] == 3
+
+
+def test_vary_accept_encoding_is_still_cached(cache, origin):
+    cache.fetch(f"{origin}/gzip.css")
+    assert cache.fetch(f"{origin}/gzip.css")[1] == "hit"
+    assert _Origin.hits["/gzip.css"] == 1
+
+
+def test_errors_are_not_cached(cache, origin):
+    entry, outcome = cache.fetch(f"{origin}/missing.png")
+    assert (entry.status, outcome) == (404, "bypass")
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    from proxy_cache import CachedResponse
+
+    store = DiskStore(str(tmp_path), max_bytes=10)
+    store.set("a", CachedResponse(200, {}, b"12345", lifetime=60))
+    store.set("b", CachedResponse(200, {}, b"12345", lifetime=60))
+    assert store.get("a") is not None
+    store.set("c", CachedResponse(200, {}, b"12345", lifetime=60))
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+
+def test_stream_tees_to_disk_and_then_serves_from_file(cache, origin):
+    upstream = cache.stream(f"{origin}/big.pdf")
+    assert (upstream.outcome, upstream.length) == ("miss", 256 * 1024)
+    chunks = list(upstream.chunks(chunk_size=16 * 1024))
+    assert max(len(c) for c in chunks) <= 16 * 1024
+    assert b"".join(chunks) == bytes(range(256)) * 1024
+
+    upstream = cache.stream(f"{origin}/big.pdf")
+    assert upstream.outcome == "hit" and upstream.entry.path is not None
+    assert os.path.getsize(upstream.entry.path) == 256 * 1024
+    assert _Origin.hits["/big.pdf"] == 1
+
+
+def test_stream_range_is_forwarded_and_not_cached(cache, origin):
+    upstream = cache.stream(f"{origin}/big.pdf", byte_range="bytes=10-19")
+    assert upstream.status == 206 and upstream.outcome == "bypass"
+    assert b"".join(upstream.chunks()) == bytes(range(10, 20))
+    assert upstream.headers["Content-Range"] == f"bytes 10-19/{256 * 1024}"
+    assert cache.stream(f"{origin}/big.pdf").outcome == "miss"
+
+
+@pytest.mark.parametrize("path", ["/big.pdf", "/unsized.bin"])
+def test_stream_over_byte_limit_fails_and_discards_partial_copy(cache, origin, tmp_path, path):
+    upstream = cache.stream(f"{origin}{path}", max_bytes=64 * 1024)
+    received = []
+    with pytest.raises(ProxyStreamTooLarge):
+        for chunk in upstream.chunks(chunk_size=16 * 1024):
+            received.append(chunk)
+    assert sum(len(c) for c in received) == 64 * 1024
+    assert not [name for name in os.listdir(tmp_path) if name.endswith((".body", ".tmp"))]
+
+
+def test_unsized_stream_within_limit_is_cached(cache, origin):
+    upstream = cache.stream(f"{origin}/unsized.bin")
+    assert upstream.length is None
+    assert b"".join(upstream.chunks()) == bytes(range(256)) * 1024
+    assert cache.stream(f"{origin}/unsized.bin").outcome == "hit"
+
+
+def test_freshness_lifetime_follows_cache_headers():
+    assert freshness_lifetime({"cache-control": "no-store"}) is None
+    assert freshness_lifetime({"cache-control": "private, max-age=60"}) is None
+    assert freshness_lifetime({"cache-control": "max-age=60", "vary": "Accept-Encoding, Cookie"}) is None
+    assert freshness_lifetime({"cache-control": "max-age=60", "vary": "accept-encoding"}) == 60
+    assert freshness_lifetime({"cache-control": "no-cache, max-age=60"}) == 0
+    assert freshness_lifetime({"cache-control": "max-age=60, s-maxage=120"}) == 120
+    assert freshness_lifetime({}, default_ttl=42) == 42
+    assert freshness_lifetime({"last-modified": "Thu, 01 Jan 2026 00:00:00 GMT"},
+                              now=1767225600 + 1000) == 100
@@ -0,0 +1,352 @@
+"""Unit tests for the shared firefighter_cache package."""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import types
+
+import pytest
+
+import firefighter_cache
+from firefighter_cache import MemoryBackend, SimpleMemoryCache
+
+
+@pytest.fixture
+def cache():
+    c = SimpleMemoryCache(default_ttl=60, max_size=8, segments=1, cleanup_interval=0)
+    yield c
+    c.stop()
+
+
+def test_set_and_get(cache):
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+
+
+def test_lru_eviction_keeps_recently_used(cache):
+    for i in range(8):
+        cache.set(f"k{i}", i)
+    # Tocar k0 para que deje de ser el menos usado
+    assert cache.get("k0") == 0
+    cache.set("k8", 8)
+    assert cache.get("k0") == 0
+    assert cache.get("k1") is None
+    assert len(cache) == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_are_not_returned(cache):
+    cache.set("short", "x", ttl=0.05)
+    cache.set("long", "y", ttl=60)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.get("long") == "y"
+
+
+def test_purge_expired_ignores_overwritten_keys(cache):
+    cache.set("k", "old", ttl=0.05)
+    cache.set("k", "new", ttl=60)
+    time.sleep(0.1)
+    assert cache.purge_expired() == 0
+    assert cache.get("k") == "new"
+
+
+def test_delete_and_clear(cache):
+    cache.set("a", 1)
+    assert cache.delete("a") is True
+    assert cache.delete("a") is False
+    cache.set("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_segments_share_capacity():
+    c = SimpleMemoryCache(max_size=64, segments=4, cleanup_interval=0)
+    for i in range(1000):
+        c.set(f"key:{i}", i)
+    assert len(c) <= 64
+    stats = c.stats()
+    assert stats["segments"] == 4
+    assert stats["total_entries"] == len(c)
+
+
+@pytest.fixture
+def backend():
+    previous = firefighter_cache.get_backend()
+    current = firefighter_cache.set_backend(MemoryBackend(default_ttl=60, max_size=100))
+    yield current
+    firefighter_cache.set_backend(previous)
+
+
+def test_cache_result_reuses_value(backend):
+    calls = []
+
+    @firefighter_cache.cache_result(ttl=60)
+    def compute(x):
+        calls.append(x)
+        return x * 2
+
+    assert compute(2) == 4
+    assert compute(2) == 4
+    assert calls == [2]
+
+
+def test_invalidate_user_cache(backend):
+    calls = []
+
+    @firefighter_cache.cache_user_data(ttl=60)
+    def load_user(user_id):
+        calls.append(user_id)
+        return {"id": user_id}
+
+    load_user("u1")
+    firefighter_cache.invalidate_user_cache("u1")
+    load_user("u1")
+    assert calls == ["u1", "u1"]
+    assert firefighter_cache.get_cache_stats()["backend"] == "memory"
+
+
+def test_cache_result_single_flight(backend):
+    calls = []
+    gate = threading.Event()
+
+    @firefighter_cache.cache_result(ttl=60)
+    def slow(x):
+        calls.append(x)
+        gate.wait(1)
+        return x
+
+    threads = [threading.Thread(target=slow, args=(1,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+
+
+def test_cache_result_stale_while_revalidate(backend):
+    calls = []
+
+    @firefighter_cache.cache_result(ttl=0.05, stale_ttl=60)
+    def value():
+        calls.append(1)
+        return len(calls)
+
+    assert value() == 1
+    time.sleep(0.1)
+    # Valor obsoleto servido al instante, refresco en segundo plano
+    assert value() == 1
+    for _ in range(50):
+        if len(calls) == 2:
+            break
+        time.sleep(0.01)
+    assert value() == 2
+
+
+def test_async_cache_result_single_flight(backend):
+    calls = []
+
+    @firefighter_cache.async_cache_result(ttl=60)
+    async def load(x):
+        calls.append(x)
+        await asyncio.sleep(0.02)
+        return x * 10
+
+    async def main():
+        return await asyncio.gather(*(load(3) for _ in range(5)))
+
+    assert asyncio.run(main()) == [30] * 5
+    assert calls == [3]
+
+
+def test_cache_user_route_per_user_and_invalidation(backend):
+    calls = []
+
+    @firefighter_cache.cache_user_route(ttl=60, namespace="test:stats")
+    async def stats(user_data=None, box=None):
+        calls.append((user_data["username"], box))
+        return {"ok": True, "user": user_data["username"]}
+
+    alice = {"username": "alice", "role": "user"}
+    bob = {"username": "bob", "role": "user"}
+    admin = {"username": "root", "role": "admin"}
+
+    async def main():
+        await stats(user_data=alice)
+        await stats(user_data=alice)
+        await stats(user_data=bob)
+        await stats(user_data=admin)
+        firefighter_cache.invalidate_user_routes("alice")
+        await stats(user_data=alice)
+        await stats(user_data=bob)
+        # La vista agregada del admin también se invalida
+        await stats(user_data=admin)
+
+    asyncio.run(main())
+    assert calls == [
+        ("alice", None), ("bob", None), ("root", None), ("alice", None), ("root", None),
+    ]
+
+
+class _NetworkBackend(MemoryBackend):
+    """Backend que simula E/S de red: anota en qué hilo se le llama"""
+
+    blocking = True
+
+    def __init__(self):
+        super().__init__(default_ttl=60, max_size=100)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value, ttl=None):
+        self.threads.add(threading.get_ident())
+        super().set(key, value, ttl)
+
+
+def test_async_paths_keep_network_calls_off_the_event_loop():
+    network = _NetworkBackend()
+    previous = firefighter_cache.get_backend()
+    firefighter_cache.set_backend(network)
+
+    @firefighter_cache.cache_user_route(ttl=60, namespace="test:offload")
+    async def stats(user_data=None):
+        return {"user": user_data["username"]}
+
+    @firefighter_cache.async_cache_result(ttl=60, stale_ttl=60)
+    async def load(x):
+        return x
+
+    async def main():
+        loop_thread = threading.get_ident()
+        first = await stats(user_data={"username": "alice", "role": "user"})
+        again = await stats(user_data={"username": "alice", "role": "user"})
+        await firefighter_cache.async_invalidate_user_routes("alice")
+        assert await load(1) == await load(1) == 1
+        return loop_thread, first == again == {"user": "alice"}
+
+    try:
+        loop_thread, same = asyncio.run(main())
+    finally:
+        firefighter_cache.set_backend(previous)
+    assert same and network.threads and loop_thread not in network.threads
+
+
+class _FakePubSub:
+    """PubSub mínimo: get_message devuelve lo encolado o None tras el timeout"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def subscribe(self, channel):
+        self.client.subscriptions += 1
+        if self.client.fail_next_subscribe:
+            self.client.fail_next_subscribe = False
+            raise ConnectionError("Redis caído")
+
+    def get_message(self, timeout=0.0):
+        if self.client.messages:
+            return {"type": "message", "data": self.client.messages.pop(0)}
+        time.sleep(min(timeout, 0.01))
+        return None
+
+    def close(self):
+        pass
+
+
+class _FakeRedis:
+    def __init__(self, fail_next_subscribe=False):
+        self.messages = []
+        self.subscriptions = 0
+        self.fail_next_subscribe = fail_next_subscribe
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _FakePubSub(self)
+
+    def publish(self, channel, message):
+        return 0
+
+
+def _wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_tiered_idle_channel_keeps_l1():
+    from firefighter_cache.backends import TieredBackend
+
+    client = _FakeRedis()
+    tiered = TieredBackend(client, default_ttl=60)
+    tiered.l1.set("a", 1)
+    tiered.l1.set("b", 2)
+    time.sleep(0.2)  # Canal inactivo: antes el timeout del socket vaciaba la L1
+    assert tiered.l1.get("a") == 1 and client.subscriptions == 1
+
+    client.messages.append(json.dumps({"origin": "otro", "op": "delete", "keys": ["a"]}))
+    assert _wait_until(lambda: tiered.l1.get("a") is None)
+    assert tiered.l1.get("b") == 2 and tiered.invalidations_received == 1
+
+
+def test_tiered_clears_l1_after_reconnect(monkeypatch):
+    from firefighter_cache import backends
+
+    reconnect = threading.Event()
+    monkeypatch.setattr(backends, "time", types.SimpleNamespace(sleep=lambda s: reconnect.wait(2), time=time.time))
+    client = _FakeRedis(fail_next_subscribe=True)
+    tiered = backends.TieredBackend(client, default_ttl=60)
+    tiered.l1.set("obsoleta", 1)  # Escrita mientras no había suscripción
+    reconnect.set()
+    assert _wait_until(lambda: client.subscriptions == 2 and tiered.l1.get("obsoleta") is None)
+
+    tiered.l1.set("nueva", 2)
+    time.sleep(0.05)
+    assert tiered.l1.get("nueva") == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere os.fork")
+def test_forked_worker_gets_its_own_subscriber_and_janitor():
+    from firefighter_cache import backends
+
+    client = _FakeRedis()
+    tiered = backends.TieredBackend(client, default_ttl=60)
+    previous = firefighter_cache.get_backend()
+    firefighter_cache.set_backend(tiered)
+    try:
+        assert _wait_until(lambda: tiered.events_since() < float("inf"))
+        master_id = tiered.instance_id
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - hijo
+            ok = False
+            try:
+                ok = (_wait_until(lambda: tiered._subscriber.is_alive() and tiered.events_since() < float("inf"))
+                      and tiered.l1._janitor.is_alive() and tiered.instance_id != master_id)
+                # Un mensaje del master (o de otro worker) ya no se toma por propio
+                tiered.l1.set("a", 1)
+                client.messages.append(json.dumps({"origin": master_id, "op": "delete", "keys": ["a"]}))
+                ok = ok and _wait_until(lambda: tiered.l1.get("a") is None)
+            finally:
+                os.write(write_end, b"1" if ok else b"0")
+                os._exit(0)
+        os.close(write_end)
+        result = os.read(read_end, 1)
+        os.waitpid(pid, 0)
+        os.close(read_end)
+        assert result == b"1"
+        # En el propio proceso no cambia nada
+        firefighter_cache.reinit_after_fork()
+        assert tiered.instance_id == master_id
+    finally:
+        tiered.close()
+        firefighter_cache.set_backend(previous)